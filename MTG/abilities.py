@@ -2,6 +2,12 @@ from enum import Enum
 from MTG import mana
 from MTG import play
 from MTG import gameobject
+from MTG import utils
+
+
+def compiled(source):
+    """ costs & effects of abilities, compiled once as functions of self (see utils.compile_expression) """
+    return utils.compile_expression(source, globals())
 
 
 # TODO: integrate with Spell.py?
@@ -9,9 +15,8 @@ from MTG import gameobject
 class Ability(gameobject.GameObject):
     def __init__(self, card, effect, target_criterias=None,
                  prompts=None):
-        super(Ability, self).__init__()
+        super(Ability, self).__init__(controller=card.controller)
         self.card = card
-        self.controller = card.controller
         self.effect = effect
 
         self.target_criterias = target_criterias
@@ -28,27 +33,35 @@ class Ability(gameobject.GameObject):
         return str(self)
 
     def resolve(self):
-        return eval(self.effect)
+        return compiled(self.effect)(self)
         
 
 
 
 class ActivatedAbility(Ability):
-    def __init__(self, card, cost, effect, target_criterias=None, prompts=None, is_mana_ability=False):
-        """ card: permanent that the ability is attached to """
+    def __init__(self, card, cost, effect, target_criterias=None, prompts=None, is_mana_ability=False,
+                 cost_checks=None):
+        """ card: permanent that the ability is attached to
+
+        cost_checks: like cost, but only checks if the costs can be paid (see utils.parse_ability_cost_checks)
+        """
         super(ActivatedAbility, self).__init__(card, effect, target_criterias, prompts)
         self.cost = cost
+        self.cost_checks = cost_checks
         self.is_mana_ability = is_mana_ability
 
+    def can_pay_costs(self):
+        """ check the ability's costs without paying them """
+        if not self.cost_checks:
+            return True
+        return compiled(self.cost_checks)(self.card)
+
 
     def can_activate(self):
         """ choose targets, pays ability's costs, attempt to activate """
-        cost = self.cost
-        _card = self.card
-
         targets_chosen = self.choose_targets()
 
-        return targets_chosen and (lambda self: eval(cost))(_card)
+        return targets_chosen and compiled(self.cost)(self.card)
 
 
 class TriggeredAbility(Ability):
@@ -69,10 +82,15 @@ class TriggeredAbility(Ability):
     def condition_satisfied(self):
         return self.requirements(self) and self.intervening_if(self)
 
+    def intervening_if_satisfied(self):
+        return self.intervening_if(self)
+
     def put_on_stack(self):
+        # bound methods rather than lambdas, so copies of the game (Game.clone)
+        # resolve their own copy of the ability
         if self.choose_targets():
-            return play.Play(lambda: self.resolve(),
-                               apply_condition=lambda: self.intervening_if(self),
+            return play.Play(self.resolve,
+                               apply_condition=self.intervening_if_satisfied,
                                name=str(self),
                                source=self)
         return None
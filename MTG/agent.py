@@ -0,0 +1,284 @@
+"""Decision agents
+
+By default, every decision a player has to take is asked through input().
+A Player with an agent (player.agent = SomeAgent()) takes its decisions from
+the agent instead: whenever the game needs something from the player, it
+builds one of the decision requests below and passes it to agent.decide(),
+which returns a structured answer (game objects, not strings to be parsed).
+
+    decision                answer
+    --------                ------
+    PriorityDecision        PassPriority(), PlayCard(card) or ActivateAbility(permanent, index)
+    AttackersDecision       list of creatures attacking decision.defender
+    BlockersDecision        list of creatures blocking decision.attacker
+    TargetDecision          the chosen target (or None to give up)
+    DiscardDecision         list of cards to discard
+    TriggerOrderDecision    list of triggers, from the bottom of the stack to the top
+    ManaPaymentDecision     string of colored mana paying for the generic cost, or None
+    HybridManaDecision      0 or 1, index of the half of the hybrid symbol to pay
+    ChoiceDecision          answer to a free-form prompt from a card (a string)
+    ItemsDecision           list of items chosen among decision.items
+
+Agent is the base class; it answers everything with the engine's own defaults
+(pass priority, no attacks, no blocks, automatic payment...). Subclasses
+override the methods for the decisions they care about. RandomAgent plays
+random legal moves (see Player.legal_actions); HeuristicAgent plays random moves
+too, but sensible ones (lands before spells, attacks & blocks that don't throw
+creatures away...). Both are used as playout policies by MCTSAgent (mcts.py).
+"""
+
+import random
+
+
+# Actions a player can take while holding priority
+
+
+class PassPriority():
+    """ pass priority; if `until` is a gamesteps.Step, keep passing until that step """
+
+    def __init__(self, until=None):
+        self.until = until
+
+    def __repr__(self):
+        return 'PassPriority(until=%r)' % self.until
+
+
+class PlayCard():
+    """ play (cast, or play as a land) a card from hand """
+
+    def __init__(self, card):
+        self.card = card
+
+    def __repr__(self):
+        return 'PlayCard(%r)' % self.card
+
+
+class ActivateAbility():
+    """ activate the index-th activated ability of a permanent """
+
+    def __init__(self, permanent, index=0):
+        self.permanent = permanent
+        self.index = index
+
+    def __repr__(self):
+        return 'ActivateAbility(%r, %r)' % (self.permanent, self.index)
+
+
+# Decision requests
+
+
+class Decision():
+    kind = None
+
+    def __init__(self, player):
+        self.player = player
+
+    @property
+    def game(self):
+        return self.player.game
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.player)
+
+
+class PriorityDecision(Decision):
+    kind = 'priority'
+
+    def __init__(self, player, step):
+        super(PriorityDecision, self).__init__(player)
+        self.step = step
+
+
+class AttackersDecision(Decision):
+    kind = 'attackers'
+
+    def __init__(self, player, defender, candidates):
+        super(AttackersDecision, self).__init__(player)
+        self.defender = defender
+        self.candidates = candidates
+
+
+class BlockersDecision(Decision):
+    kind = 'blockers'
+
+    def __init__(self, player, attacker, candidates):
+        super(BlockersDecision, self).__init__(player)
+        self.attacker = attacker
+        self.candidates = candidates
+
+
+class TargetDecision(Decision):
+    kind = 'target'
+
+    def __init__(self, player, source, criteria, prompt, candidates):
+        super(TargetDecision, self).__init__(player)
+        self.source = source
+        self.criteria = criteria
+        self.prompt = prompt
+        self.candidates = candidates
+
+
+class DiscardDecision(Decision):
+    kind = 'discard'
+
+    def __init__(self, player, cards, num):
+        super(DiscardDecision, self).__init__(player)
+        self.cards = cards
+        self.num = num
+
+
+class TriggerOrderDecision(Decision):
+    kind = 'trigger_order'
+
+    def __init__(self, player, triggers):
+        super(TriggerOrderDecision, self).__init__(player)
+        self.triggers = triggers
+
+
+class ManaPaymentDecision(Decision):
+    kind = 'mana_payment'
+
+    def __init__(self, player, cost, generic):
+        super(ManaPaymentDecision, self).__init__(player)
+        self.cost = cost
+        self.generic = generic
+
+
+class HybridManaDecision(Decision):
+    kind = 'hybrid_mana'
+
+    def __init__(self, player, options):
+        super(HybridManaDecision, self).__init__(player)
+        self.options = options
+
+
+class ChoiceDecision(Decision):
+    kind = 'choice'
+
+    def __init__(self, player, prompt):
+        super(ChoiceDecision, self).__init__(player)
+        self.prompt = prompt
+
+
+class ItemsDecision(Decision):
+    kind = 'items'
+
+    def __init__(self, player, items, num=1, up_to=False, repetition=False):
+        super(ItemsDecision, self).__init__(player)
+        self.items = items
+        self.num = num
+        self.up_to = up_to
+        self.repetition = repetition
+
+
+class Agent():
+    """Takes decisions on behalf of a player
+
+    Each decision is dispatched to the method named after its kind;
+    the defaults here never do anything the player didn't ask for.
+    """
+    _clone_shared = frozenset()  # copied along with the game (see cloning.py)
+
+    def decide(self, decision):
+        return getattr(self, decision.kind)(decision)
+
+    def priority(self, decision):
+        return PassPriority()
+
+    def attackers(self, decision):
+        return []
+
+    def blockers(self, decision):
+        return []
+
+    def target(self, decision):
+        return decision.candidates[0] if decision.candidates else None
+
+    def discard(self, decision):
+        return decision.cards[-decision.num:]
+
+    def trigger_order(self, decision):
+        return decision.triggers
+
+    def mana_payment(self, decision):
+        return None  # automatic payment
+
+    def hybrid_mana(self, decision):
+        return 0
+
+    def choice(self, decision):
+        return ''
+
+    def items(self, decision):
+        return [] if decision.up_to else decision.items[:decision.num]
+
+
+class RandomAgent(Agent):
+    """Picks uniformly among the legal options of every decision"""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def priority(self, decision):
+        return self.rng.choice(decision.player.legal_actions())
+
+    def attackers(self, decision):
+        return [c for c in decision.candidates if self.rng.random() < 0.5]
+
+    def blockers(self, decision):
+        return [c for c in decision.candidates if self.rng.random() < 0.5][:1]
+
+    def target(self, decision):
+        return self.rng.choice(decision.candidates) if decision.candidates else None
+
+    def discard(self, decision):
+        return self.rng.sample(decision.cards, decision.num)
+
+    def trigger_order(self, decision):
+        return self.rng.sample(decision.triggers, len(decision.triggers))
+
+    def hybrid_mana(self, decision):
+        return self.rng.randrange(2)
+
+    def items(self, decision):
+        num = self.rng.randint(0, decision.num) if decision.up_to else decision.num
+        if decision.repetition:
+            return [self.rng.choice(decision.items) for _ in range(num)] if decision.items else []
+        return self.rng.sample(decision.items, min(num, len(decision.items)))
+
+
+class HeuristicAgent(RandomAgent):
+    """Plays lands, then spells, then abilities (tapping lands for them) before passing;
+    attacks & blocks when it doesn't lose the creature for nothing. Random otherwise.
+    """
+
+    def priority(self, decision):
+        actions = decision.player.legal_actions()
+        best = max(self.rank(a) for a in actions)
+        return self.rng.choice([a for a in actions if self.rank(a) == best])
+
+    @staticmethod
+    def rank(action):
+        if isinstance(action, PlayCard):
+            return 3 if action.card.is_land else 2
+        if isinstance(action, ActivateAbility):
+            return 1
+        return 0
+
+    def attackers(self, decision):
+        blockers = [c for c in decision.defender.creatures if not c.status.tapped]
+        return [c for c in decision.candidates
+                if c.power > 0 and not any(b.power >= c.toughness and b.toughness > c.power
+                                           for b in blockers)]
+
+    def blockers(self, decision):
+        attacker = decision.attacker
+        survives = [c for c in decision.candidates if c.toughness > attacker.power]
+        trades = [c for c in decision.candidates if c.power >= attacker.toughness]
+        if survives:
+            return [max(survives, key=lambda c: c.power)]
+        if trades:
+            return [min(trades, key=lambda c: c.power + c.toughness)]
+        if decision.candidates and decision.player.life <= attacker.power:
+            return [min(decision.candidates, key=lambda c: c.power + c.toughness)]
+        return []
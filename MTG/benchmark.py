@@ -0,0 +1,328 @@
+"""Benchmarks of the engine's hot paths
+
+    python -m MTG.benchmark -o before.json
+    ... change things ...
+    python -m MTG.benchmark -o after.json
+    python -m MTG.benchmark --compare before.json after.json
+
+Each benchmark times one operation (a whole game, a round of priority, a
+combat damage step, a state-based actions pass, a mana payment check...).
+It's run `number` times per sample, for `repeat` samples; the results file
+(JSON) has the best & median time per operation of every benchmark:
+
+    {"version": 1, "python": "3.11.7", "platform": "Linux-...",
+     "benchmarks": {"full_game": {"best": 0.0123, "median": 0.0131,
+                                  "number": 1, "repeat": 10}, ...}}
+
+--compare reports the change of the best time of each benchmark between two
+results files, flags the ones slower by more than --threshold (10% by default)
+as regressions, and exits with status 1 if there are any.
+
+A benchmark is a function decorated with @benchmark: it sets things up (not
+timed) and returns the function to time, which must leave things as it found
+them if number > 1.
+"""
+
+import sys
+import copy
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+from MTG import game
+from MTG import cards
+from MTG import agent
+from MTG import mana
+from MTG import replay
+from MTG import gamelog
+from MTG import gamesteps
+from MTG import simulate
+from MTG.utils import path_from_home
+
+
+RESULTS_FORMAT_VERSION = 1
+
+DECKS = ['card_db/decks/mono_green.txt', 'card_db/decks/mono_red.txt']
+
+BENCHMARKS = {}  # name -> (setup function, number, repeat)
+
+
+def benchmark(number=1, repeat=10):
+    """ decorator registering a benchmark under the name of its function """
+    def register(func):
+        BENCHMARKS[func.__name__] = (func, number, repeat)
+        return func
+    return register
+
+
+def new_game(seed=0, agents=(agent.Agent, agent.Agent)):
+    """ a game of the benchmark decks, set up, with the players' hands emptied """
+    GAME = game.Game([cards.read_deck(path_from_home(f)) for f in DECKS], seed=seed)
+    for _player, agent_class in zip(GAME.players_list, agents):
+        _player.agent = agent_class()
+    GAME.setup_game()
+    for _player in GAME.players_list:
+        _player.hand.clear()
+    return GAME
+
+
+def midgame(seed=0, copies=5, turns=4):
+    """ a game of 60-card decks (each benchmark deck, `copies` times over),
+    after `turns` turns between heuristic agents
+    """
+    decks = [[card for i in range(copies) for card in cards.read_deck(path_from_home(f))]
+             for f in DECKS]
+    GAME = game.Game(decks, seed=seed)
+    for i, _player in enumerate(GAME.players_list):
+        _player.agent = agent.HeuristicAgent(seed=i)
+    GAME.setup_game()
+    for i in range(turns):
+        GAME.handle_turn()
+    return GAME
+
+
+def in_main_phase(GAME):
+    """ put GAME at the start of the first main phase of its current turn """
+    steps = [step for phase in gamesteps.Phase for step in phase.steps]
+    GAME.step = gamesteps.Step.PRECOMBAT_MAIN
+    GAME.pending_steps = steps[steps.index(GAME.step) + 1:]
+    return GAME
+
+
+def fill_battlefields(GAME, names=("Grizzly Bears", "Mons's Goblin Raiders", "Forest", "Mountain"),
+                      copies=5):
+    for _player in GAME.players_list:
+        for name in names * copies:
+            _player.battlefield.add(name).status.summoning_sick = False
+    return GAME
+
+
+@benchmark(number=1, repeat=10)
+def full_game():
+    """ a whole game between random agents """
+    return lambda: simulate.play_game((0, DECKS, ['random', 'random'], 1, 100))
+
+
+@benchmark(number=20, repeat=10)
+def priority_round():
+    """ a round of priority (everyone passes, empty stack) with full battlefields """
+    GAME = fill_battlefields(in_main_phase(new_game()))
+    return lambda: GAME.handle_priority(GAME.step)
+
+
+@benchmark(number=10, repeat=10)
+def priority_with_stack():
+    """ players casting and resolving five spells in one round of priority """
+    GAME = in_main_phase(new_game())
+    _player = GAME.players_list[0]
+
+    class Caster(agent.Agent):
+        def priority(self, decision):
+            bolt = _player.hand.get_card_by_name("Lightning Bolt")
+            if bolt and not GAME.stack:
+                _player.mana.add(mana.Mana.RED, 1)
+                return agent.PlayCard(bolt)
+            return agent.PassPriority()
+
+        def target(self, decision):
+            return GAME.players_list[1]
+
+    _player.agent = Caster()
+
+    def run():
+        _player.graveyard.clear()
+        for i in range(5):
+            _player.hand.add("Lightning Bolt")
+        GAME.players_list[1].life = 20
+        GAME.handle_priority(GAME.step)
+    return run
+
+
+@benchmark(number=1, repeat=20)
+def combat_damage():
+    """ combat damage between 10 attackers and 10 blockers """
+    GAME = in_main_phase(new_game())
+    attacker, defender = GAME.players_list
+    for i in range(10):
+        bears = attacker.battlefield.add("Grizzly Bears")
+        goblin = defender.battlefield.add("Mons's Goblin Raiders")
+        bears.attacks(defender)
+        goblin.blocks(bears)
+    return lambda: GAME.handle_combat_phase(gamesteps.Step.COMBAT_DAMAGE)
+
+
+@benchmark(number=100, repeat=10)
+def state_based_actions():
+    """ a state-based actions pass with every permanent of full battlefields marked dirty """
+    GAME = fill_battlefields(in_main_phase(new_game()))
+    permanents = [p for _player in GAME.players_list for p in _player.battlefield]
+
+    def run():
+        for p in permanents:
+            GAME.mark_dirty(p)
+        GAME.apply_state_based_actions()
+    return run
+
+
+@benchmark(number=2000, repeat=10)
+def mana_can_pay():
+    """ ManaPool.canPay on a cost with generic mana """
+    _player = new_game().players_list[0]
+    _player.autoPayMana = True
+    _player.mana.add(mana.Mana.RED, 2)
+    _player.mana.add(mana.Mana.GREEN, 2)
+    return lambda: _player.mana.canPay('2RG')
+
+
+@benchmark(number=1, repeat=5)
+def startup():
+    """ a new interpreter importing the engine, setting up the cards & reading a deck """
+    code = ("from MTG import cards; from MTG.utils import path_from_home; "
+            "cards.setup_cards(); cards.read_deck(path_from_home(%r))" % DECKS[0])
+    return lambda: subprocess.run([sys.executable, '-c', code], check=True)
+
+
+@benchmark(number=200, repeat=10)
+def read_deck():
+    """ cards.read_deck, cards already set up """
+    filename = path_from_home(DECKS[0])
+    return lambda: cards.read_deck(filename)
+
+
+@benchmark(number=1, repeat=10)
+def replay_recording():
+    """ three turns between random agents, recording a replay """
+    def run():
+        GAME = new_game(seed=1, agents=(agent.RandomAgent, agent.RandomAgent))
+        GAME.recording_replay = True
+        GAME.replay = replay.ReplayRecorder(GAME)
+        for i in range(3):
+            GAME.handle_turn()
+    return run
+
+
+@benchmark(number=20, repeat=10)
+def clone():
+    """ Game.clone of a game in progress (compare with deepcopy) """
+    return midgame().clone
+
+
+@benchmark(number=2, repeat=10)
+def deepcopy():
+    """ copy.deepcopy of the same game as clone """
+    GAME = midgame()
+    return lambda: copy.deepcopy(GAME)
+
+
+def run_benchmark(name, number=None, repeat=None):
+    """ returns {'best': seconds, 'median': seconds, 'number': ..., 'repeat': ...};
+    times are per operation
+    """
+    setup, default_number, default_repeat = BENCHMARKS[name]
+    number = number or default_number
+    repeat = repeat or default_repeat
+    times = []
+    with gamelog.muted():
+        for i in range(repeat):
+            func = setup()
+            start = time.perf_counter()
+            for j in range(number):
+                func()
+            times.append((time.perf_counter() - start) / number)
+    return {'best': min(times), 'median': statistics.median(times),
+            'number': number, 'repeat': repeat}
+
+
+def run_all(names=None, repeat=None, progress=None):
+    """ run the benchmarks (all of them by default); returns the results as a dict """
+    cards.setup_cards()
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = run_benchmark(name, repeat=repeat)
+        if progress:
+            progress(name, results[name])
+    return {
+        'version': RESULTS_FORMAT_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'benchmarks': results,
+    }
+
+
+def compare(old, new, threshold=0.1):
+    """ compare two results dicts; returns a list of
+    (name, old best, new best, ratio, status) with status one of
+    'regression', 'improvement', 'same', 'added' or 'removed'
+    """
+    old, new = old['benchmarks'], new['benchmarks']
+    rows = []
+    for name in list(old) + [n for n in new if n not in old]:
+        if name not in new:
+            rows.append((name, old[name]['best'], None, None, 'removed'))
+        elif name not in old:
+            rows.append((name, None, new[name]['best'], None, 'added'))
+        else:
+            before, after = old[name]['best'], new[name]['best']
+            ratio = after / before if before else float('inf')
+            if ratio > 1 + threshold:
+                status = 'regression'
+            elif ratio < 1 - threshold:
+                status = 'improvement'
+            else:
+                status = 'same'
+            rows.append((name, before, after, ratio, status))
+    return rows
+
+
+def _format_time(seconds):
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return '%.3g%s' % (seconds * scale, unit)
+    return '%.3gns' % (seconds * 1e9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine's hot paths")
+    parser.add_argument('benchmarks', nargs='*', help="benchmarks to run (default: all); "
+                                                      "choose from %s" % ', '.join(BENCHMARKS))
+    parser.add_argument('-o', '--output', default='benchmark.json', help="results file (JSON)")
+    parser.add_argument('-r', '--repeat', type=int, default=None,
+                        help="number of samples of each benchmark (default: per benchmark)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two results files instead of running the benchmarks")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown counted as a regression (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        rows = compare(old, new, args.threshold)
+        for name, before, after, ratio, status in rows:
+            print('%-22s %10s %10s %8s  %s' % (name, _format_time(before), _format_time(after),
+                                             '-' if ratio is None else 'x%.2f' % ratio, status))
+        return 1 if any(row[-1] == 'regression' for row in rows) else 0
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmarks: %s" % ', '.join(unknown))
+
+    def progress(name, result):
+        print('%-22s best %10s  median %10s' % (name, _format_time(result['best']),
+                                                _format_time(result['median'])))
+
+    results = run_all(args.benchmarks, args.repeat, progress)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
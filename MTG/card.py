@@ -1,9 +1,10 @@
 import traceback
 
 from MTG import gameobject
+from MTG import replay
 
 
-class Attributes():
+class Attributes(replay.Tracked):
     def __init__(self):
         # attributes goes here
         self.num_creatures_can_block = 1
@@ -11,6 +12,7 @@ class Attributes():
 
 class Card(gameobject.GameObject):
     triggers = {}
+    _clone_shared = gameobject.GameObject._clone_shared | {'attributes'}
 
     activated_abilities = []
 
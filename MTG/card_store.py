@@ -0,0 +1,214 @@
+"""Compiled card database
+
+Setting up the cards of a format means parsing its json
+(parser/formats/FORMAT.json), generating a class for each card
+(parser.parse_mtgjson) and turning the abilities defined in
+card_db/formats/FORMAT/define_effects.txt into setup code
+(cards.card_setup_source). The card store does all that once, and keeps the
+compiled results in card_db/formats/FORMAT/cards.store:
+
+    offset of the index (8 bytes)
+    the code of each card's class, marshaled one by one
+    the index:
+        {'version': (STORE_FORMAT_VERSION, python bytecode version),
+         'sources': digest of the json & effects files,
+         'cards': [(name, ID, digest of the card's json, offset, size)],
+         'effects': [(card name, digest of its definition, setup source, setup code)]}
+
+Loading a store only reads its index; the code of a card's class is read
+(and the class built, see cards.py) the first time the card is needed. As long
+as the source files don't change, nothing gets parsed or generated. When they
+do change, only the cards whose own definition changed get parsed & compiled
+again.
+"""
+
+import os
+import json
+import struct
+import marshal
+import hashlib
+import importlib.util
+
+from MTG.utils import path_from_home
+
+
+STORE_FORMAT_VERSION = 2
+
+# marshaled code objects can only be loaded by the python version that wrote them
+_VERSION = (STORE_FORMAT_VERSION, importlib.util.MAGIC_NUMBER)
+
+
+def _digest(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def store_path(format):
+    return path_from_home(f'card_db/formats/{format}/cards.store')
+
+
+def split_effect_definitions(text):
+    """ split define_effects.txt into (card name, lines defining the card) """
+    definitions = []
+    lines = []  # buffer
+    for line in text.split('\n'):
+        line = line.rstrip()
+        if not line:
+            continue
+
+        if line[:3] == '###':  # end of a card
+            if lines:
+                name = next((l.strip() for l in lines if l.lstrip()[:1] != '#'), None)
+                definitions.append((name, lines))
+            lines = []
+        else:
+            lines.append(line)
+
+    return definitions
+
+
+class CardStore():
+    """The compiled cards of a format (see module docstring)"""
+
+    def __init__(self, format, filename, index):
+        self.format = format
+        self.filename = filename
+        self.cards = index['cards']
+        self.effects = index['effects']
+
+        self.name_to_id = {name: ID for name, ID, _, _, _ in self.cards}
+        self._locations = {ID: (offset, size) for _, ID, _, offset, size in self.cards}
+        self._setup_code = {}  # card name -> list of setup code objects
+        for name, _, _, code in self.effects:
+            self._setup_code.setdefault(name, []).append(code)
+
+    def class_code(self, ID):
+        """ the code defining the class of card ID """
+        offset, size = self._locations[ID]
+        with open(self.filename, 'rb') as f:
+            f.seek(offset)
+            return marshal.loads(f.read(size))
+
+    def define_class(self, ID, namespace):
+        """ run the class definition of card ID in namespace; returns the class """
+        exec(self.class_code(ID), namespace)
+        return namespace[ID]
+
+    def setup_code(self, name):
+        """ the code setting up the abilities of a card """
+        return self._setup_code.get(name, [])
+
+    def setup_source(self):
+        return "".join(source + "\n" for _, _, source, _ in self.effects if source)
+
+
+def load(format, setup_source):
+    """ load the card store of a format, rebuilding whatever is out of date
+
+    setup_source: function turning the lines defining a card's abilities
+                  into setup code (cards.card_setup_source)
+    """
+    with open(path_from_home(f'parser/formats/{format}.json'), 'rb') as f:
+        json_data = f.read()
+    with open(path_from_home(f'card_db/formats/{format}/define_effects.txt'), 'rb') as f:
+        effects_data = f.read()
+    sources = _digest(json_data + b'\0' + effects_data)
+
+    filename = store_path(format)
+    old = _read_index(filename)
+    if old is not None and old['sources'] == sources:
+        return CardStore(format, filename, old)
+
+    blobs, effects = build(format, json_data, effects_data.decode('utf-8'), setup_source,
+                           old, filename)
+    index = _write(filename, {'version': _VERSION, 'sources': sources, 'effects': effects}, blobs)
+    store = CardStore(format, filename, index)
+
+    with open(path_from_home(f'card_db/formats/{format}/cards_setup.log'), 'w') as f_log:
+        f_log.write(store.setup_source())
+
+    return store
+
+
+def build(format, json_data, effects_text, setup_source, old=None, old_filename=None):
+    """ compile a format's cards, reusing whatever hasn't changed from the old store
+
+    returns ([(name, ID, digest, marshaled class code)], effects)
+    """
+    from parser.parse_mtgjson import card_class_source
+
+    old_cards = {digest: (ID, offset, size) for _, ID, digest, offset, size in old['cards']} if old else {}
+    old_effects = {digest: (source, code) for _, digest, source, code in old['effects']} if old else {}
+    old_file = open(old_filename, 'rb') if old_cards else None
+
+    blobs = []
+    names = set()
+    try:
+        for _set in json.loads(json_data.decode('utf-8')).values():
+            for card in _set['cards']:
+                if card["name"] in names:  # already parsed card (ignore reprints)
+                    continue
+                names.add(card["name"])
+
+                digest = _digest(json.dumps(card, sort_keys=True))
+                if digest in old_cards:
+                    ID, offset, size = old_cards[digest]
+                    old_file.seek(offset)
+                    blob = old_file.read(size)
+                else:
+                    ID, name, source = card_class_source(card)
+                    blob = marshal.dumps(compile(source, f'<{format} card {ID}>', 'exec'))
+                blobs.append((card["name"], ID, digest, blob))
+    finally:
+        if old_file:
+            old_file.close()
+
+    effects = []
+    for name, lines in split_effect_definitions(effects_text):
+        digest = _digest('\n'.join(lines))
+        if digest in old_effects:
+            source, code = old_effects[digest]
+        else:
+            source = setup_source(lines)
+            code = compile(source, f'<{format} card setup: {name}>', 'exec')
+        effects.append((name, digest, source, code))
+
+    return blobs, effects
+
+
+_HEADER = struct.Struct('<Q')  # offset of the index
+
+
+def _read_index(filename):
+    """ the index of a store file, or None if it's missing or outdated """
+    try:
+        with open(filename, 'rb') as f:
+            offset, = _HEADER.unpack(f.read(_HEADER.size))
+            f.seek(offset)
+            index = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+
+    if not isinstance(index, dict) or index.get('version') != _VERSION:
+        return None
+    return index
+
+
+def _write(filename, index, blobs):
+    """ write the class code blobs, then the index; returns the index """
+    index['cards'] = []
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(0))
+        for name, ID, digest, blob in blobs:
+            index['cards'].append((name, ID, digest, f.tell(), len(blob)))
+            f.write(blob)
+
+        offset = f.tell()
+        marshal.dump(index, f)
+        f.seek(0)
+        f.write(_HEADER.pack(offset))
+
+    os.replace(tmp, filename)  # never leave a half-written store behind
+    return index
@@ -1,36 +1,30 @@
+import os
 import sys
-import pickle
 import math
 import re
 from collections import namedtuple
 
-from card_db.formats.MTGRL.cards import *
-
 from MTG.exceptions import DeckListFormatException, CardNotImplementedException
 from MTG import abilities
 from MTG import triggers
 from MTG import mana
 from MTG import utils
-from MTG.utils import path_from_home
 from MTG import permanent
+from MTG import card_store
+from MTG import gamelog
 
 
 SETPREFIX = ['MTGRL']
 name_to_id_dict = {}
 id_to_name_dict = {}
+card_stores = {}  # format -> card_store.CardStore; loaded at the end of this module
+id_to_format = {}
 
-# compile all the dictionaries from different parsed sets
-for constructed_format in SETPREFIX:
-    try:
-        with open(path_from_home(f'card_db/formats/{constructed_format}/name_to_id_dict.pkl'), 'rb') as f:
-            loaded_dict = pickle.load(f)
-            name_to_id_dict.update(loaded_dict)
-    except Exception as e:
-        print(e)
-        print(f"{constructed_format} name_to_id_dict file not found\n")
-
+# card classes are only built when first needed (see _define_card_class),
+# all in this namespace, which has what the generated class definitions import
+_class_namespace = None
 
-id_to_name_dict = {value: key for key, value in name_to_id_dict.items()}
+formats_set_up = set()  # setup_cards() must only run once per format
 
 
 def id_to_name(ID):
@@ -45,6 +39,32 @@ def str_to_class(str):
     return getattr(sys.modules[__name__], str)
 
 
+def _define_card_class(ID):
+    """ build the class of card ID from its format's card store, and cache it
+    in this module; the card's abilities are set up too if its format is """
+    global _class_namespace
+    if _class_namespace is None:
+        from parser.parse_mtgjson import MODULE_HEADER
+        _class_namespace = {'__name__': __name__}  # for pickling
+        exec(MODULE_HEADER, _class_namespace)
+
+    store = card_stores[id_to_format[ID]]
+    cls = store.define_class(ID, _class_namespace)
+    globals()[ID] = cls
+
+    if store.format in formats_set_up:
+        for code in store.setup_code(id_to_name(ID)):
+            exec(code, globals())
+    return cls
+
+
+def __getattr__(name):
+    # card classes that haven't been built yet
+    if name in id_to_format:
+        return _define_card_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def card_from_name(name, get_instance=True):
     ID = name_to_id(name)
     if ID is not None:
@@ -94,6 +114,7 @@ def add_activated_ability(cardname, cost, effect, target_criterias=None, prompts
     is_mana_ability = 'mana.add' in effect
 
     costs = utils.parse_ability_costs(cost)
+    cost_checks = utils.parse_ability_cost_checks(cost)
 
     if not card.activated_abilities:  # hasn't been initiated yet
         card.activated_abilities = []
@@ -103,8 +124,12 @@ def add_activated_ability(cardname, cost, effect, target_criterias=None, prompts
     else:
         target_criterias = None
 
+    # compile now rather than on first activation
+    for source in (costs, cost_checks, effect):
+        abilities.compiled(source)
+
     # same signature as abilities.ActivatedAbilities.init
-    card.activated_abilities.append((costs, effect, target_criterias, prompts, is_mana_ability))
+    card.activated_abilities.append((costs, effect, target_criterias, prompts, is_mana_ability, cost_checks))
 
 
 def add_targets(cardname, criterias=[lambda self, p: True], prompts=None):
@@ -159,6 +184,7 @@ def add_aura_effect(cardname, effects, target_criterias=['creature']):
     # add aura enchant effects
     card = card_from_name(cardname, get_instance=False)
     card.continuous_effects = effects
+    permanent.compiled(effects)
 
 def add_trigger(cardname, condition, effect, requirements=None,
                 target_criterias=None, target_prompts=None, intervening_if=None):
@@ -198,6 +224,7 @@ def add_trigger(cardname, condition, effect, requirements=None,
     # each element in the dict is a list of triggers, since there could be multiple abilities
     # that trigger from the same effect, e.g. tap AND draw a card on etb
     # each of them will go into a separate play.Play object and be put onto the stack
+    abilities.compiled(effect)
     card.triggers[condition].append((effect, requirements,
                                      target_criterias, target_prompts, intervening_if))
 
@@ -231,6 +258,16 @@ def parse_card_from_lines(lines, log=None):
     
     Each set of lines correspond to all abilities/effects of a single card
     """
+    str_to_exe = card_setup_source(lines)
+
+    if log and str_to_exe:
+        log.write(str_to_exe + "\n")
+
+    exec(str_to_exe)
+
+
+def card_setup_source(lines):
+    """ The code setting up a card's abilities/effects (see parse_card_from_lines) """
     stage = 'new card'
     substage = ''
     name = ''
@@ -429,36 +466,61 @@ def parse_card_from_lines(lines, log=None):
             str_to_exe += "add_static_effect({}, {}, {}, {}, {})\n".format(name,
                                             *eff)
 
-    if log and str_to_exe:
-        log.write(str_to_exe + "\n")
-
-    exec(str_to_exe)
+    return str_to_exe
 
 
 def setup_cards(format='MTGRL'):
     """
     Set up the classes needed to play a game in the given format
 
-    Read cards information from card_db/formats/{format}/define_effects.txt
-    Logs to card_db/formats/{format}/cards_setup.log
+    Card abilities are defined in card_db/formats/{format}/define_effects.txt;
+    they get parsed and compiled by the card store (see card_store.py), which
+    also logs the setup code to card_db/formats/{format}/cards_setup.log
 
     :param format: Name of the constructed format that should be loaded
 
     """
+    if format in formats_set_up:
+        return
+    formats_set_up.add(format)
 
-    f_log = open(f'card_db/formats/{format}/cards_setup.log', 'w')
+    # cards whose class isn't built yet will be set up when it is
+    store = card_stores[format]
+    for name, ID in store.name_to_id.items():
+        if ID in globals():
+            for code in store.setup_code(name):
+                exec(code, globals())
 
-    effects_definition_file = path_from_home(f'card_db/formats/{format}/define_effects.txt')
-    with open(effects_definition_file, 'r') as f:
-        lines = []  # buffer
 
-        for line in f:
-            line = line.rstrip()
-            if not line:
-                continue
+def _load_card_store(format):
+    """ the card store of a format; if it can't be loaded, it's rebuilt from
+    scratch once (the store file may be damaged) -- if that fails too, the
+    error is raised, rather than going on without the format's cards
+    """
+    try:
+        return card_store.load(format, card_setup_source)
+    except Exception as e:
+        gamelog.warning('cards', "{format} card store could not be loaded ({error}), rebuilding it",
+                        format=format, error=e)
 
-            if line[:3] == '###':  # end of a card
-                parse_card_from_lines(lines, f_log)
-                lines = []
-            else:  # wait to parse cards until we've read in all information about a card
-                lines.append(line)
\ No newline at end of file
+    try:
+        os.remove(card_store.store_path(format))
+    except OSError:
+        pass
+    try:
+        return card_store.load(format, card_setup_source)
+    except Exception as e:
+        gamelog.error('cards', "{format} card store could not be built: {error}",
+                      format=format, error=e)
+        raise
+
+
+# compile all the dictionaries & card classes from different formats
+for constructed_format in SETPREFIX:
+    card_stores[constructed_format] = _load_card_store(constructed_format)
+    name_to_id_dict.update(card_stores[constructed_format].name_to_id)
+    id_to_format.update(dict.fromkeys(card_stores[constructed_format].name_to_id.values(),
+                                      constructed_format))
+
+
+id_to_name_dict = {value: key for key, value in name_to_id_dict.items()}
@@ -0,0 +1,181 @@
+"""Fast copies of whole games (see Game.clone)
+
+copy.deepcopy can copy a game, but it goes through __reduce_ex__ and the
+__getstate__/__setstate__ hooks of every object, and copies everything it
+finds -- too slow for search, which copies the game thousands of times per
+decision. clone() knows what a game is made of:
+
+- immutable values (numbers, strings, enums, functions, classes...) are shared
+- lists, tuples, dicts, sets & sorted lists are copied item by item
+- bound methods are bound to the copy of their object
+- game classes (the ones with a _clone_shared attribute) are copied
+  attribute by attribute, except for the attributes listed in _clone_shared,
+  which are shared (e.g. the characteristics of cards: card definitions don't
+  change during a game). A class can also define _clone(memo) to do more
+  (e.g. zones re-key their indexes).
+- anything else (agents, ...) goes through copy.deepcopy
+
+memo maps id(original) -> copy, as for deepcopy (and is shared with it).
+"""
+
+import copy
+import types
+import random
+from enum import Enum
+from collections import defaultdict
+
+from sortedcontainers import SortedKeyList
+
+
+def clone(obj, memo):
+    """ copy obj & everything it refers to (see module docstring) """
+    cls = obj.__class__
+    if cls in _shared_types:
+        return obj
+    c = memo.get(id(obj))
+    if c is None:
+        handler = _handlers.get(cls)
+        if handler is None:
+            handler = _handler(cls)
+        c = handler(obj, memo)
+    return c
+
+
+_shared_attrs = {}  # class -> its _clone_shared attributes, as a frozenset
+
+
+def clone_object(obj, memo, skip=()):
+    """ copy a game object, attribute by attribute; skip: attributes left out of the copy """
+    c = memo.get(id(obj))
+    if c is not None:
+        return c
+
+    cls = obj.__class__
+    c = memo[id(obj)] = cls.__new__(cls)
+    state = obj.__dict__
+    d = c.__dict__
+    # share everything first, so the copy can already be hashed (object_id)
+    # if it's met again while copying its own attributes
+    d.update(state)
+    shared = _shared_attrs.get(cls)
+    if shared is None:
+        shared = _shared_attrs[cls] = frozenset(getattr(cls, '_clone_shared', ()))
+    if skip:
+        for attr in skip:
+            d.pop(attr, None)
+        shared = shared | frozenset(skip)
+
+    # clone(value, memo), inlined: this is where copies spend their time
+    memo_get = memo.get
+    shared_types = _shared_types
+    for attr, value in state.items():
+        if value.__class__ in shared_types or attr in shared:
+            continue
+        value_copy = memo_get(id(value))
+        if value_copy is None:
+            value_cls = value.__class__
+            if value_cls is defaultdict and not value:  # e.g. effects
+                value_copy = memo[id(value)] = defaultdict(value.default_factory)
+            elif value_cls is list and not value:  # e.g. auras, is_blocking...
+                value_copy = memo[id(value)] = []
+            else:
+                handler = _handlers.get(value_cls)
+                if handler is None:
+                    handler = _handler(value_cls)
+                value_copy = handler(value, memo)
+        d[attr] = value_copy
+    return c
+
+
+
+def _share(obj, memo):
+    return obj
+
+
+def _clone_list(obj, memo):
+    c = memo[id(obj)] = []
+    c.extend([v if v.__class__ in _shared_types else clone(v, memo) for v in obj])
+    return c
+
+
+def _clone_tuple(obj, memo):  # & frozensets
+    items = [v if v.__class__ in _shared_types else clone(v, memo) for v in obj]
+    # tuples of shared values can be shared too
+    c = memo[id(obj)] = obj if all(v is w for v, w in zip(items, obj)) else obj.__class__(items)
+    return c
+
+
+def _clone_dict(obj, memo):
+    c = memo[id(obj)] = {} if obj.__class__ is dict else obj.__class__(obj.default_factory)
+    for k, v in obj.items():
+        if k.__class__ not in _shared_types:
+            k = clone(k, memo)
+        c[k] = v if v.__class__ in _shared_types else clone(v, memo)
+    return c
+
+
+def _clone_set(obj, memo):
+    c = memo[id(obj)] = set()
+    c.update([clone(v, memo) for v in obj])
+    return c
+
+
+def _clone_sorted_list(obj, memo):
+    c = memo[id(obj)] = SortedKeyList(key=obj.key)
+    if obj:
+        c.update([clone(v, memo) for v in obj])
+    return c
+
+
+def _clone_method(obj, memo):
+    return types.MethodType(obj.__func__, clone(obj.__self__, memo))
+
+
+def _clone_random(obj, memo):
+    # not random.Random(): it would seed itself from the OS first
+    c = memo[id(obj)] = random.Random.__new__(random.Random)
+    c.setstate(obj.getstate())
+    return c
+
+
+def _clone_with_method(obj, memo):
+    return obj._clone(memo)
+
+
+def _deepcopy(obj, memo):
+    return copy.deepcopy(obj, memo)
+
+
+# values of these types are never copied (enums are added as they're met)
+_shared_types = {type(None), bool, int, float, complex, str, bytes, range, type,
+                 types.FunctionType, types.BuiltinFunctionType, types.CodeType,
+                 types.ModuleType}
+
+_handlers = {
+    list: _clone_list,
+    tuple: _clone_tuple,
+    dict: _clone_dict,
+    defaultdict: _clone_dict,
+    set: _clone_set,
+    frozenset: _clone_tuple,
+    SortedKeyList: _clone_sorted_list,
+    types.MethodType: _clone_method,
+    random.Random: _clone_random,
+}
+
+
+def _handler(cls):
+    """ the function copying objects of class cls: handler(obj, memo) """
+    handler = _handlers.get(cls)
+    if handler is None:
+        if cls in _shared_types or issubclass(cls, Enum):
+            _shared_types.add(cls)
+            handler = _share
+        elif hasattr(cls, '_clone'):
+            handler = _clone_with_method
+        elif hasattr(cls, '_clone_shared'):
+            handler = clone_object
+        else:
+            handler = _deepcopy
+        _handlers[cls] = handler
+    return handler
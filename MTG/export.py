@@ -0,0 +1,302 @@
+"""Headless export of replays to image sequences, videos and thumbnails
+
+    python -m MTG.export archive/*.pkl -o exported/ --format png -j 8
+    python -m MTG.export game.pkl -o exported/ --format mp4 --fps 4
+
+For each replay, exported/<replay name>/ gets every step as frame_000001.png,
+frame_000002.png... (--format png), or exported/<replay name>.mp4 (--format
+mp4, encoded by ffmpeg, which has to be installed); exported/<replay
+name>.thumb.png is a small picture of the last step.
+
+Frames are drawn the way the replay viewer draws them (rendering.py), on an
+offscreen surface with SDL's dummy video driver, so no display is needed.
+Drawing is spread over a multiprocessing pool: each task is a chunk of
+consecutive steps, which the worker rebuilds and draws one after the other
+(only redrawing what changed, see rendering.FrameRenderer) and returns
+encoded. The main process writes the frames in order as they come; at most
+--pending chunks are in flight at a time, so memory stays bounded however long
+the replays are.
+
+Workers load card images through their own rendering.IMAGES, from the shared
+disk cache (see image_cache.py): the main process fetches the images of each
+replay there first.
+"""
+
+import io
+import os
+import sys
+import signal
+import argparse
+import subprocess
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from MTG import gamelog
+
+
+FORMATS = ('png', 'mp4')
+
+DEFAULT_SIZE = (1440, 810)
+THUMBNAIL_WIDTH = 320
+
+
+def _setup_pygame(size):
+    """ pygame without a display: the dummy video driver, and a display mode
+    (some of the drawing converts surfaces to its format)
+
+    SDL's handlers of SIGINT and SIGTERM only queue a quit event, that no worker
+    ever reads: a worker with them wouldn't stop when its pool terminates it.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+    import pygame
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+    pygame.init()
+    for signum, handler in handlers.items():  # in case this SDL ignores SDL_NO_SIGNAL_HANDLERS
+        signal.signal(signum, handler)
+    pygame.display.set_mode(size)
+    return pygame
+
+
+def _encode(pygame, surface, fmt):
+    """ a frame as bytes: a PNG file, or raw RGB pixels (for the video encoder) """
+    if fmt == 'png':
+        f = io.BytesIO()
+        pygame.image.save(surface, f, 'frame.png')
+        return f.getvalue()
+    return pygame.image.tostring(surface, 'RGB')
+
+
+_worker = {}  # what a worker keeps between tasks, see _init_worker
+
+
+def _init_worker(size, image_dir, offline):
+    from MTG import cards
+    from MTG import rendering
+    from MTG.image_cache import ImageCache
+
+    cards.setup_cards()
+    gamelog.configure(gamelog.ConsoleSink(gamelog.WARNING))  # e.g. images that can't be loaded
+    _worker['pygame'] = _setup_pygame(size)
+    _worker['size'] = size
+    rendering.IMAGES = ImageCache(local_dir=image_dir, offline=offline)
+    _worker['replay'] = (None, None)  # (filename, replay) of the last replay drawn
+
+
+def _open_replay(filename):
+    """ the replay in filename, kept open (with its images loaded) for the next chunks """
+    from MTG import replay
+    from MTG import rendering
+
+    last_filename, last_replay = _worker['replay']
+    if last_filename != filename:
+        if hasattr(last_replay, 'close'):
+            last_replay.close()
+        last_replay = replay.load_replay(filename)
+        rendering.prefetch_replay_images(last_replay)
+        _worker['replay'] = (filename, last_replay)
+    return last_replay
+
+
+def render_chunk(task):
+    """ draw steps [start, stop) of a replay; returns the list of their frames, encoded
+
+    task: (replay filename, start, stop, format)
+    """
+    from MTG import rendering
+
+    filename, start, stop, fmt = task
+    pygame = _worker['pygame']
+    replay = _open_replay(filename)
+
+    surface = pygame.Surface(_worker['size'])
+    renderer = rendering.FrameRenderer(surface)
+    frames = []
+    for step in range(start, stop):
+        renderer.draw(replay[step])
+        frames.append(_encode(pygame, surface, fmt))
+    return frames
+
+
+def render_thumbnail(filename, width=THUMBNAIL_WIDTH):
+    """ the last step of a replay, scaled down to width, as a PNG file's bytes """
+    from MTG import rendering
+
+    pygame = _worker['pygame']
+    replay = _open_replay(filename)
+    surface = pygame.Surface(_worker['size'])
+    rendering.render_gamestate_frame(replay[-1], surface)
+
+    height = round(surface.get_height() * width / surface.get_width())
+    return _encode(pygame, pygame.transform.smoothscale(surface, (width, height)), 'png')
+
+
+def chunks(num_steps, chunk_size):
+    """ (start, stop) of each chunk of steps """
+    return [(start, min(start + chunk_size, num_steps)) for start in range(0, num_steps, chunk_size)]
+
+
+def ordered_map(pool, func, tasks, max_pending):
+    """ pool.map(func, tasks), lazily and in order, with at most max_pending
+    tasks submitted and not yet consumed at any time
+    """
+    pending = deque()
+    for task in tasks:
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(func, (task,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+class ImageSequenceSink():
+    """ writes PNG frames as directory/frame_000001.png, frame_000002.png... """
+    fmt = 'png'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame):
+        self.count += 1
+        with open(os.path.join(self.directory, 'frame_%06d.png' % self.count), 'wb') as f:
+            f.write(frame)
+
+    def close(self):
+        pass
+
+
+class VideoSink():
+    """ pipes raw RGB frames to a video encoder (ffmpeg by default) """
+    fmt = 'rgb'
+
+    def __init__(self, filename, size, fps=2, command=None):
+        self.filename = filename
+        self.count = 0
+        if command is None:
+            command = ['ffmpeg', '-loglevel', 'error', '-y',
+                       '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '%dx%d' % size, '-r', str(fps),
+                       '-i', '-', '-pix_fmt', 'yuv420p', filename]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.count += 1
+        self.process.stdin.write(frame)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError("Video encoder failed on %s" % self.filename)
+
+
+def _close(replay):
+    if hasattr(replay, 'close'):
+        replay.close()
+
+
+def prefetch_images(filenames, image_dir=None, offline=False):
+    """ get the card images of the replays in the disk cache, for the workers to find """
+    from MTG import replay
+    from MTG import rendering
+    from MTG.image_cache import ImageCache
+
+    urls = set()
+    for filename in filenames:
+        _replay = replay.load_replay(filename)
+        urls |= rendering.replay_image_urls(_replay)
+        _close(_replay)
+
+    images = ImageCache(local_dir=image_dir, offline=offline)
+    with ThreadPoolExecutor(images.workers) as executor:
+        list(executor.map(images.load_bytes, urls))
+
+
+def export_replay(pool, filename, output_dir, fmt='png', size=DEFAULT_SIZE, fps=2,
+                  chunk_size=50, max_pending=8, thumbnail=True):
+    """ export a replay with the workers of pool (see _init_worker); returns the number of frames """
+    from MTG import replay
+
+    _replay = replay.load_replay(filename)
+    num_steps = len(_replay)
+    _close(_replay)
+
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if fmt == 'png':
+        sink = ImageSequenceSink(os.path.join(output_dir, name))
+    else:
+        sink = VideoSink(os.path.join(output_dir, name + '.' + fmt), size, fps)
+
+    tasks = ((filename, start, stop, sink.fmt) for start, stop in chunks(num_steps, chunk_size))
+    try:
+        for frames in ordered_map(pool, render_chunk, tasks, max_pending):
+            for frame in frames:
+                sink.write(frame)
+    finally:
+        sink.close()
+
+    if thumbnail and num_steps:
+        with open(os.path.join(output_dir, name + '.thumb.png'), 'wb') as f:
+            f.write(pool.apply(render_thumbnail, (filename,)))
+
+    return sink.count
+
+
+def export_replays(filenames, output_dir, processes=None, image_dir=None, offline=False,
+                   size=DEFAULT_SIZE, **kwargs):
+    """ export every replay of filenames (see export_replay) with one pool of workers;
+    yields (filename, number of frames) as each replay is done
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    prefetch_images(filenames, image_dir, offline)
+
+    # spawned workers: each sets up its own pygame, none inherits the parent's SDL state
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes, initializer=_init_worker, initargs=(size, image_dir, offline)) as pool:
+        for filename in filenames:
+            yield filename, export_replay(pool, filename, output_dir, size=size, **kwargs)
+        # let the workers finish and exit: leaving the with block would terminate them
+        pool.close()
+        pool.join()
+
+
+def _parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export replays to image sequences or videos, "
+                                                 "without a display")
+    parser.add_argument('replays', nargs='+', help="replay files")
+    parser.add_argument('-o', '--output', default='exported', help="output directory")
+    parser.add_argument('--format', choices=FORMATS, default='png',
+                        help="png: a directory of frames per replay; mp4: a video (needs ffmpeg)")
+    parser.add_argument('--fps', type=float, default=2, help="steps per second, for videos")
+    parser.add_argument('--size', type=_parse_size, default=DEFAULT_SIZE, help="frame size, e.g. 1440x810")
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help="rendering workers (default: one per CPU)")
+    parser.add_argument('--chunk', type=int, default=50, help="steps per rendering task")
+    parser.add_argument('--pending', type=int, default=None,
+                        help="rendering tasks in flight at most (default: twice the workers)")
+    parser.add_argument('--no-thumbnails', action='store_true', help="don't write thumbnails")
+    parser.add_argument('--images', default=None, help="local directory of card images")
+    parser.add_argument('--offline', action='store_true', help="don't fetch images from the network")
+    args = parser.parse_args(argv)
+
+    gamelog.configure(gamelog.ConsoleSink(gamelog.INFO))
+    processes = args.processes or os.cpu_count() or 1
+    exported = export_replays(args.replays, args.output, processes=processes,
+                              image_dir=args.images, offline=args.offline, size=args.size,
+                              fmt=args.format, fps=args.fps, chunk_size=args.chunk,
+                              max_pending=args.pending or 2 * processes,
+                              thumbnail=not args.no_thumbnails)
+    for filename, num_frames in exported:
+        gamelog.info('export', "Exported {filename}: {frames} frames", filename=filename, frames=num_frames)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,9 @@
 import sys
 import os
 import traceback
-import time
 import pdb
-import copy
+import heapq
+import random
 
 from MTG import player
 from MTG import zone
@@ -11,20 +11,51 @@ from MTG import cards
 from MTG import gamesteps
 from MTG import combat
 from MTG import triggers
+from MTG import agent
+from MTG import gamelog
+from MTG import cloning
 from MTG.exceptions import *
 from MTG.utils import path_from_home
 
 
+# (condition, controller only) of the triggers of a permanent entering the battlefield
+ETB_TRIGGERS = ((triggers.triggerConditions.onControllerPermanentEtB, True),
+                (triggers.triggerConditions.onPermanentEtB, False))
+ETB_CREATURE_TRIGGERS = ETB_TRIGGERS + (
+    (triggers.triggerConditions.onControllerCreatureEtB, True),
+    (triggers.triggerConditions.onCreatureEtB, False))
+
+
 class Game(object):
     """A game object. This represents the entire state of an in-progress MTG game.
 
     """
 
     # Give each player their deck.
-    def __init__(self, decks, test=False):
+    def __init__(self, decks, test=False, seed=None, stats=None):
+        """ seed: seeds every random event of the game (e.g. shuffling);
+        two games with the same decks, seed and decisions are identical
+        stats: a gamestats.GameStats to profile the game with (see gamestats.py)
+        """
+        self.stats = None
+        self.rng = random.Random(seed)
+        self.clock = 0  # logical clock, see new_timestamp
+        self.next_object_id = 0
+        # objects state-based actions have to look at (see apply_state_based_actions);
+        # dicts of obj -> None, to keep them in order
+        self.sba_dirty = {}
+        self.sba_watched = {}
+        # heap of (expiration, n, permanent, effect name, effect), see schedule_expiration
+        self.effect_expirations = []
+        self.expirations_scheduled = 0
+        # trigger_subscribers[condition] = dict of permanent -> None (in order),
+        # the permanents on the battlefield with a player-init trigger for condition
+        self.trigger_subscribers = {}
+        self.step_start = 0  # value of the clock when the current step started
         self.stack = zone.Stack()
         self.stack.game = self
         self.passed_priority = 0
+        self.priority = 0  # index of the player holding priority, see resume_turn
         self.step = None
         self.pending_turns = []
         self.pending_steps = []
@@ -38,12 +69,14 @@ class Game(object):
         # self.previous_state = GAME_PREVIOUS_STATE
         self.recording_replay = False
         self.replay = None
+        self.stats = stats  # set last: setting up the decks isn't part of the game
 
     def __getstate__(self):
 
         state = self.__dict__.copy()
         state["recording_replay"] = False
         state["replay"] = None
+        state["stats"] = None  # statistics stay with the running game
 
         return state
 
@@ -53,11 +86,49 @@ class Game(object):
         self.recording_replay = False
         self.replay = None
 
-    @property
-    def timestamp(self):
+    def clone(self, memo=None):
+        """ a copy of the game, e.g. to look ahead without changing this game
+
+        Much faster than copy.deepcopy: only the state of the game gets copied,
+        card definitions & compiled abilities are shared (see cloning.py).
+        The copy doesn't record a replay.
+        memo: if given, filled with id(object of this game) -> its copy
+        """
+        return cloning.clone(self, {} if memo is None else memo)
+
+    def _clone(self, memo):
+        new = cloning.clone_object(self, memo, skip=('replay', 'stats'))
+        new.recording_replay = False
+        new.replay = None
+        new.stats = None
+        return new
+
+    def new_object_id(self):
+        """ a new id for an object of this game (see GameObject.object_id) """
+        self.next_object_id += 1
+        return self.next_object_id
+
+    def _time(self, n):
         return (self.turn_num * 100
-                + self.step._value_
-                + time.time() % 10**4 / 10**4)  # this is a float less than 1
+                + (self.step._value_ if self.step else 0)
+                + n / (n + 1))
+
+    @property
+    def now(self):
+        """ the current time: the last timestamp taken (or the start of the
+        current step, if none was taken since); reading it takes no timestamp
+        """
+        return self._time(self.clock - self.step_start)
+
+    def new_timestamp(self):
+        """ a new, strictly increasing timestamp, for an object or effect that needs one
+
+        turn * 100 + step, plus a fraction (less than 1) that grows with every
+        timestamp taken during the step -- so timestamps can still be compared
+        with eot_time (objects created before the first step get step 0)
+        """
+        self.clock += 1
+        return self._time(self.clock - self.step_start)
 
     @property
     def eot_time(self):
@@ -84,16 +155,58 @@ class Game(object):
         for p in self.players_list:
             p.add_static_effect(name, value, source, toggle_func)
 
-    def trigger(self, condition, source=None, amount=1):
-        for p in self.players_list:
-            p.trigger(condition, source, amount)
+    def subscribe(self, permanent):
+        """ permanent entered the battlefield: pass it the events it has triggers for """
+        for condition in permanent.trigger_listeners:
+            if condition._value_ > 1000:  # player-initiated trigger
+                self.trigger_subscribers.setdefault(condition, {})[permanent] = None
+
+    def unsubscribe(self, permanent):
+        """ permanent left the battlefield """
+        for condition in permanent.trigger_listeners:
+            subscribers = self.trigger_subscribers.get(condition)
+            if subscribers and permanent in subscribers:
+                del subscribers[permanent]
+                if not subscribers:
+                    del self.trigger_subscribers[condition]
+
+    def trigger(self, condition, source=None, amount=1, controller=None):
+        """ pass a player-init trigger (e.g. onLifeGain) to the permanents listening to it
+
+        controller: only pass it to the permanents controlled by this player
+                    (e.g. onControllerLifeGain, see Player.trigger)
+        """
+        if isinstance(condition, str):
+            condition = triggers.triggerConditions[condition]
+
+        subscribers = self.trigger_subscribers.get(condition)
+        if not subscribers:
+            return
+        # make copy since triggering can change the battlefield
+        for p in list(subscribers):
+            if controller is None or p.controller is controller:
+                p.trigger(condition, source, amount)
+
+    def trigger_etb(self, permanent):
+        """ all the triggers of permanent entering the battlefield """
+        permanent.trigger(triggers.triggerConditions.onEtB, permanent)
+        if not self.trigger_subscribers:
+            return
+        for condition, controller_only in (ETB_CREATURE_TRIGGERS if permanent.is_creature
+                                           else ETB_TRIGGERS):
+            self.trigger(condition, permanent,
+                         controller=permanent.controller if controller_only else None)
 
 
     def apply_stack_item(self, stack_item):
         """ resolving a spell/effect from stack, removing it from the stack """
-        print(stack_item)
+        gamelog.info('resolve', "{item}", item=stack_item)
+        if self.stats is not None:
+            start = self.stats.clock()
         stack_item.apply()
         self.stack.remove(stack_item)
+        if self.stats is not None:
+            self.stats.add_time('resolve', self.stats.clock() - start)
 
 
     def apply_to_zone(self, apply_func, _zone, condition=lambda p: True):
@@ -118,106 +231,135 @@ class Game(object):
         return self.apply_to_zone(apply_func, zone.ZoneType.BATTLEFIELD, condition)
 
 
-    # TODO
+    def mark_dirty(self, obj):
+        """ obj changed in a way that may cause a state-based action
+
+        (it entered/left a zone, took damage, got counters...)
+        """
+        self.sba_dirty[obj] = None
+
+    def watch(self, permanent):
+        """ look at permanent every time state-based actions are checked, for as
+        long as it has effects that can expire/toggle whenever the game changes
+        (see Permanent.check_effect_expiration) """
+        self.sba_watched[permanent] = None
+
+    def schedule_expiration(self, permanent, name, effect):
+        """ end effect (on permanent) once the game's time is past effect.expiration """
+        self.expirations_scheduled += 1  # ties are broken in scheduling order
+        heapq.heappush(self.effect_expirations,
+                       (effect.expiration, self.expirations_scheduled, permanent, name, effect))
+
+    def expire_effects(self):
+        """ end the scheduled effects whose time has come; returns True if any did """
+        did_something = False
+        time = self.now
+        while self.effect_expirations and self.effect_expirations[0][0] <= time:
+            _, _, permanent, name, effect = heapq.heappop(self.effect_expirations)
+            if permanent.remove_effect(name, effect):
+                gamelog.debug('effect', "{effect} has expired (time)", effect=effect)
+                did_something = True
+        return did_something
+
     def apply_state_based_actions(self):
-        # iterate through cards that could possibly cause a state-based action
-        _any_action = False
-        def any_action():
-            nonlocal _any_action
-            _any_action = True
-
-        self.apply_to_battlefield(
-            lambda p: any_action() if p.zone.remove(p) else None,
-            lambda p: p.is_token and not p.zone.is_battlefield)
-
-        self.apply_to_battlefield(
-            lambda p: any_action() if p.check_effect_expiration() else None)
-
-        self.apply_to_battlefield(
-            lambda p: any_action() if p.destroy() else None,
-            lambda p: p.is_creature and
-                      p.status.damage_taken >= p.toughness)
-
-        self.apply_to_battlefield(
-            lambda p: any_action() if p.change_zone(p.owner.graveyard) else None,
-            lambda p: p.is_aura and
-                      p.enchant_target is None)
-
-        # check for player death
-        for _player in self.players_list:
-            if _player.life <= 0:
-                _player.lose()
-            if _player.lost:  # TODO: PROBLEM with multiplayer -- maybe skip over rest of turn / destroy all cards owned by that player?
-                any_action()
-                self.players_list.remove(_player)
-                self.num_players -= 1
-
-        if self.num_players <= 1:
-            raise GameOverException
-
-        if _any_action:
-            print("Applying state based actions")
-            self.apply_state_based_actions()
+        """ apply state-based actions until there are none left to apply
+
+        Only the objects marked dirty since the last check, and the permanents
+        being watched, can cause a state-based action: the rest of the
+        battlefield is left alone.
+        """
+        while True:
+            if self.stats is not None:
+                self.stats.count('sba_passes')
+            any_action = False
+            objects = list(self.sba_dirty)
+            objects.extend(p for p in self.sba_watched if p not in self.sba_dirty)
+            self.sba_dirty = {}
+
+            # tokens that left the battlefield cease to exist
+            for p in objects:
+                if p.is_token and p.zone is not None and not p.zone.is_battlefield:
+                    any_action |= p.zone.remove(p)
+
+            if self.expire_effects():
+                any_action = True
+                objects.extend(p for p in self.sba_dirty if p not in objects)
+                self.sba_dirty = {}
+
+            for p in [p for p in self.sba_watched if not p.is_permanent or not p.polled_effects]:
+                del self.sba_watched[p]
+
+            for p in [p for p in objects if p.is_permanent]:
+                if p.check_effect_expiration():
+                    any_action = True
+
+            for p in [p for p in objects if p.is_permanent]:
+                if p.is_creature and p.status.damage_taken >= p.toughness:
+                    if p.destroy():
+                        any_action = True
+
+            for p in [p for p in objects if p.is_permanent]:
+                if p.is_aura and p.enchant_target is None:
+                    if p.change_zone(p.owner.graveyard):
+                        any_action = True
+
+            # check for player death
+            for _player in self.players_list[:]:
+                if _player.life <= 0:
+                    _player.lose()
+                if _player.lost:  # TODO: PROBLEM with multiplayer -- maybe skip over rest of turn / destroy all cards owned by that player?
+                    any_action = True
+                    self.players_list.remove(_player)
+                    self.num_players -= 1
+
+            if self.num_players <= 1:
+                raise GameOverException
+
+            if not any_action:
+                break
+            gamelog.debug('sba', "Applying state based actions")
 
 
 
-    def handle_priority(self, step, priority=None):
+    def handle_priority(self, step, priority=None, resume=False):
+        """ resume: go on with a round of priority that was interrupted (see resume_turn) """
 
         # priority tracks the index of the player that currently have priority
         if priority is None:
             priority = self.players_list.index(self.current_player)
 
-        self.passed_priority = 0
+        if not resume:
+            self.passed_priority = 0
+        if self.stats is not None:
+            start = self.stats.clock()
 
         # while not everyone has passed priority
         while self.passed_priority < self.num_players or self.stack:
             # TODO: repeat state-based-actions & checking for triggers
             #       UNTIL none avaliable
-            self.apply_state_based_actions()
-
-
-            for p in self.APNAP:
-                if p.pending_triggers:
-                    # ask player for order
-                    triggers = []
-                    if len(p.pending_triggers) > 1 and not p.autoOrderTriggers:
-                        ans = p.make_choice("Current triggers: %r\n"
-                                            "Would you like to order them, %r?\n"
-                                            "Enter a space separated list of indices, "
-                                            "starting from the trigger you'd like to put on the"
-                                            "bottom of the stack.\n"
-                                            % (p.pending_triggers, p))
-
-                        try:
-                            ans = ans.split(" ")
-                            for ind in ans:
-                                ind = int(ind)
-                                triggers.append(p.pending_triggers[ind])
-                        except (IndexError, ValueError):
-                            print("Error reading order. Auto-ordering.")
-                            pass
-
-                    for trig in p.pending_triggers:
-                        if trig not in triggers:
-                            triggers.append(trig)
-
-                    triggers = [t.put_on_stack() for t in triggers]
-                    self.stack.elements.extend([t for t in triggers if t is not None])
-                    p.pending_triggers = []
-                    self.passed_priority = 0
+            if resume:
+                resume = False  # already done before the decision we're going on from
+            else:
+                self.apply_state_based_actions()
+                self.put_triggers_on_stack()
 
             if self.stack:
-                print("\nstack: ", self.stack[::-1])
+                gamelog.debug('stack', "\nstack:  {stack}", stack=self.stack[::-1])
 
             # check if player auto pass priority
             if self.players_list[priority].passPriorityUntil not in [None, step]:
                 _play = None
             else:
                 self.players_list[priority].passPriorityUntil = None
+                self.priority = priority
                 # ask current player for an action
                 # get_action() will return '__continue' if we're debugging and executing code directly
                 # this allows us to manipulate game state without anyone receiving priority
+                if self.stats is not None:
+                    decision_start = self.stats.clock()
                 _play = self.players_list[priority].get_action()
+                if self.stats is not None:
+                    self.stats.add_time('decision', self.stats.clock() - decision_start)
 
 
             if _play is None:  # a player passes priority
@@ -242,9 +384,50 @@ class Game(object):
                     self.stack.add(_play)  # add to stack
 
             if self.recording_replay:
-                previous_gamestate = copy.deepcopy(self)
-                previous_gamestate.current_step = step
-                self.replay.append(previous_gamestate)
+                self.replay.record(step)
+
+        if self.stats is not None:
+            self.stats.add_time('priority', self.stats.clock() - start)
+
+    def put_triggers_on_stack(self):
+        """ put the pending triggers of each player on the stack, in APNAP order """
+        for p in self.APNAP:
+            if p.pending_triggers:
+                # ask player for order
+                triggers = []
+                if len(p.pending_triggers) > 1 and p.agent is not None:
+                    triggers = [t for t in p.agent.decide(
+                                    agent.TriggerOrderDecision(p, p.pending_triggers[:]))
+                                if t in p.pending_triggers]
+
+                elif len(p.pending_triggers) > 1 and not p.autoOrderTriggers:
+                    ans = p.make_choice("Current triggers: %r\n"
+                                        "Would you like to order them, %r?\n"
+                                        "Enter a space separated list of indices, "
+                                        "starting from the trigger you'd like to put on the"
+                                        "bottom of the stack.\n"
+                                        % (p.pending_triggers, p))
+
+                    try:
+                        ans = ans.split(" ")
+                        for ind in ans:
+                            ind = int(ind)
+                            triggers.append(p.pending_triggers[ind])
+                    except (IndexError, ValueError):
+                        gamelog.warning('input', "Error reading order. Auto-ordering.")
+                        pass
+
+                for trig in p.pending_triggers:
+                    if trig not in triggers:
+                        triggers.append(trig)
+
+                triggers = [t.put_on_stack() for t in triggers]
+                triggers = [t for t in triggers if t is not None]
+                if self.stats is not None:
+                    self.stats.count('triggers', len(triggers))
+                self.stack.add(triggers)
+                p.pending_triggers = []
+                self.passed_priority = 0
 
     def handle_beginning_phase(self, step):
         if step is gamesteps.Step.UNTAP:
@@ -254,6 +437,9 @@ class Game(object):
                 _player.landPlayed = 0
 
         elif step is gamesteps.Step.UPKEEP:
+            def f(p):
+                p.status.summoning_sick = False
+            self.apply_to_battlefield(f)
             self.trigger(triggers.triggerConditions.onUpkeep)
             self.handle_priority(step)
 
@@ -301,19 +487,27 @@ class Game(object):
                             p.passPriorityUntil = gamesteps.Step.POSTCOMBAT_MAIN
                     break
 
-                print("Creatures that can attack:", avaliable_attackers)
+                gamelog.debug('attackers', "Creatures that can attack: {creatures}",
+                              creatures=avaliable_attackers)
 
                 for defender in self.players_list:
                     if defender == self.current_player:
                         continue
 
                     # declare attackers
+                    if self.current_player.agent is not None:
+                        pending_attackers[defender] = [
+                            c for c in self.current_player.agent.decide(
+                                agent.AttackersDecision(self.current_player, defender, avaliable_attackers[:]))
+                            if c in avaliable_attackers]
+                        continue
+
                     # space-separated list of indices of creatures in avaliable_attackers, starting at 0
                     answer = self.current_player.make_choice(
                         "\n{}, Choose all creatures you'd like to attack {} with\n"
                         .format(self.current_player, defender.name))
                     if self.test:
-                        print(answer)
+                        gamelog.debug('choice', "{answer}", answer=answer)
 
                     if answer:
                         # TODO: planeswalkers
@@ -327,13 +521,13 @@ class Game(object):
                                         # defender)
 
                                 else:
-                                    print("creature #{} is out of bounds\n"
-                                          .format(str(ind)))
+                                    gamelog.warning('input', "creature #{index} is out of bounds\n",
+                                                    index=ind)
                                     continue
 
                         except:
                             traceback.print_exc()
-                            print("wrong format: {}\n".format(ind))
+                            gamelog.warning('input', "wrong format: {answer}\n", answer=ind)
                             continue
 
                 # simulate attacking
@@ -349,8 +543,10 @@ class Game(object):
                         atkr.status.is_attacking = []
 
                 if not ok:
-                    print("Illegal attack; rewind\n\n")
+                    gamelog.warning('illegal', "Illegal attack; rewind\n\n")
                     # self = deepcopy(GAME_PREVIOUS_STATE)
+                    if self.current_player.agent is not None:
+                        break  # an agent would answer the same way again; no attacks
                     continue
                 else:
                     for defender, atkrs in pending_attackers.items():
@@ -358,8 +554,8 @@ class Game(object):
                             atkr.attacks(defender)
 
             for creature in avaliable_attackers:
-                print("{} is attacking {}\n".format(
-                    creature.name, creature.status.is_attacking))
+                gamelog.info('attack', "{creature} is attacking {defender}\n",
+                             creature=creature.name, defender=creature.status.is_attacking)
 
             # check remove-from-combat abilities/events
 
@@ -383,8 +579,8 @@ class Game(object):
                         lambda p: p.status.is_attacking == defender)
 
                     if currently_attacking:
-                        print("Creatures attacking {}: {}\n\n".format(
-                            defender, currently_attacking))
+                        gamelog.info('attack', "Creatures attacking {defender}: {creatures}\n\n",
+                                     defender=defender, creatures=currently_attacking)
 
                         can_block = []
                         self.apply_to_battlefield(
@@ -392,19 +588,27 @@ class Game(object):
                             lambda p: p.controller == defender and p.can_block())
 
                         if can_block:
-                            print("Potential blockers: {}\n".format(can_block))
+                            gamelog.debug('blockers', "Potential blockers: {creatures}\n",
+                                          creatures=can_block)
 
                             # declare blockers
 
 
                             for attacking_creature in currently_attacking:
+                                if defender.agent is not None:
+                                    pending_blocks.extend(
+                                        (c, attacking_creature) for c in defender.agent.decide(
+                                            agent.BlockersDecision(defender, attacking_creature, can_block[:]))
+                                        if c in can_block)
+                                    continue
+
                                 _ok = False
                                 while not _ok:
                                     answer = defender.make_choice("\n{}, Choose all creatures you'd like to block {} with\n"
                                                                   .format(defender, attacking_creature))
 
                                     if self.test:
-                                        print(answer)
+                                        gamelog.debug('choice', "{answer}", answer=answer)
                                     if not answer:
                                         break
 
@@ -416,16 +620,16 @@ class Game(object):
                                             if ind < len(can_block):
                                                 pending_blocks.append((can_block[ind], attacking_creature))
                                             else:
-                                                print(
-                                                    "creature #{} is out of bounds\n".format(ind))
+                                                gamelog.warning(
+                                                    'input', "creature #{index} is out of bounds\n", index=ind)
                                                 continue
 
                                         _ok = True
 
                                     except:
                                         traceback.print_exc()
-                                        print(
-                                            "wrong format: {}\n".format(answer))
+                                        gamelog.warning(
+                                            'input', "wrong format: {answer}\n", answer=answer)
 
                     # TODO: attacker declare multi-block dmg order
                     # TODO: check for menace
@@ -442,9 +646,11 @@ class Game(object):
 
 
                     if not ok:
-                        print("Illegal block; rewind\n\n")
+                        gamelog.warning('illegal', "Illegal block; rewind\n\n")
                         
                         # self = GAME_PREVIOUS_STATE
+                        if defender.agent is not None:
+                            ok = True  # an agent would answer the same way again; no blocks
                         break
                     else:
                         # legal block; actually execute blocking action
@@ -452,8 +658,8 @@ class Game(object):
                             blocker.blocks(attacker)
 
             for creature in currently_attacking:
-                print("{} is attacking {}\n".format(
-                    creature.name, creature.status.is_attacking))
+                gamelog.info('attack', "{creature} is attacking {defender}\n",
+                             creature=creature.name, defender=creature.status.is_attacking)
 
         if step is gamesteps.Step.FIRST_STRIKE_COMBAT_DAMAGE:
             # if no first strikes avaliable, skip to combat damage
@@ -494,15 +700,16 @@ class Game(object):
 
     def handle_end_phase(self, step):
         if step is gamesteps.Step.END:
-            self.apply_to_battlefield(
-                lambda p: p.trigger(triggers.triggerConditions.onEndstep))
+            self.trigger(triggers.triggerConditions.onEndstep)
             self.handle_priority(step)
 
         elif step is gamesteps.Step.CLEANUP:
             self.current_player.discard(
                 down_to=self.current_player.maxHandSize)
-            self.apply_to_battlefield(
-                lambda p: p.trigger(triggers.triggerConditions.onCleanup))
+            def f(p):
+                p.status.damage_taken = 0
+            self.apply_to_battlefield(f)
+            self.trigger(triggers.triggerConditions.onCleanup)
             self.apply_state_based_actions()
             
 
@@ -512,9 +719,28 @@ class Game(object):
         for phase in gamesteps.Phase:
             self.pending_steps.extend(phase.steps)
 
+        return self.handle_pending_steps()
+
+    def resume_turn(self):
+        """ finish the turn of a game copied while a player was deciding what to do
+        with priority (e.g. by an agent searching ahead, see Game.clone)
+
+        The player is asked again, then the game goes on from there as it would have.
+        """
+        self.handle_priority(self.step, self.priority, resume=True)
+        for _player in self.players_list:
+            _player.mana.clear()
+
+        return self.handle_pending_steps()
+
+    def handle_pending_steps(self):
+        """ play the rest of the turn: every step left in pending_steps, then the end of turn """
         while self.pending_steps:
             self.step = self.pending_steps.pop(0)
-            print(self.step)
+            self.step_start = self.clock
+            gamelog.info('step', "{step}", step=self.step)
+            if self.stats is not None:
+                start = self.stats.clock()
             {
                 gamesteps.Step.UNTAP: self.handle_beginning_phase,
                 gamesteps.Step.UPKEEP: self.handle_beginning_phase,
@@ -530,6 +756,8 @@ class Game(object):
                 gamesteps.Step.END: self.handle_end_phase,
                 gamesteps.Step.CLEANUP: self.handle_end_phase
             }[self.step](self.step)
+            if self.stats is not None:
+                self.stats.add_time('step.' + self.step.name, self.stats.clock() - start)
             for _player in self.players_list:
                 _player.mana.clear()
 
@@ -539,6 +767,8 @@ class Game(object):
         self.current_player = self.pending_turns.pop(
             0)  # cycles to next player's turn
         self.turn_num += 1
+        if self.stats is not None:
+            self.stats.count('turns')
         return True
 
 
@@ -563,7 +793,7 @@ class Game(object):
 
     # TODO
     def setup_game(self):
-        print("setting up game...")
+        gamelog.info('setup', "setting up game...")
         for _player in self.players_list:
             _player.draw(7)
         # everyone gets a turn queued up, in order
@@ -584,6 +814,7 @@ class Game(object):
 
 
 def start_game():
+    gamelog.configure(gamelog.ConsoleSink(gamelog.DEBUG))
     cards.setup_cards()
     decks = [
         cards.read_deck(path_from_home('card_db/decks/mono_red.txt')),
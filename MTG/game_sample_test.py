@@ -4,8 +4,10 @@ import os
 
 from MTG.game import *
 from MTG import cards
+from MTG import gamelog
 from MTG.utils import path_from_home
 
+gamelog.configure(gamelog.ConsoleSink(gamelog.DEBUG))
 cards.setup_cards()
 
 with mock.patch('builtins.input', side_effect=[
@@ -0,0 +1,200 @@
+"""Game event log
+
+The engine reports what happens during a game (spells resolving, damage,
+creatures dying, ...) through this module rather than printing it. Each event
+has a level, a kind and a message, plus the fields the message is made of:
+
+    gamelog.info('damage', "{target} takes {amount} damage from {source}\\n",
+                 target=creature, amount=3, source=bolt)
+
+Events go to the sinks of the log, each with its own minimum level:
+
+    NullSink        drops everything
+    MemorySink      keeps the last events (ring buffer), e.g. for tests
+    JSONLinesSink   writes each event as a JSON object, one per line
+    ConsoleSink     prints the message (the engine's usual human-readable output)
+
+By default there are no sinks: every level is disabled, and logging an event
+costs a single comparison -- the message isn't even formatted. start_game logs
+everything to the console:
+
+    gamelog.configure(gamelog.ConsoleSink(gamelog.DEBUG))
+"""
+
+import sys
+import json
+from collections import deque
+from contextlib import contextmanager
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100  # above every level
+
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning', ERROR: 'error'}
+
+
+class Event():
+    __slots__ = ('level', 'kind', 'message', 'fields')
+
+    def __init__(self, level, kind, message, fields):
+        self.level = level
+        self.kind = kind
+        self.message = message
+        self.fields = fields
+
+    def __repr__(self):
+        return 'Event(%s, %r, %r)' % (LEVEL_NAMES.get(self.level, self.level), self.kind, self.message)
+
+    def to_dict(self):
+        """ the event as JSON-compatible data (game objects become their str) """
+        d = {'level': LEVEL_NAMES.get(self.level, self.level),
+             'event': self.kind,
+             'message': self.message.strip()}
+        for key, value in self.fields.items():
+            d[key] = _plain(value)
+        return d
+
+
+def _plain(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple, set)):
+        return [_plain(v) for v in value]
+    return str(value)
+
+
+class Sink():
+    """ where events end up; write(event) is only called for events of level >= self.level """
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def write(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class NullSink(Sink):
+    def __init__(self, level=OFF):
+        super(NullSink, self).__init__(level)
+
+    def write(self, event):
+        pass
+
+
+class MemorySink(Sink):
+    def __init__(self, level=DEBUG, capacity=1000):
+        super(MemorySink, self).__init__(level)
+        self.events = deque(maxlen=capacity)
+
+    def write(self, event):
+        self.events.append(event)
+
+    def kinds(self):
+        return [event.kind for event in self.events]
+
+
+class JSONLinesSink(Sink):
+    """ file: a filename, or an open (text) file """
+    def __init__(self, file, level=INFO):
+        super(JSONLinesSink, self).__init__(level)
+        self.owns_file = isinstance(file, str)
+        self.file = open(file, 'w') if self.owns_file else file
+
+    def write(self, event):
+        self.file.write(json.dumps(event.to_dict()) + '\n')
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class ConsoleSink(Sink):
+    """ stream: defaults to whatever sys.stdout is when the event is written """
+    def __init__(self, level=INFO, stream=None):
+        super(ConsoleSink, self).__init__(level)
+        self.stream = stream
+
+    def write(self, event):
+        print(event.message, file=self.stream or sys.stdout)
+
+
+_sinks = []
+_level = OFF  # lowest level any sink wants
+
+
+def configure(*sinks):
+    """ replace the sinks of the log (closing the old ones); no sinks disables logging """
+    for sink in _sinks:
+        if sink not in sinks:
+            sink.close()
+    _sinks[:] = sinks
+    _update_level()
+
+
+def add_sink(sink):
+    _sinks.append(sink)
+    _update_level()
+    return sink
+
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+        sink.close()
+        _update_level()
+
+
+def _update_level():
+    global _level
+    _level = min([sink.level for sink in _sinks], default=OFF)
+
+
+@contextmanager
+def muted():
+    """ log nothing within the with block (e.g. while playing out copies of the game) """
+    global _level
+    level, _level = _level, OFF
+    try:
+        yield
+    finally:
+        _level = level
+
+
+def is_enabled(level):
+    return level >= _level
+
+
+def log(level, kind, message, **fields):
+    if level < _level:
+        return
+    event = Event(level, kind, message.format(**fields) if fields else message, fields)
+    for sink in _sinks:
+        if level >= sink.level:
+            sink.write(event)
+
+
+def debug(kind, message, **fields):
+    if DEBUG >= _level:
+        log(DEBUG, kind, message, **fields)
+
+
+def info(kind, message, **fields):
+    if INFO >= _level:
+        log(INFO, kind, message, **fields)
+
+
+def warning(kind, message, **fields):
+    if WARNING >= _level:
+        log(WARNING, kind, message, **fields)
+
+
+def error(kind, message, **fields):
+    if ERROR >= _level:
+        log(ERROR, kind, message, **fields)
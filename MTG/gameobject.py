@@ -1,15 +1,19 @@
 import pdb
 import time
 import math
+import types
+import itertools
 from collections import defaultdict, namedtuple
 from sortedcontainers import SortedListWithKey
 
 from MTG import cardtype
 from MTG import static_abilities
 from MTG import utils
+from MTG import gamelog
+from MTG import replay
 
 
-class Characteristics():
+class Characteristics(replay.Tracked):
     def __init__(self,
                  name='',
                  mana_cost='',
@@ -53,9 +57,61 @@ class Characteristics():
         return True
 
 
-class GameObject():
+# ids of the objects created outside of a game (see GameObject.object_id);
+# negative, so they never clash with the ids a game gives
+_detached_ids = itertools.count(-1, -1)
+
+
+class _Indexed():
+    """An attribute that zones index objects by (see Zone.lookup): setting it
+    indexes the object again in its zone. It has no __get__, so reading it is
+    as fast as reading any other attribute.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+        _zone = obj.__dict__.get('zone')
+        if _zone is not None:
+            _zone.reindex(obj)
+
+
+class GameObject(replay.Tracked):
+    """Anything that can be in a zone
+
+    object_id: id given when the object is created, by its game (or from a
+    global counter, for an object created outside of a game, e.g. the cards of
+    a deck) -- equality and hashing only depend on it (and the class), so
+    they're cheap, and copies of a game have the same objects. It never
+    changes afterwards: an object can be put in a set or used as a dict key at
+    any time, entering a zone doesn't change its hash.
+    """
     is_player = False
     is_token = False
+    object_id = None
+
+    # a new controller, or new characteristics (e.g. a copy effect), are
+    # indexed right away; characteristics changed in place need Zone.reindex
+    controller = _Indexed()
+    characteristics = _Indexed()
+
+    # bumped whenever effects are added, expire or toggle (see Permanent)
+    _effects_version = 0
+    _keywords_cache = None
+
+    # (permanent, effect name, effect) of the effects lasting as long as this
+    # object stays in its zone (see add_dependent_effect)
+    dependent_effects = ()
+
+    # attributes that copies of the game share rather than copy (see cloning.py)
+    _clone_shared = frozenset(['characteristics', '_keywords_cache'])
+
+    # effect name -> effects, sorted by timestamp: only permanents get effects
+    # (see Permanent.add_effect), the other objects share this empty mapping
+    # (one less thing to copy for each card of a copy of the game)
+    effects = types.MappingProxyType({})
 
     target_criterias = None  # if targets, this is a list of boolean functions
     target_prompts = None  # list of strings
@@ -71,14 +127,14 @@ class GameObject():
         self._owner = owner
         self.zone = zone
         self.previousState = previousState
-        self.effects = defaultdict(lambda: SortedListWithKey(
-                                           [], lambda x: x.timestamp))
 
-        self.timestamp = self.game.timestamp if self.game else None
+        self.timestamp = self.game.new_timestamp() if self.game else None
+        self.object_id = self.game.new_object_id() if self.game else next(_detached_ids)
 
     def __getstate__(self):
 
         state = self.__dict__.copy()
+        state.pop('_keywords_cache', None)  # derived from the rest of the state
 
         effects = None if self.effects is None else {effect: instances for effect, instances in self.effects.items() if len(instances) > 0}
         state["effects"] = effects
@@ -105,10 +161,11 @@ class GameObject():
         return str(self.name)
 
     def __eq__(x, y):
-        return isinstance(y, x.__class__) and x.__repr__() == y.__repr__()
+        return x is y or (isinstance(y, x.__class__)
+                          and x.object_id is not None and x.object_id == y.object_id)
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return hash(self.object_id) if self.object_id is not None else object.__hash__(self)
 
     @property
     def owner(self):
@@ -139,10 +196,11 @@ class GameObject():
     def manacost(self):
         cost = self.controller.mana.determine_costs(self.characteristics.mana_cost)
         # reduce/add costs
-        if self.effects['additionalCost']:
+        # (.get: don't add empty effect lists to self.effects)
+        if self.effects.get('additionalCost'):
             pass
 
-        for effect in self.effects['reduceCost']:
+        for effect in self.effects.get('reduceCost', ()):
             pass
             # TODO
 
@@ -197,13 +255,31 @@ class GameObject():
     def toughness(self):
         return self.characteristics.toughness if self.is_creature else None
 
-    def has_ability(self, ability):
-        for effect in self.effects['gainAbility']:
-            if ability in effect.value:
-                return True
+    @property
+    def keyword_abilities(self):
+        """ bitmask of the keyword abilities the object has (see static_abilities.BITS):
+        printed ones, plus the ones granted by active gainAbility effects
+
+        Cached until the effects change.
+        """
+        key = (self._effects_version, self.characteristics)
+        if self._keywords_cache is not None and self._keywords_cache[0] == key:
+            return self._keywords_cache[1]
+
+        mask = static_abilities.to_mask(self.characteristics.abilities)
+        for effect in self.effects.get('gainAbility', ()):
+            if effect.is_active:
+                mask |= static_abilities.granted_mask(effect.value)
 
-        ability = ability.replace(' ', '_')
-        return static_abilities.StaticAbilities[ability] in self.characteristics.abilities
+        self._keywords_cache = (key, mask)
+        return mask
+
+    def has_ability(self, ability):
+        bit = static_abilities.BITS.get(ability)
+        if bit is None:  # not a keyword ability
+            return any(ability in effect.value for effect in self.effects.get('gainAbility', ())
+                       if effect.is_active)
+        return bool(self.keyword_abilities & bit)
 
     def share_color(self, other):
         return bool(set(self.characteristics.color) & set(other.characteristics.color))
@@ -271,7 +347,7 @@ class GameObject():
                 has_valid_target = self.game.apply_to_players(lambda p: crit(self, p))
 
             if not has_valid_target:
-                print(f"{self}: No valid targets.")
+                gamelog.info('no_targets', "{source}: No valid targets.", source=self)
                 return False
 
         return True
@@ -285,11 +361,26 @@ class GameObject():
         return targets_chosen
 
 
+    def add_dependent_effect(self, permanent, name, effect):
+        """ effect (on permanent) ends when self changes zones """
+        if not self.dependent_effects:
+            self.dependent_effects = []
+        self.dependent_effects.append((permanent, name, effect))
+        replay.changed(self)
+
+    def expire_dependent_effects(self):
+        dependent_effects, self.dependent_effects = self.dependent_effects, ()
+        for permanent, name, effect in dependent_effects:
+            if permanent.remove_effect(name, effect):
+                gamelog.debug('effect', "{effect} has expired (source)", effect=effect)
+
     def change_zone(self, target_zone, from_top=0, shuffle=True,
                     status_mod=None, modi_func=None):
         if target_zone == self.zone:
             return False
 
+        self.expire_dependent_effects()
+
         current_zone = self.zone
         if not current_zone:
             c = self
@@ -305,7 +396,10 @@ class GameObject():
                 return False
 
         if target_zone.is_public:
-            self.timestamp = self.game.timestamp  # reset timestamp
+            self.timestamp = self.game.new_timestamp()  # reset timestamp
+
+        if self.game:
+            self.game.mark_dirty(self)
 
         if target_zone.is_library:
             return target_zone.add(c, from_top, shuffle)
@@ -0,0 +1,103 @@
+"""Where a game spends its time
+
+Profiling is opt-in: a game only keeps statistics if it's given a GameStats,
+
+    GAME = game.Game(decks, stats=gamestats.GameStats())
+    ... play ...
+    print(GAME.stats.report())
+    GAME.stats.write('stats.json')
+
+Otherwise (the default, GAME.stats is None) the turn loop only pays for an
+`is not None` check at each instrumented spot. What gets measured:
+
+    timers      step.<STEP>   each step of each turn (handlers included)
+                priority      each round of priority (until everyone passes
+                              with an empty stack; nested in the step)
+                resolve       each stack item resolving (nested in priority)
+                decision      each time a player with priority is asked for
+                              an action (nested in priority)
+    counters    turns, triggers (put on the stack), sba_passes (loops of
+                apply_state_based_actions), zone_moves (objects added to a
+                zone: draws, casts, deaths... but not shuffles)
+
+A timer keeps its count, total, and max; times are wall-clock seconds
+(time.perf_counter). Stats of several games can be added up with merge().
+Copies of a game (Game.clone) don't keep statistics.
+"""
+
+import json
+import time
+
+
+class Timer():
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self, count=0, total=0.0, max=0.0):
+        self.count = count
+        self.total = total
+        self.max = max
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self):
+        return {'count': self.count, 'total': self.total, 'max': self.max,
+                'mean': self.total / self.count if self.count else 0.0}
+
+
+class GameStats():
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self):
+        self.timers = {}  # name -> Timer
+        self.counters = {}  # name -> int
+
+    def add_time(self, name, seconds):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer()
+        timer.add(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        """ add up the stats of another game (a GameStats, or its to_dict()) """
+        if isinstance(other, GameStats):
+            other = other.to_dict()
+        for name, t in other['timers'].items():
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer()
+            timer.count += t['count']
+            timer.total += t['total']
+            timer.max = max(timer.max, t['max'])
+        for name, n in other['counters'].items():
+            self.count(name, n)
+        return self
+
+    def to_dict(self):
+        """ the stats as JSON-compatible data """
+        return {'timers': {name: t.to_dict() for name, t in self.timers.items()},
+                'counters': dict(self.counters)}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls().merge(d)
+
+    def write(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def report(self):
+        """ a table of the timers, the most time-consuming first, then the counters """
+        lines = ['%-32s %8s %10s %10s %10s' % ('timer', 'count', 'total (s)', 'mean (ms)', 'max (ms)')]
+        for name, t in sorted(self.timers.items(), key=lambda item: -item[1].total):
+            lines.append('%-32s %8d %10.3f %10.3f %10.3f'
+                         % (name, t.count, t.total, t.total / t.count * 1e3, t.max * 1e3))
+        for name, n in sorted(self.counters.items()):
+            lines.append('%-32s %8d' % (name, n))
+        return '\n'.join(lines)
@@ -0,0 +1,244 @@
+"""Card images for the replay viewer (rendering.py)
+
+An image goes through three levels, each filling the one above it:
+
+    memory  the decoded images, least recently used first out once their
+            total size (width * height * bands) goes over memory_limit
+    disk    the raw image files, content-addressed: cache_dir/objects/ab/abcd...
+            holds the file whose sha256 is abcd..., cache_dir/urls/<sha256 of
+            the url> the sha256 of the file for that url. Identical images
+            are stored once, and the cache survives across runs.
+    source  a local directory of images, looked up by the file name of the url
+            (https://cards.scryfall.io/normal/front/a/b/ab12.jpg -> ab12.jpg),
+            then the network (unless offline) -- requests is only needed then
+
+Images that can't be found aren't remembered for good: they're tried again
+after retry_after seconds.
+
+prefetch() loads images in a pool of background threads (reading, fetching
+and decoding included), so that the render loop can ask for them with
+get(url, block=False): it never waits, it gets None for the images that aren't
+ready yet (and they get loaded in the background). `version` changes every
+time an image is ready, to know when to draw again.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from MTG import gamelog
+from MTG.utils import path_from_home
+
+
+DEFAULT_CACHE_DIR = 'card_db/image_cache'
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def decode_image(data):
+    """ the default decoder: a PIL image in RGB (PIL is imported on first use) """
+    from PIL import Image
+    image = Image.open(BytesIO(data)).convert('RGB')
+    image.load()
+    return image
+
+
+def image_size(image):
+    """ memory taken by a decoded image, in bytes """
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageCache():
+    """ cache_dir: where the disk cache lives (relative to the engine home)
+    local_dir: directory of images to look in before the network
+    offline: never use the network
+    memory_limit: bytes of decoded images kept in memory
+    decode, size: turn raw file data into an image, and tell its size in memory
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, local_dir=None, offline=False,
+                 memory_limit=256 * 2 ** 20, workers=8, timeout=10, retry_after=60,
+                 decode=decode_image, size=image_size):
+        self.cache_dir = path_from_home(cache_dir) if not os.path.isabs(cache_dir) else cache_dir
+        self.local_dir = local_dir
+        self.offline = offline
+        self.memory_limit = memory_limit
+        self.workers = workers
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.decode = decode
+        self.size = size
+
+        self.version = 0  # changes whenever an image gets into memory
+        self._images = OrderedDict()  # url -> (image, size), least recently used first
+        self._memory = 0
+        self._failed = {}  # url -> time of the failure
+        self._loading = {}  # url -> Future
+        self._lock = threading.Lock()
+        self._pool = None
+        self._local = threading.local()  # a requests session per thread
+
+    # memory
+
+    def get(self, url, block=True):
+        """ the decoded image for url, or None if it can't be found
+        (or, with block=False, if it isn't loaded yet: it gets loaded in the background)
+        """
+        if url is None:
+            return None
+        with self._lock:
+            entry = self._images.get(url)
+            if entry is not None:
+                self._images.move_to_end(url)
+                return entry[0]
+        if not block:
+            self.prefetch([url])
+            return None
+        return self._load(url)
+
+    def __contains__(self, url):
+        return url in self._images
+
+    def _remember(self, url, image):
+        size = self.size(image)
+        with self._lock:
+            if url in self._images:
+                self._memory -= self._images.pop(url)[1]
+            self._images[url] = (image, size)
+            self._memory += size
+            while self._memory > self.memory_limit and len(self._images) > 1:
+                _, (_, evicted_size) = self._images.popitem(last=False)
+                self._memory -= evicted_size
+            self.version += 1
+
+    def _load(self, url):
+        """ read or fetch, decode & remember the image for url; None if there's none """
+        failed = self._failed.get(url)
+        if failed is not None and time.monotonic() - failed < self.retry_after:
+            return None
+
+        data = self.load_bytes(url)
+        image = None
+        if data is not None:
+            try:
+                image = self.decode(data)
+            except Exception as e:
+                gamelog.warning('image', "Could not decode card image {url}: {error}", url=url, error=e)
+
+        if image is None:
+            self._failed[url] = time.monotonic()
+            return None
+        self._failed.pop(url, None)
+        self._remember(url, image)
+        return image
+
+    # background loading
+
+    def prefetch(self, urls):
+        """ load the images for urls in the background; returns the list of their futures """
+        futures = []
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='card-images')
+            for url in urls:
+                if url is None or url in self._images:
+                    continue
+                future = self._loading.get(url)
+                if future is None:
+                    future = self._loading[url] = self._pool.submit(self._prefetch_one, url)
+                futures.append(future)
+        return futures
+
+    def _prefetch_one(self, url):
+        try:
+            return self._load(url)
+        finally:
+            with self._lock:
+                self._loading.pop(url, None)
+
+    def close(self):
+        """ stop the background threads (waiting for the images being loaded) """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # disk & source
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    def _url_path(self, url):
+        return os.path.join(self.cache_dir, 'urls', _sha256(url.encode()))
+
+    def load_bytes(self, url):
+        """ the raw image file for url, from the disk cache or the source; None if not found """
+        data = self.read_cached(url)
+        if data is None:
+            data = self.read_source(url)
+            if data is not None:
+                self.store(url, data)
+        return data
+
+    def read_cached(self, url):
+        try:
+            with open(self._url_path(url)) as f:
+                digest = f.read().strip()
+            with open(self._object_path(digest), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data if _sha256(data) == digest else None  # e.g. a half-written file
+
+    def store(self, url, data):
+        """ put data in the disk cache as the image for url """
+        digest = _sha256(data)
+        try:
+            _write_atomic(self._object_path(digest), data)
+            _write_atomic(self._url_path(url), digest.encode())
+        except OSError as e:
+            gamelog.warning('image', "Could not cache card image {url}: {error}", url=url, error=e)
+
+    def read_source(self, url):
+        if self.local_dir is not None:
+            parsed = urlparse(url)
+            path = os.path.join(self.local_dir, os.path.basename(parsed.path))
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    return f.read()
+        if self.offline:
+            return None
+        return self.fetch(url)
+
+    def fetch(self, url):
+        """ download the image for url; None if it can't be """
+        import requests
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        try:
+            response = session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            gamelog.warning('image', "Could not load card image {url}: {error}", url=url, error=e)
+            return None
+        if response.status_code != 200:
+            gamelog.warning('image', "Could not load card image {url} ({status})",
+                            url=url, status=response.status_code)
+            return None
+        gamelog.info('image', "Fetched card image {url}", url=url)
+        return response.content
+
+
+def _write_atomic(path, data):
+    """ write the whole file, or nothing (readers never see half a file) """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
@@ -2,6 +2,8 @@ from collections import defaultdict
 from enum import Enum
 import re
 
+from MTG import agent
+
 
 manachr = ['W', 'U', 'B', 'R', 'G', 'C', '1']
 
@@ -49,6 +51,7 @@ def chr_to_mana(c):
 
 
 class ManaPool():
+    _clone_shared = frozenset()  # see cloning.py
 
     def __init__(self, controller=None):
         self.pool = defaultdict(lambda: 0)
@@ -111,6 +114,9 @@ class ManaPool():
         for h in hybrid:
             if self.controller.autoPayMana:
                 choice = '0'
+            elif self.controller.agent is not None:
+                choice = str(self.controller.agent.decide(
+                    agent.HybridManaDecision(self.controller, (h[1], h[3]))))
             else:
                 choice = self.controller.make_choice(
                     'How would you like to pay? 0 (default): {}\t 1: {}\n'.format(h[1], h[3]))
@@ -128,6 +134,48 @@ class ManaPool():
         return cost
 
 
+    def can_afford(self, manacost):
+        """ True if the pool has enough mana for manacost (a string or a dict of Manas)
+
+        Unlike canPay, this never asks the player anything: generic costs are
+        paid automatically, and a hybrid symbol is affordable if either half is.
+        """
+        if manacost is None:
+            return True
+
+        if not isinstance(manacost, str):
+            return self._covers(manacost)
+
+        cost = str_to_mana_dict(manacost)
+        options = [[]]
+        # every hybrid symbol has already been counted twice by str_to_mana_dict
+        for h in re.findall('\([WUBRGC2]/[WUBRGC]\)', manacost):
+            cost[chr_to_mana(h[3])] -= 1
+            if h[1] == '2':
+                halves = [(Mana.GENERIC, 2), (chr_to_mana(h[3]), 1)]
+            else:
+                cost[chr_to_mana(h[1])] -= 1
+                halves = [(chr_to_mana(h[1]), 1), (chr_to_mana(h[3]), 1)]
+            options = [opt + [half] for opt in options for half in halves]
+
+        for opt in options:
+            _cost = cost.copy()
+            for manatype, amount in opt:
+                _cost[manatype] += amount
+            if self._covers(_cost):
+                return True
+        return False
+
+    def _covers(self, cost):
+        spare = self.pool[Mana.GENERIC]
+        for manatype in Mana:
+            if manatype is Mana.GENERIC:
+                continue
+            if self.pool[manatype] < cost.get(manatype, 0):
+                return False
+            spare += self.pool[manatype] - cost.get(manatype, 0)
+        return spare >= cost.get(Mana.GENERIC, 0)
+
     def canPay(self, manacost, convoke=False):
         """manacost here is a string, e.g. 2U, or a dict of Manas (e.g. {Mana.BLUE, 3})
 
@@ -149,6 +197,9 @@ class ManaPool():
         if genericMana > 0:
             if self.controller.autoPayMana:
                 choice = ''
+            elif self.controller.agent is not None:
+                choice = self.controller.agent.decide(
+                    agent.ManaPaymentDecision(self.controller, manacost, genericMana)) or ''
             else:
                 choice = self.controller.make_choice(
                     'How would you like to pay {}? Enter blank for automatic payment, or enter a string of colored mana\n'.format(genericMana))
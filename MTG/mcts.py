@@ -0,0 +1,307 @@
+"""Monte Carlo tree search agent
+
+    player.agent = mcts.MCTSAgent(iterations=500, processes=4)
+
+Every time its player gets priority, MCTSAgent looks ahead before answering:
+each iteration (rollout) clones the game (Game.clone), plays it out with cheap
+agents for a few turns (rollout_turns) or to its end, and scores the result for
+the player: 1 for a win, 0 for a loss, something in between according to life
+& board otherwise (evaluate).
+
+The tree is over the player's own decisions, in the order they come up ("open
+loop": the game is random & the opponent's moves aren't part of the tree, so a
+node stands for a sequence of decisions, not for a game state). Priority
+decisions are searched, and so are targets: whether Lightning Bolt is any good
+depends on where it goes. Options are told apart by what they do -- play which
+card, activate which ability, target which player or whose permanent -- so two
+copies of Forest in hand are a single move. Each rollout walks down the tree
+picking options with UCB1, adds a node for the first option the tree doesn't
+know yet, then lets the playout policy (HeuristicAgent or RandomAgent) take
+every other decision until the rollout ends.
+
+The budget of a decision is a number of iterations and/or a time limit. With
+processes > 1, the rollouts of each decision are spread over worker processes,
+each growing its own tree; their statistics for the first move are added up
+before picking it (root parallelization). Games can't be pickled (abilities
+hold lambdas), so the workers are forked at each decision and find the game
+in memory: this needs the 'fork' start method (Linux, macOS), and can't be
+done from a daemonic process (e.g. a simulate.py worker).
+
+The agent takes the move visited the most, then follows the tree for the
+targets of that move; it logs ('mcts' events) how many
+rollouts it got through and how fast; see also MCTSAgent.last_search.
+
+Other decisions (attackers, blockers, discards...) are left to the playout
+policy.
+"""
+
+import math
+import time
+import random
+import multiprocessing
+
+from MTG import agent
+from MTG import gamelog
+from MTG.exceptions import *
+
+
+POLICIES = {
+    'random': agent.RandomAgent,
+    'heuristic': agent.HeuristicAgent,
+}
+
+
+def action_key(action):
+    """ what an action does: actions with the same key are the same move """
+    if isinstance(action, agent.PlayCard):
+        return ('play', action.card.name)
+    if isinstance(action, agent.ActivateAbility):
+        return ('activate', action.permanent.name, action.index)
+    return ('pass',)
+
+
+def target_key(target):
+    """ targets with the same key are the same choice """
+    controller = getattr(target, 'controller', None)
+    if controller is None:  # a player
+        return ('target', target.name)
+    return ('target', target.name, controller.name)
+
+
+def options(decision):
+    """ {key: answer} for a searched decision (priority or target), None for the others """
+    if decision.kind == 'priority':
+        return {action_key(a): a for a in reversed(decision.player.legal_actions())}
+    if decision.kind == 'target':
+        return {target_key(t): t for t in reversed(decision.candidates)}
+    return None
+
+
+def evaluate(GAME, player):
+    """ how good an unfinished game is for player: between 0.1 and 0.9, so that
+    winning (1) or losing (0) the game always counts for more
+    """
+    opponent = GAME.opponent(player)
+    score = player.life - opponent.life
+    score += sum(c.power for c in player.creatures) - sum(c.power for c in opponent.creatures)
+    return 0.5 + 0.4 * math.tanh(score / 20)
+
+
+class Node():
+    __slots__ = ('visits', 'value', 'children')
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0  # sum of the scores of the rollouts through this node
+        self.children = {}  # option key -> Node
+
+    def select(self, keys, exploration, rng):
+        """ the key to try next among keys: new ones first, then the best by UCB1 """
+        new = [k for k in keys if k not in self.children]
+        if new:
+            return rng.choice(new)
+        log_visits = math.log(max(self.visits, 1))
+        return max(keys, key=lambda k: self.children[k].ucb(log_visits, exploration))
+
+    def ucb(self, log_visits, exploration):
+        if not self.visits:
+            return math.inf
+        return self.value / self.visits + exploration * math.sqrt(log_visits / self.visits)
+
+    def best(self, keys):
+        """ the most visited of keys, None if none was tried """
+        keys = [k for k in keys if k in self.children]
+        return max(keys, key=lambda k: self.children[k].visits) if keys else None
+
+    def merge(self, other):
+        """ add up the statistics of another tree for the same decision """
+        self.visits += other.visits
+        self.value += other.value
+        for key, child in other.children.items():
+            self.children.setdefault(key, Node()).merge(child)
+
+
+class TreeAgent(agent.Agent):
+    """Takes the decisions of the searching player during a rollout: down the
+    tree, then (once a node has been added) by the playout policy
+    """
+
+    def __init__(self, root, policy, exploration, rng):
+        self.node = root
+        self.path = [root]
+        self.policy = policy
+        self.exploration = exploration
+        self.rng = rng
+
+    def decide(self, decision):
+        answers = None if self.node is None else options(decision)
+        if not answers:
+            return self.policy.decide(decision)
+
+        key = self.node.select(list(answers), self.exploration, self.rng)
+        child = self.node.children.get(key)
+        if child is None:
+            child = self.node.children[key] = Node()
+            self.node = None  # leaving the tree
+        else:
+            self.node = child
+        self.path.append(child)
+        return answers[key]
+
+
+def rollout(GAME, player, root, policy, rollout_turns, exploration, rng):
+    """ one iteration of the search from GAME, cloned while player holds priority
+
+    returns the score of the rollout, which has already been added up along its path
+    """
+    memo = {}
+    game_copy = GAME.clone(memo)
+    me = memo[id(player)]
+    for _player in game_copy.players_list:
+        _player.agent = POLICIES[policy](rng.random())
+    tree = me.agent = TreeAgent(root, POLICIES[policy](rng.random()), exploration, rng)
+
+    end = game_copy.turn_num + rollout_turns
+    try:
+        game_copy.resume_turn()
+        while game_copy.turn_num < end:
+            game_copy.handle_turn()
+        score = evaluate(game_copy, me)
+    except GameOverException:
+        score = 0.0 if me.lost else 1.0
+    except EmptyLibraryException as e:
+        score = 0.0 if e.args[0] is me else 1.0
+
+    for node in tree.path:
+        node.visits += 1
+        node.value += score
+    return score
+
+
+def search(GAME, player, iterations=None, time_limit=None, policy='heuristic',
+           rollout_turns=6, exploration=1.4, seed=None):
+    """ grow a tree for player's priority decision in GAME; returns its root
+
+    stops after `iterations` rollouts or `time_limit` seconds, whichever comes first
+    """
+    rng = random.Random(seed)
+    root = Node()
+    deadline = math.inf if time_limit is None else time.perf_counter() + time_limit
+    with gamelog.muted():
+        while (iterations is None or root.visits < iterations) and time.perf_counter() < deadline:
+            rollout(GAME, player, root, policy, rollout_turns, exploration, rng)
+    return root
+
+
+# (game, player) searched by the forked workers, see MCTSAgent.run_search
+_forked_search = None
+
+
+def _search_worker(kwargs):
+    return search(*_forked_search, **kwargs)
+
+
+class MCTSAgent(agent.Agent):
+    """Picks its priority actions by Monte Carlo tree search (see module docstring)
+
+    iterations, time_limit: budget of each decision (iterations defaults to 200
+        if neither is given); with several processes, iterations are split
+        between them and time_limit applies to each
+    processes: number of worker processes running rollouts (1: in this process)
+    policy: 'heuristic' or 'random', the agent playing out rollouts & taking the
+        decisions that aren't searched
+    rollout_turns: how many turns past the current one a rollout goes before
+        the game gets evaluated
+    """
+
+    def __init__(self, iterations=None, time_limit=None, processes=1, policy='heuristic',
+                 rollout_turns=6, exploration=1.4, seed=None):
+        if iterations is None and time_limit is None:
+            iterations = 200
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.processes = processes
+        self.policy_name = policy
+        self.rollout_turns = rollout_turns
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.policy = POLICIES[policy](self.rng.random())
+        # stats of the last decision searched, and of every decision so far
+        self.last_search = None
+        self.plan = None  # node of the move being made, for its targets
+        self.rollouts = 0
+        self.search_time = 0.0
+
+    def _clone(self, memo):
+        return self  # search copies of the game replace their agents anyway
+
+    @property
+    def rollouts_per_second(self):
+        return self.rollouts / self.search_time if self.search_time else 0.0
+
+    def decide(self, decision):
+        if decision.kind == 'priority':
+            return self.priority(decision)
+
+        answers = options(decision)
+        if self.plan is not None and answers:
+            key = self.plan.best(answers)
+            if key is not None:
+                self.plan = self.plan.children[key]
+                return answers[key]
+        return self.policy.decide(decision)
+
+    def priority(self, decision):
+        self.plan = None
+        actions = decision.player.legal_actions()
+        if len(actions) == 1:  # nothing to do but pass
+            return actions[0]
+
+        start = time.perf_counter()
+        root = self.run_search(decision.player)
+        seconds = time.perf_counter() - start
+
+        answers = options(decision)
+        key = root.best(answers)
+        action = answers[key] if key is not None else actions[-1]
+        self.plan = root.children.get(key)
+
+        self.rollouts += root.visits
+        self.search_time += seconds
+        self.last_search = {
+            'rollouts': root.visits,
+            'seconds': seconds,
+            'rollouts_per_second': root.visits / seconds if seconds else 0.0,
+            'stats': {k: (n.visits, n.value) for k, n in root.children.items()},
+            'action': action,
+        }
+        gamelog.info('mcts', "{player}: {rollouts} rollouts in {seconds:.2f}s ({rate:.0f}/s) -> {action}",
+                     player=decision.player, rollouts=root.visits, seconds=seconds,
+                     rate=self.last_search['rollouts_per_second'], action=action)
+        return action
+
+    def run_search(self, player):
+        """ search player's priority decision within the budget; returns the root of the tree """
+        kwargs = {'iterations': self.iterations, 'time_limit': self.time_limit,
+                  'policy': self.policy_name, 'rollout_turns': self.rollout_turns,
+                  'exploration': self.exploration}
+
+        if self.processes <= 1:
+            return search(player.game, player, seed=self.rng.random(), **kwargs)
+
+        global _forked_search
+        if self.iterations is not None:
+            kwargs['iterations'] = -(-self.iterations // self.processes)
+        jobs = [dict(kwargs, seed=self.rng.random()) for _ in range(self.processes)]
+
+        _forked_search = (player.game, player)
+        try:
+            with multiprocessing.get_context('fork').Pool(self.processes) as pool:
+                trees = pool.map(_search_worker, jobs)
+        finally:
+            _forked_search = None
+
+        root = Node()
+        for tree in trees:
+            root.merge(tree)
+        return root
@@ -13,6 +13,10 @@ from MTG import cardtype
 from MTG import triggers
 from MTG import play
 from MTG import abilities
+from MTG import utils
+from MTG import static_abilities
+from MTG import gamelog
+from MTG import replay
 
 
 
@@ -119,7 +123,9 @@ from MTG import abilities
 
 
 
-class Status():
+class Status(replay.Tracked):
+    _clone_shared = frozenset()  # see cloning.py
+
     def __init__(self):
         self.tapped = False
         self.not_untap = 0  # 0: untap normally; 1: not untap next turn; math.inf: not untap
@@ -136,7 +142,9 @@ class Status():
 
         state = self.__dict__.copy()
 
-        counters = None if state["counters"] is None else dict(state["counters"])
+        # no zeros: reading a counter that isn't there adds it to the defaultdict
+        counters = None if state["counters"] is None else {name: num for name, num in state["counters"].items()
+                                                           if num}
         state["counters"] = counters
 
         return state
@@ -187,6 +195,10 @@ class Status():
 
 
 
+def _never(eff):
+    return False
+
+
 class Effect():
     """ name: name of effct (dict key to self.effects)
 
@@ -196,21 +208,30 @@ class Effect():
     toggle_func is the function that, while inactive, if evaluated to True toggles on the effct
         while active, the toggle function is negated; thus, it is passed into Effect(...)
         as a boolean dictionary (toggle_funcs)
+        None if the effect never toggles
     """
+    _clone_shared = frozenset(['value', 'toggle_funcs'])  # see cloning.py
+
     def __init__(self, value, timestamp, apply_target=None, source=None, expiration=math.inf, is_active=True,
-                 toggle_func=lambda eff: False):
+                 toggle_func=None):
         self.value = value
         self.source = source
         self.expiration = expiration
         self.is_active = is_active
-        self.toggle_funcs = {False: toggle_func,
-                             True: lambda eff: not toggle_func(eff)}
+        if toggle_func is None:
+            self.toggle_funcs = {False: _never, True: _never}
+        else:
+            self.toggle_funcs = {False: toggle_func,
+                                 True: lambda eff: not toggle_func(eff)}
         self.timestamp = timestamp
         self.apply_target = apply_target
 
 
 
 class Permanent(gameobject.GameObject):
+    _pt_cache = None  # see _calculate_pt
+    _clone_shared = gameobject.GameObject._clone_shared | {'attributes', '_pt_cache'}
+
     def __init__(self, characteristics, controller, owner=None, original_card=None,
                  status=None, modifications=[]):
         self.characteristics = characteristics
@@ -219,12 +240,15 @@ class Permanent(gameobject.GameObject):
         self.zone = self.controller.battlefield
         self.original_card = original_card
         # self.modifier = Modifier(self, modifications)
-        self.timestamp = self.game.timestamp
+        self.timestamp = self.game.new_timestamp()
+        self.object_id = self.game.new_object_id()
         # sort by timestamp
         # each self.effects[name] is a sortedlist of Effect
         # including (..., EXPIRATION_TIME, TIMESTAMP)
         self.effects = defaultdict(lambda: SortedListWithKey(
                                            [], lambda x : x.timestamp))
+        # (name, effect) of the effects that have to be checked by check_effect_expiration
+        self.polled_effects = []
 
         for name, value, source, toggle_func in self.controller.static_effects:
             # apply existing static effects
@@ -245,9 +269,6 @@ class Permanent(gameobject.GameObject):
             # params[0] is the trigger condition
             self.trigger_listeners = {condition: [abilities.TriggeredAbility(self, *params) for params in trigs]
                                       for condition, trigs in original_card.triggers.items()}
-            for condition in self.trigger_listeners:
-                if condition._value_ > 1000: # player-initiated trigger
-                    self.controller.trigger_listeners[condition].append((self, self.timestamp))
 
             self.continuous_effects = original_card.continuous_effects
 
@@ -275,6 +296,11 @@ class Permanent(gameobject.GameObject):
         self.equipments = []
         # pdb.set_trace()
 
+    def __getstate__(self):
+        state = super(Permanent, self).__getstate__()
+        state.pop('_pt_cache', None)  # derived from the rest of the state
+        return state
+
     def __repr__(self):
         return (self.__str__() +
                 '\nowner: %s\n' % str(self.owner if self.owner else 'None') +
@@ -286,27 +312,14 @@ class Permanent(gameobject.GameObject):
                 str(self.controller if self.controller else 'None'),
                 self.timestamp))
 
-    def __eq__(self, other):
-        """ Check equality based on both ID and timestamp"""
-        if isinstance(other, self.__class__):
-            return id(self) == id(other) and self.timestamp == other.timestamp
-        return NotImplemented
-
-    def __ne__(self, other):
-        if isinstance(other, self.__class__):
-            return not self.__eq__(other)
-        return NotImplemented
-
-    def __hash__(self):
-        return hash((id(self), self.timestamp))
-
     def activate_ability(self, num=0):
-        print("activating ability... {}".format(self.activated_abilities[num]))
+        gamelog.debug('ability', "activating ability... {ability}",
+                      ability=self.activated_abilities[num])
         # pdb.set_trace()
         # self._activated_abilities_effects[num](self)
         name = self.name + ' activated ability #' + str(num)
         return play.Play(
-                    lambda: self.activated_abilities[num].resolve(), source=self.activated_abilities[num],
+                    self.activated_abilities[num].resolve, source=self.activated_abilities[num],
                     name=name, is_mana_ability=self.activated_abilities[num].is_mana_ability)
 
     # def clear_modifier(self):
@@ -314,16 +327,44 @@ class Permanent(gameobject.GameObject):
     #     self.modifier.reset()
 
     def add_effect(self, name, value, source=None, expiration=math.inf,
-                   is_active=True, toggle_func=lambda eff: True):
-        if expiration == math.inf and source:
-            # static effect; auto expries if source expires
-            t = source.timestamp
-            expiration = lambda eff: eff.source.timestamp != t
-
-        eff = Effect(value, self.controller.game.timestamp, self, source,
+                   is_active=True, toggle_func=None):
+        """ expiration: time (e.g. game.eot_time) from which the effect has ended
+                        (scheduled with the game), or function of the effect that
+                        returns True once it has ended (checked every time
+                        state-based actions are)
+                        By default, an effect with a source (i.e. a static
+                        effect) lasts until its source changes zones.
+        toggle_func: see Effect; None if the effect is always active
+        """
+        eff = Effect(value, self.controller.game.new_timestamp(), self, source,
                      expiration, is_active, toggle_func)
         self.effects[name].add(eff)
-        self.check_effect_expiration()
+        self._effects_version += 1
+        self.game.mark_dirty(self)  # e.g. -X/-X: may leave the creature with lethal damage
+
+        if expiration == math.inf:
+            if source:
+                source.add_dependent_effect(self, name, eff)
+        elif not callable(expiration):
+            self.game.schedule_expiration(self, name, eff)
+
+        if toggle_func is not None or callable(expiration):
+            self.polled_effects.append((name, eff))
+            self.game.watch(self)
+            self.check_effect_expiration()
+
+    def remove_effect(self, name, eff):
+        """ end an effect; returns False if it had already ended """
+        category = self.effects.get(name)
+        if not category or eff not in category:
+            return False
+
+        category.remove(eff)
+        self._effects_version += 1
+        if (name, eff) in self.polled_effects:
+            self.polled_effects.remove((name, eff))
+        self.game.mark_dirty(self)
+        return True
 
     def get_effect(self, name):
         if name in self.effects:
@@ -332,25 +373,24 @@ class Permanent(gameobject.GameObject):
             return []
 
     def check_effect_expiration(self):
+        """ toggle/end the effects that depend on the state of the game
+
+        Effects ending at a given time are ended by the game
+        (Game.expire_effects), static effects by their source
+        (GameObject.expire_dependent_effects).
+        """
         did_something = False
-        time = self.controller.game.timestamp
-        for category in self.effects.values():
-            for eff in category[:]:
-                if eff.toggle_funcs[eff.is_active](eff):
-                    eff.is_active = not eff.is_active
-                    print("{} active/nonactive toggled".format(eff))
-
-                if isinstance(eff.expiration, (int, float)):
-                    if eff.expiration < time:
-                        category.remove(eff)
-                        print("{} has expired (time)".format(eff))
-                        did_something = True
-
-                elif callable(eff.expiration):
-                    if eff.expiration(eff):
-                        category.remove(eff)
-                        print("{} has expired (condition)".format(eff))
-                        did_something = True
+        for name, eff in self.polled_effects[:]:
+            if eff.toggle_funcs[eff.is_active](eff):
+                eff.is_active = not eff.is_active
+                self._effects_version += 1
+                self.game.mark_dirty(self)
+                gamelog.debug('effect', "{effect} active/nonactive toggled", effect=eff)
+
+            if callable(eff.expiration) and eff.expiration(eff):
+                if self.remove_effect(name, eff):
+                    gamelog.debug('effect', "{effect} has expired (condition)", effect=eff)
+                    did_something = True
 
         return did_something
 
@@ -381,26 +421,38 @@ class Permanent(gameobject.GameObject):
 
     # power/toughness layering -- see rule 613.3
     @property
-    def power(self):
+    def pt(self):
+        """ (power, toughness), or (None, None) if not a creature """
         if self.is_creature:
-            return self._calculate_pt()[0]
+            return self._calculate_pt()
         else:
-            return None
+            return None, None
+
+    @property
+    def power(self):
+        return self.pt[0]
 
     @property
     def toughness(self):
-        if self.is_creature:
-            return self._calculate_pt()[1]
-        else:
-            return None
+        return self.pt[1]
 
     def add_counter(self, counter="+1/+1", num=1):
         self.status.counters[counter] += num
+        replay.changed(self.status)
+        self.game.mark_dirty(self)
 
     def num_counters(self, counter):
         return self.status.counters[counter]
 
     def _calculate_pt(self):
+        # cached until the effects change (_effects_version), or the counters
+        # or base P/T do
+        counters = self.status.counters
+        key = (self._effects_version, counters["+1/+1"], counters["-1/-1"],
+               self.characteristics.power, self.characteristics.toughness)
+        if self._pt_cache is not None and self._pt_cache[0] == key:
+            return self._pt_cache[1]
+
         # layer 7a
         power = self.characteristics.power
         toughness = self.characteristics.toughness
@@ -409,7 +461,7 @@ class Permanent(gameobject.GameObject):
         for effect in self.get_effect('setPT'):
             if effect.value[0] != '*':  # keep it as is
                 power = effect.value[0]
-            if effect[1] != '*':
+            if effect.value[1] != '*':
                 toughness = effect.value[1]
 
         # layer 7c
@@ -424,6 +476,7 @@ class Permanent(gameobject.GameObject):
         for effect in self.get_effect('switchPT'):  # layer 7e
             power, toughness = toughness, power
 
+        self._pt_cache = (key, (power, toughness))
         return power, toughness
 
     @property
@@ -453,9 +506,10 @@ class Permanent(gameobject.GameObject):
                         and not (self.is_artifact or self.share_color(attacker))):
                     return False
 
-                for landtype in ["Plains", "Island", "Swamp", "Mountain", "Forest"]:
-                    if attacker.has_ability(landtype+"walk") and self.controller.controls(subtype=landtype):
-                        return False
+                if attacker.keyword_abilities & static_abilities.LANDWALK:
+                    for landtype in ["Plains", "Island", "Swamp", "Mountain", "Forest"]:
+                        if attacker.has_ability(landtype+"walk") and self.controller.controls(subtype=landtype):
+                            return False
 
                 # TODO: other blocking restrictions (e.g. can't block alone)
                 pass
@@ -473,10 +527,12 @@ class Permanent(gameobject.GameObject):
             self.trigger("onBlock", creature)
 
             self.status.is_blocking.append(creature)
+            replay.changed(self.status)
             if type(creature.status.is_attacking) == type(self.controller):
                 creature.status.is_attacking = []
 
             creature.status.is_attacking.append(self)
+            replay.changed(creature.status)
 
             return True
         else:
@@ -500,7 +556,9 @@ class Permanent(gameobject.GameObject):
             self.trigger('onTakeCombatDamage', source, dmg)
 
         self.status.damage_taken += dmg
-        print("{} takes {} damage from {}\n".format(self, dmg, source))
+        self.game.mark_dirty(self)
+        gamelog.info('damage', "{target} takes {amount} damage from {source}\n",
+                     target=self, amount=dmg, source=source)
         if source and source.has_ability("Deathtouch"):
             self.destroy()
         # pdb.set_trace()
@@ -590,13 +648,13 @@ class Permanent(gameobject.GameObject):
         # e.g. change zones
         # yet still remember last known states
         self.trigger('onDeath')
-        print("{} has died\n".format(self))
+        gamelog.info('dies', "{permanent} has died\n", permanent=self)
         return self.change_zone(self.owner.graveyard)
 
     def destroy(self):
         #trigger
         if self.has_ability("Indestructible") and self.toughness > 0:
-            print("Indestructible")
+            gamelog.info('indestructible', "Indestructible")
             return False
 
         if self.dies():
@@ -604,7 +662,7 @@ class Permanent(gameobject.GameObject):
 
     def sacrifice(self):
         #trigger
-        print("Sacrificing")
+        gamelog.info('sacrifice', "Sacrificing")
         if self.dies():
             return True
 
@@ -627,7 +685,7 @@ class Aura(Permanent):
 
         self.enchant(enchant_target)
 
-        eval(self.continuous_effects)
+        compiled(self.continuous_effects)(self)
 
 
     def enchant(self, target):
@@ -636,24 +694,29 @@ class Aura(Permanent):
         pass
 
     def disenchant(self):
-        target.auras.remove(self)
+        self.enchant_target.auras.remove(self)
         self.enchant_target = None
+        self.expire_dependent_effects()
+        self.game.mark_dirty(self)
 
+    # the effects on the enchanted creature last until the aura leaves or gets disenchanted
     def add_ability(self, ability):
-        enchanted_creature = self.enchant_target
-        # not sure how to dynamically check this & make sure all associations expire/update correctly
-        enchanted_creature.add_effect("gainAbility", ability, self, lambda eff: eff.source.enchant_target != enchanted_creature)
+        self.enchant_target.add_effect("gainAbility", ability, self)
 
     def add_pt(self, PT):
-        enchanted_creature = self.enchant_target
-        enchanted_creature.add_effect("modifyPT", PT, self, lambda eff: eff.source.enchant_target != enchanted_creature)
+        self.enchant_target.add_effect("modifyPT", PT, self)
+
+
 
 
+def compiled(source):
+    """ aura effects, compiled once as functions of self (see utils.compile_expression) """
+    return utils.compile_expression(source, globals())
 
 
 def make_permanent(card, status_mod=None, modi_func=None):
     p = Permanent(card.characteristics, card.controller, card.owner, card)
-    print("making permanent... {}\n".format(p))
+    gamelog.debug('permanent', "making permanent... {permanent}\n", permanent=p)
     return p.controller.battlefield.add(p, status_mod, modi_func)
 
 
@@ -1,6 +1,7 @@
 import inspect
 from MTG import gameobject
 from MTG import zone
+from MTG import gamelog
 
 
 def _default_apply_condition():
@@ -76,7 +77,7 @@ class Play(gameobject.GameObject):
         fizzles = False
 
         if self.countered:
-            print("%r was countered" % self)
+            gamelog.info('countered', "{play!r} was countered", play=self)
             fizzles = True
 
         # check target validity by affirming that at least one timestamp is the same
@@ -84,12 +85,12 @@ class Play(gameobject.GameObject):
         # TODO: shroud/hexproof/protection
         elif self.targets_chosen and not any([c(self, t) and t.timestamp == time for c, t, time in zip(self.target_criterias,
                                            self.targets_chosen, self.target_timestamps)]):
-            print("All targets invalid. %r fizzles." % self)
+            gamelog.info('fizzle', "All targets invalid. {play!r} fizzles.", play=self)
             fizzles = True
 
 
         elif not self.apply_condition():
-            print("Intervening-if for %r not satisfied" % self)
+            gamelog.info('fizzle', "Intervening-if for {play!r} not satisfied", play=self)
             fizzles = True
 
         if fizzles:
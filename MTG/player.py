@@ -1,8 +1,6 @@
 import pdb
 import pickle
 import traceback
-import random
-from copy import deepcopy
 from collections import defaultdict
 
 from MTG import mana
@@ -12,6 +10,10 @@ from MTG import gamesteps
 from MTG import cards
 from MTG import triggers
 from MTG import token
+from MTG import replay
+from MTG import agent
+from MTG import cardtype
+from MTG import gamelog
 from MTG.exceptions import *
 
 
@@ -21,11 +23,14 @@ class Player():
     is_creature = False
     is_land = False
     is_spell = False
+    object_id = None
+    _clone_shared = frozenset()  # see cloning.py
 
     def __init__(self, deck, name='player',
                  startingLife=20, maxHandSize=7, game=None):
         self.name = name
         self.game = game
+        self.object_id = game.new_object_id() if game else None  # see GameObject
         self.timestamp = -1
         self.life = startingLife
         self.startingLife = startingLife
@@ -36,6 +41,7 @@ class Player():
         self.autoPayMana = False
         self.autoOrderTriggers = True
         self.autoDiscard = False
+        self.agent = None  # agent.Agent taking this player's decisions; None to ask through input()
 
         self.library = zone.Library(self, deck)
         for card in self.library:
@@ -58,11 +64,6 @@ class Player():
 
         self.static_effects = []
 
-        # tracks which permanents cares about each player-init triggers
-        # trigger_listeners[condition] = list of (permanent, tstamp), where permanent cares about condition
-        #       and tstamp is stored to check permanent expiration
-        self.trigger_listeners = defaultdict(lambda: [])
-
         # todo: cost modifier tracker
 
     def __repr__(self):
@@ -72,17 +73,18 @@ class Player():
         return self.name
 
     def __eq__(x, y):
-        return isinstance(y, x.__class__) and x.__repr__() == y.__repr__()
+        if x.object_id is None:
+            return isinstance(y, x.__class__) and x.name == y.name
+        return isinstance(y, x.__class__) and x.object_id == y.object_id
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return hash(self.object_id) if self.object_id is not None else hash(self.name)
 
     def __getstate__(self):
 
         state = self.__dict__.copy()
         state['turn_events'] = None if self.turn_events is None else dict(self.turn_events)
         state['last_turn_events'] = None if self.last_turn_events is None else dict(self.last_turn_events)
-        state['trigger_listeners'] = None if self.trigger_listeners is None else dict(self.trigger_listeners)
 
         return state
 
@@ -99,10 +101,6 @@ class Player():
         if state['last_turn_events'] is not None:
             self.last_turn_events.update(state["last_turn_events"])
 
-        self.trigger_listeners = defaultdict(lambda: [])
-        if state['trigger_listeners'] is not None:
-            self.trigger_listeners.update(state["trigger_listeners"])
-
 
     @property
     def is_active(self):
@@ -114,11 +112,11 @@ class Player():
 
     @property
     def creatures(self):
-        return self.battlefield.filter(filter_func=lambda p: p.is_creature)
+        return self.battlefield.lookup('type', cardtype.CardType.CREATURE)
 
     @property
     def lands(self):
-        return self.battlefield.filter(filter_func=lambda p: p.is_land)
+        return self.battlefield.lookup('type', cardtype.CardType.LAND)
 
     @property
     def stack(self):
@@ -142,6 +140,10 @@ class Player():
 
         this gets called whenever a player has priority
         """
+        if self.agent is not None:
+            return self.perform_action(
+                self.agent.decide(agent.PriorityDecision(self, self.game.step)))
+
         answer = 'placeholder'
         _play = None
 
@@ -153,243 +155,305 @@ class Player():
                     self.game.step))
 
             if self.game.test:
-                print("\t" + self.name + ", " +
-                      str(self.game.step) + ": " + answer + "\n")
+                gamelog.debug('choice', "\t{player}, {step}: {answer}\n",
+                              player=self.name, step=self.game.step, answer=answer)
 
             if answer == '':
                 break
 
-            try:
+            if answer == 'print':
+                self.game.print_game_state()
+
+            elif answer == 'hand':
+                print(self.hand)
+
+            elif answer == 'battlefield':
+                print(self.battlefield)
 
-                if answer == 'print':
-                    self.game.print_game_state()
+            elif answer == 'graveyard':
+                print(self.graveyard)
 
-                elif answer == 'hand':
-                    print(self.hand)
+            elif answer == 'exile':
+                print(self.exile)
 
-                elif answer == 'battlefield':
-                    print(self.battlefield)
+            elif answer == 'stack':
+                print(self.game.stack)
 
-                elif answer == 'graveyard':
-                    print(self.graveyard)
+            elif answer == 'mana':
+                print(self.mana)
 
-                elif answer == 'exile':
-                    print(self.exile)
+            # Various dev/debug commands
+            elif answer == '!end':
+                raise GamescriptEnded
 
-                elif answer == 'stack':
-                    print(self.game.stack)
+            elif answer == '!replay start':
+                self.game.recording_replay = True
+                self.game.replay = replay.ReplayRecorder(self.game)
 
-                elif answer == 'mana':
-                    print(self.mana)
+            elif answer.startswith('!replay store'):
 
-                # Various dev/debug commands
-                elif answer == '!end':
-                    raise GamescriptEnded
+                split_cmd = answer.rsplit(' ', maxsplit=1)
+                assert len(split_cmd) == 2, "Usage: !replay store path/to/replay"
 
-                elif answer == '!replay start':
-                    self.game.recording_replay = True
-                    self.game.replay = []
+                dump_filename = f"{split_cmd[1]}.pkl"
+                self.game.replay.store(dump_filename)
+                print(f'Stored replay as "{dump_filename}"')
 
-                elif answer.startswith('!replay store'):
+            elif answer.startswith('!dump'):
 
-                    split_cmd = answer.rsplit(' ', maxsplit=1)
-                    assert len(split_cmd) == 2, "Usage: !replay store path/to/replay"
+                split_cmd = answer.split(' ')
+                assert len(split_cmd) == 2, "Usage: !dump path/to/dumpfile_name"
 
-                    dump_filename = f"{split_cmd[1]}.pkl"
-                    with open(dump_filename, 'wb') as pickle_file:
-                        pickle.dump(self.game.replay, pickle_file)
-                    print(f'Stored replay as "{dump_filename}"')
+                dump_filename = f"{split_cmd[1]}.pkl"
+                with open(dump_filename, 'wb') as pickle_file:
+                    pickle.dump([self.game], pickle_file)
+                print(f'Dumped game state to "{dump_filename}"')
 
-                elif answer.startswith('!dump'):
+            elif answer == '!addmana':
+                self.mana.add_str('WWWWWUUUUUBBBBBRRRRRGGGGG11111')
 
-                    split_cmd = answer.split(' ')
-                    assert len(split_cmd) == 2, "Usage: !dump path/to/dumpfile_name"
+            elif answer == '!debug':
+                pdb.set_trace()
+                pass
 
-                    dump_filename = f"{split_cmd[1]}.pkl"
-                    with open(dump_filename, 'wb') as pickle_file:
-                        pickle.dump([self.game], pickle_file)
-                    print(f'Dumped game state to "{dump_filename}"')
+            elif answer[:2] == '__':  # for dev purposes
+                exec(answer[2:])
+                return '__continue'
 
-                elif answer == '!addmana':
-                    self.mana.add_str('WWWWWUUUUUBBBBBRRRRRGGGGG11111')
+            elif answer[0] == 'p':  # playing card from hand
+                try:
+                    # 'p 3' == plays third card in hand
+                    num = int(answer[2:])
+                    assert num < len(self.hand)
+                    card = self.hand[num]
+                except:
+                    name = answer[2:]  # 'p Island' == plays 'Island'
+                    card = self.hand.get_card_by_name(name)
+                    assert card
+
+                _play = self.play_from_hand(card)
+
+            # activate ability from battlefield -- 'a 3_1' plays 2nd (index starts at 0) ability from 3rd permanent
+            # 'a 3' playrs 1st (default) ability of the 3rd permanent
+            elif answer[:2] == 'a ':
+                nums = answer[2:].split('_')
+                if len(nums) == 1:
+                    nums.append(0)
+
+                nums[0] = int(nums[0])
+                nums[1] = int(nums[1])
+
+                assert nums[0] < len(self.battlefield)
+                card = self.battlefield[nums[0]]
+
+                assert nums[1] <= len(card.activated_abilities)
+
+                _play = self.activate(card, nums[1])
+
+            # skip priority until something happens / certain step
+            elif answer[:2] == 's ':
+                if answer[2:] == 'main':
+                    answer = 's precombat_main'
+                if answer[2:] == 'main2':
+                    answer = 's postcombat_main'
+                if answer[2:] == 'combat':
+                    answer = 's beginning_of_combat'
+                assert answer[2:].upper() in gamesteps.Step._member_names_
+                self.passPriorityUntil = gamesteps.Step[answer[2:].upper()]
+                break
 
-                elif answer == '!debug':
-                    pdb.set_trace()
-                    pass
+            else:
+                raise BadFormatException(f"Invalid input: {answer}")
 
-                elif answer[:2] == '__':  # for dev purposes
-                    exec(answer[2:])
-                    return '__continue'
+        return _play
 
-                elif answer[0] == 'p':  # playing card from hand
+    def perform_action(self, action):
+        """ carry out an action picked by an agent (see agent.py)
+
+        returns the resulting Play, or None if the player passes priority;
+        an action that turns out to be illegal also passes priority
+        """
+        if isinstance(action, agent.PlayCard):
+            return self.play_from_hand(action.card)
+
+        if isinstance(action, agent.ActivateAbility):
+            return self.activate(action.permanent, action.index)
+
+        if isinstance(action, agent.PassPriority) and action.until is not None:
+            self.passPriorityUntil = action.until
+
+        return None
+
+    def play_from_hand(self, card):
+        """ try to play a card from hand; returns a Play if successful, None otherwise """
+        # timing & restrictions
+        can_play = True
+        if card.is_land and self.landPlayed >= self.landPerTurn:
+            can_play = False
+
+        if not (card.is_instant or card.has_ability('Flash')) and (
+                self.game.stack
+                or self.game.step.phase not in [
+                    gamesteps.Phase.PRECOMBAT_MAIN,
+                    gamesteps.Phase.POSTCOMBAT_MAIN]
+                or not self.is_active):
+            can_play = False
+
+        # choose targets
+        if can_play:
+            can_target = card.targets()
+
+
+        # pay mana costs
+        if can_play and can_target:
+            can_pay = False
+            cost = card.manacost
+            creatures_to_tap = []
+
+            if card.has_ability("Convoke"):
+                untapped_creatures = [
+                    c for c in self.creatures if not c.status.tapped]
+                gamelog.debug('convoke', "Your creatures: {creatures}", creatures=untapped_creatures)
+                ans = self.make_choice("What creatures would you like to tap"
+                                       " to pay for %s? (Convoke) " % card)
+
+                ans = ans.split(" ")
+                for ind in ans:
                     try:
-                        # 'p 3' == plays third card in hand
-                        num = int(answer[2:])
-                        assert num < len(self.hand)
-                        card = self.hand[num]
-                    except:
-                        name = answer[2:]  # 'p Island' == plays 'Island'
-                        card = self.hand.get_card_by_name(name)
-                        assert card
-
-
-                    # timing & restrictions
-                    can_play = True
-                    if card.is_land and self.landPlayed >= self.landPerTurn:
-                        can_play = False
-
-                    if not (card.is_instant or card.has_ability('Flash')) and (
-                            self.game.stack
-                            or self.game.step.phase not in [
-                                gamesteps.Phase.PRECOMBAT_MAIN,
-                                gamesteps.Phase.POSTCOMBAT_MAIN]
-                            or not self.is_active):
-                        can_play = False
-
-                    # choose targets
-                    if can_play:
-                        can_target = card.targets()
-
-
-                    # pay mana costs
-                    if can_play and can_target:
-                        can_pay = False
-                        cost = card.manacost
-                        creatures_to_tap = []
-
-                        if card.has_ability("Convoke"):
-                            untapped_creatures = [
-                                c for c in self.creatures if not c.status.tapped]
-                            print("Your creatures: {}".format(untapped_creatures))
-                            ans = self.make_choice("What creatures would you like to tap"
-                                                   " to pay for %s? (Convoke) " % card)
-
-                            ans = ans.split(" ")
-                            for ind in ans:
-                                try:
-                                    ind = int(ind)
-                                    _creature = untapped_creatures[ind]
-                                    if not _creature.status.tapped and _creature not in creatures_to_tap:
-                                        color = _creature.characteristics.color
-                                        if not color:
-                                            color = 'C'
-                                        elif len(color) > 1:
-                                            color = self.make_choice(
-                                                "What color would you like to add? {}".format(color))
-                                            assert color in mana.manachr
-                                        else:
-                                            color = color[0]
-
-                                        color = mana.chr_to_mana(color)
-                                        creatures_to_tap.append(_creature)
-                                        if cost[color]:
-                                            cost[color] -= 1
-                                        else:
-                                            if cost[mana.Mana.GENERIC]:
-                                                cost[mana.Mana.GENERIC] -= 1
-                                            else:
-                                                raise ValueError
-
-                                except (IndexError, ValueError):
-                                    print("error processing creature for convoke")
-                                    pass
-
-                        can_pay = self.mana.canPay(cost) 
-
-                    if can_play and can_target and can_pay:
-                        self.hand.remove(card)
-                        self.mana.pay(can_pay)
-                        for _creature in creatures_to_tap:
-                            _creature.tap()
-
-                        print("{} playing {} targeting {}\n".format(self, card, card.targets_chosen))
-                        _play = play.Play(card.play_func,
-                                          card=card)
-                        # special actions
-                        if card.is_land:
-                            _play.is_special_action = True
-                            self.landPlayed += 1
-                    else:
-                        # illegal casting, revert
-                        if not can_play:
-                            print("Cannot play this right now\n")
-                        elif not can_target:
-                            print("Cannot target\n")
-                        elif not can_pay:
-                            print("Cannot pay mana costs\n")
-
-                # activate ability from battlefield -- 'a 3_1' plays 2nd (index starts at 0) ability from 3rd permanent
-                # 'a 3' playrs 1st (default) ability of the 3rd permanent
-                elif answer[:2] == 'a ':
-                    nums = answer[2:].split('_')
-                    if len(nums) == 1:
-                        nums.append(0)
-
-                    nums[0] = int(nums[0])
-                    nums[1] = int(nums[1])
-
-                    assert nums[0] < len(self.battlefield)
-                    card = self.battlefield[nums[0]]
-
-                    assert nums[1] <= len(card.activated_abilities)
-
-                    # ability activation
-
-                    # if card._activated_abilities_costs_validation[nums[1]](card):
-                    # TODO: target validation
-                    PLAYER_PREVIOUS_STATE = deepcopy(self)
-                    # if card._activated_abilities_costs[nums[1]](card):
-                    if card.activated_abilities[nums[1]].can_activate():
-                        # TODO: make each ability have its own description/name for printing
-                        _play = card.activate_ability(nums[1])
-                    else:
-                        raise ResetGameException
-
-                # skip priority until something happens / certain step
-                elif answer[:2] == 's ':
-                    if answer[2:] == 'main':
-                        answer = 's precombat_main'
-                    if answer[2:] == 'main2':
-                        answer = 's postcombat_main'
-                    if answer[2:] == 'combat':
-                        answer = 's beginning_of_combat'
-                    assert answer[2:].upper() in gamesteps.Step._member_names_
-                    self.passPriorityUntil = gamesteps.Step[answer[2:].upper()]
-                    break
+                        ind = int(ind)
+                        _creature = untapped_creatures[ind]
+                        if not _creature.status.tapped and _creature not in creatures_to_tap:
+                            color = _creature.characteristics.color
+                            if not color:
+                                color = 'C'
+                            elif len(color) > 1:
+                                color = self.make_choice(
+                                    "What color would you like to add? {}".format(color))
+                                assert color in mana.manachr
+                            else:
+                                color = color[0]
+
+                            color = mana.chr_to_mana(color)
+                            creatures_to_tap.append(_creature)
+                            if cost[color]:
+                                cost[color] -= 1
+                            else:
+                                if cost[mana.Mana.GENERIC]:
+                                    cost[mana.Mana.GENERIC] -= 1
+                                else:
+                                    raise ValueError
+
+                    except (IndexError, ValueError):
+                        gamelog.warning('input', "error processing creature for convoke")
+                        pass
+
+            can_pay = self.mana.canPay(cost) 
+
+        if can_play and can_target and can_pay:
+            self.hand.remove(card)
+            self.mana.pay(can_pay)
+            for _creature in creatures_to_tap:
+                _creature.tap()
+
+            gamelog.info('play', "{player} playing {card} targeting {targets}\n",
+                         player=self, card=card, targets=card.targets_chosen)
+            _play = play.Play(card.play_func,
+                              card=card)
+            # special actions
+            if card.is_land:
+                _play.is_special_action = True
+                self.landPlayed += 1
+            return _play
+
+        # illegal casting, revert
+        if not can_play:
+            gamelog.warning('illegal', "Cannot play this right now\n")
+        elif not can_target:
+            gamelog.warning('illegal', "Cannot target\n")
+        elif not can_pay:
+            gamelog.warning('illegal', "Cannot pay mana costs\n")
+        return None
+
+    def activate(self, card, index=0):
+        """ try to activate an ability of a permanent; returns a Play if successful, None otherwise """
+        ability = card.activated_abilities[index]
+
+        # check the costs before paying any of them, so there's nothing to revert
+        if not ability.can_pay_costs():
+            gamelog.warning('illegal', "Cannot pay this ability's costs\n")
+            return None
 
-                else:
-                    raise BadFormatException(f"Invalid input: {answer}")
+        if ability.can_activate():
+            # TODO: make each ability have its own description/name for printing
+            return card.activate_ability(index)
 
-            except ResetGameException:
-                print("Illegial action. Resetting...")
-                self.__dict__ = PLAYER_PREVIOUS_STATE.__dict__.copy()
+        gamelog.warning('illegal', "Cannot activate this ability\n")
+        return None
 
-            # except:
-            #     traceback.print_exc()
-            #     print("Bad format.\n")
-            #     continue
+    def legal_actions(self):
+        """ every action this player could take while holding priority
 
-        return _play
+        Returns a list of agent.PlayCard / agent.ActivateAbility, plus agent.PassPriority().
+        Nothing gets tried or paid: timing is checked once, and mana costs against
+        the mana pool, once per distinct cost. As with get_action(), the mana for a
+        spell has to be in the pool already (mana abilities are listed as actions).
+        """
+        actions = []
+
+        sorcery_timing = (not self.game.stack and self.is_active
+                          and self.game.step.phase in [gamesteps.Phase.PRECOMBAT_MAIN,
+                                                       gamesteps.Phase.POSTCOMBAT_MAIN])
+        can_play_land = sorcery_timing and self.landPlayed < self.landPerTurn
+        affordable = {}  # mana cost -> whether the pool can pay for it
+
+        for card in self.hand:
+            if card.is_land:
+                if can_play_land:
+                    actions.append(agent.PlayCard(card))
+                continue
+
+            if not (sorcery_timing or card.is_instant or card.has_ability('Flash')):
+                continue
+
+            cost = card.raw_manacost
+            if cost not in affordable:
+                affordable[cost] = self.mana.can_afford(cost)
+
+            if affordable[cost] and card.has_valid_target():
+                actions.append(agent.PlayCard(card))
+
+        for permanent in self.battlefield:
+            for i, ability in enumerate(permanent.activated_abilities):
+                if ability.can_pay_costs() and ability.has_valid_target():
+                    actions.append(agent.ActivateAbility(permanent, i))
+
+        actions.append(agent.PassPriority())
+        return actions
 
     # separate func for unit testing
     def make_choice(self, prompt_string):
+        if self.agent is not None:
+            return self.agent.decide(agent.ChoiceDecision(self, prompt_string))
+
         ans = input(prompt_string)
         if ans == 'debug':  # TODO: only enable during dev
             pdb.set_trace()
 
         if not self.game or self.game.test:  # for debug
-            print(prompt_string[:-1])  # remove ending \n
-            print(ans)
+            gamelog.debug('choice', "{prompt}\n{answer}", prompt=prompt_string[:-1], answer=ans)
         return ans
 
     def make_choice_items_in_list(self, items, num=1, up_to=False, repetition=False):
-        print(items)
+        gamelog.debug('choice', "{items}", items=items)
         l = len(items)
 
         if num == -1:  # any number
             num = l
             up_to = True
 
+        if self.agent is not None:
+            return self.agent.decide(agent.ItemsDecision(self, items, num, up_to, repetition))
+
         while True:
             chosen = []
             try:
@@ -413,7 +477,7 @@ class Player():
                 break
 
             except (AssertionError, ValueError):
-                print("Bad input")
+                gamelog.warning('input', "Bad input")
                 pass
 
         return chosen
@@ -437,36 +501,15 @@ class Player():
     def remove_static_effect(self, source):
         """ remove all effects from a certain source """
         self.static_effects = [eff for eff in self.static_effects if eff[2] != source]
-        # each permanent should auto-remove since source's timestamp has changed
+        # the effects themselves end as the source changes zones (see GameObject.expire_dependent_effects)
 
 
     def trigger(self, condition, source=None, amount=1):
-        """Pass player-init triggers to relevant permanents
+        """Pass player-init triggers to the permanents this player controls
 
         e.g. onControllerLifeGain
         """
-        if isinstance(condition, str):
-            condition = triggers.triggerConditions[condition]
-
-        if condition == triggers.triggerConditions.onUpkeep:
-            def f(p):
-                p.status.summoning_sick = False
-            self.apply_to_battlefield(f)
-
-        elif condition == triggers.triggerConditions.onCleanup:
-            def f(p):
-                p.status.damage_taken = 0
-            self.apply_to_battlefield(f)
-
-
-        if condition in self.trigger_listeners:
-            # make copy so we can remove while iterating
-            for p, tstamp in self.trigger_listeners[condition][:]:
-                if p.timestamp == tstamp:
-                    p.trigger(condition, source, amount)
-                else:  # expired
-                    print("player-based trigger {} expired".format((p, tstamp)))
-                    self.trigger_listeners[condition].remove((p, tstamp))
+        self.game.trigger(condition, source, amount, controller=self)
 
 
     def play_card(self, card):
@@ -488,7 +531,7 @@ class Player():
                 card = self.library.pop()
                 self.hand.add(card)
             except IndexError:
-                raise EmptyLibraryException()
+                raise EmptyLibraryException(self)
 
     def add_card_to_hand(self, card):
         """ draw a specific card
@@ -538,7 +581,7 @@ class Player():
             self.library.shuffle()
 
             if face_up:
-                print(chosen)
+                gamelog.info('reveal', "{cards}", cards=chosen)
             return chosen
 
         else:
@@ -567,8 +610,21 @@ class Player():
             cards_to_discard = self.hand[:]
 
         elif rand or self.autoDiscard:
-            print("randomly discarding %i...\n" % num)
-            cards_to_discard = random.sample(self.hand.elements, num)
+            gamelog.info('discard', "randomly discarding {num}...\n", num=num)
+            cards_to_discard = self.game.rng.sample(self.hand.elements, num)
+
+        elif self.agent is not None:
+            cards_to_discard = []
+            for card in self.agent.decide(agent.DiscardDecision(self, self.hand[:], num)):
+                if card in self.hand and card not in cards_to_discard:
+                    cards_to_discard.append(card)
+            cards_to_discard = cards_to_discard[:num]
+
+            for card in self.hand[::-1]:  # not enough cards chosen; auto discard the rest
+                if len(cards_to_discard) == num:
+                    break
+                if card not in cards_to_discard:
+                    cards_to_discard.append(card)
 
         else:
             # prompt player pick which cards
@@ -577,7 +633,7 @@ class Player():
             cards_to_discard = []
 
             if not answer:  # '' to auto discard
-                print("Auto discarding\n")
+                gamelog.info('discard', "Auto discarding\n")
             else:
                 answer = answer.split(" ")
                 try:
@@ -586,11 +642,11 @@ class Player():
                         if ind < len(self.hand):
                             cards_to_discard.append(self.hand[ind])
                         else:
-                            print("Card #{} is out of bounds\n".format(ind))
+                            gamelog.warning('input', "Card #{index} is out of bounds\n", index=ind)
                             continue
                 except:
                     traceback.print_exc()
-                    print("Error processing discard")
+                    gamelog.warning('input', "Error processing discard")
 
             cards_left = num - len(cards_to_discard)
             if cards_left > 0:
@@ -611,16 +667,19 @@ class Player():
         self.create_token('colorless Clue artifact', num, [], [['2, T, Sacrifice ~', 'self.controller.draw()']])
 
     def boolster(self, num=1):
-        creatures = [(p, p.toughness) for p in self.battlefield if p.is_creature]
+        creatures = [(p, p.toughness) for p in self.creatures]
         if not creatures:
             return None
-        min_toughness = min(creatures, key=lambda i: i[1])
+        min_toughness = min(creatures, key=lambda i: i[1])[1]
         creatures = [p[0] for p in creatures if p[1] == min_toughness]
 
-        print("Bolster targets avaliable: {}".format(creatures))
+        gamelog.debug('bolster', "Bolster targets avaliable: {creatures}", creatures=creatures)
 
         if len(creatures) == 1:
             target = creatures[0]
+        elif self.agent is not None:
+            chosen = self.make_choice_items_in_list(creatures)
+            target = chosen[0] if chosen else creatures[0]
         else:
             while True:
                 ans = self.make_choice("Which creature would you like to bolster?")
@@ -631,10 +690,10 @@ class Player():
                     target = creatures[ans]
                     break
                 except ValueError:
-                    print("wrong format")
+                    gamelog.warning('input', "wrong format")
                     continue
 
-        print("Bolstering {}".format(target))
+        gamelog.info('bolster', "Bolstering {creature}", creature=target)
         target.add_counter("+1/+1", num)
 
 
@@ -667,7 +726,7 @@ class Player():
                 continue
 
         if len(avaliable_targets) < num:
-            print("auto saccing...")
+            gamelog.info('sacrifice', "auto saccing...")
             for p in avaliable_targets:
                 if p not in sacs:
                     sacs.append(p)
@@ -680,6 +739,10 @@ class Player():
         return sacs
 
 
+    def can_pay(self, mana=None, life=0):
+        """ same as pay(), without paying anything or asking the player """
+        return self.life - life > 0 and self.mana.can_afford(mana)
+
     # TODO: handle paying X life / X mana
     def pay(self, mana=None, life=0):
         """
@@ -700,7 +763,8 @@ class Player():
 
     def take_damage(self, source, dmg, is_combat=False):
         # trigger
-        print("{} takes {} damage from {}\n".format(self, dmg, source))
+        gamelog.info('damage', "{target} takes {amount} damage from {source}\n",
+                     target=self, amount=dmg, source=source)
         self.life -= dmg
 
     def gain_life(self, amount):
@@ -711,12 +775,12 @@ class Player():
             self.turn_events['life gain'] += amount
         else:
             self.turn_events['life gain'] = amount
-        print("%r: gaining %i life\n" % (self, amount))
+        gamelog.info('life', "{player!r}: gaining {amount} life\n", player=self, amount=amount)
         self.life += amount
 
     def lose_life(self, amount):
-        self.trigger('onLifeLoss', amount=amount)
-        self.game.trigger('onControllerLifeLoss', amount=amount)
+        self.trigger('onControllerLifeLoss', amount=amount)
+        self.game.trigger('onLifeLoss', amount=amount)
 
         if self.turn_events['life loss']:
             self.turn_events['life loss'] += amount
@@ -737,32 +801,17 @@ class Player():
 
     def controls(self, subtype=None, types=None, supertype=None):
         """ shortcut for checking whether a player controls something (e.g. Island, Goblin) """
-        filt = set()
-        if subtype:
-            f = self.battlefield.filter(
-                       filter_func=lambda p: subtype in p.characteristics.subtype)
-            if not filt:
-                filt = f
-            else:
-                filt &= f
-
-        if types:
-            f = self.battlefield.filter(
-                       filter_func=lambda p: types in p.characteristics.types)
-            if not filt:
-                filt = f
-            else:
-                filt &= f
-
-        if supertype:
-            f = self.battlefield.filter(
-                       filter_func=lambda p: supertype in p.characteristics.supertype)
-            if not filt:
-                filt = f
-            else:
-                filt &= f
+        found = None
+        for kind, value in (('subtype', subtype), ('type', types), ('supertype', supertype)):
+            if value:
+                permanents = self.battlefield.lookup(kind, value)
+                if found is None:
+                    found = permanents
+                else:
+                    ids = set(map(id, permanents))
+                    found = [p for p in found if id(p) in ids]
 
-        return filt
+        return found if found is not None else []
 
     def apply_to_zone(self, apply_func, zone, condition=lambda p: True):
         """Apply some function to all cards in a (public) zone
@@ -790,7 +839,7 @@ class Player():
 
 
     def lose(self):
-        print("{} has lost the game\n".format(self))
+        gamelog.info('lose', "{player} has lost the game\n", player=self)
         self.lost = True
 
 
@@ -1,45 +1,44 @@
-from io import BytesIO
-from typing import List
+import argparse
+import functools
+from collections import OrderedDict
+from concurrent import futures
 
 import pygame
-import pickle
 
+from MTG import gamelog
 from MTG.game import Game
 from MTG.card import Card
 from MTG.player import Player
 from MTG.zone import Stack
+from MTG.replay import Replay, load_replay
+from MTG.image_cache import ImageCache
 
-import requests
-from requests import exceptions
-from PIL import Image
 
+IMAGES = ImageCache()  # see image_cache.py; replaced by main() to use other sources
 
-IMAGES_DB = {}
+# card images scaled to the size they're drawn at, ready to blit:
+# (image url, (width, height)) -> pygame.Surface, least recently used first
+CARD_SURFACES = OrderedDict()
+CARD_SURFACES_LIMIT = 1024
 
 
-def _load_card_image(image_url, resize=None):
-
-    if image_url not in IMAGES_DB:
-
-        # Fetch the image
-        try:
-            response = requests.get(image_url)
+@functools.lru_cache(maxsize=None)
+def _font(name: str, size: int) -> pygame.font.Font:
+    """ pygame.font.SysFont is slow (it looks the font up among the system's): only once per font """
+    return pygame.font.SysFont(name, size)
 
-            if response.status_code == 200:
 
-                print(f"[Info] Fetched card image: {image_url}")
-                image = Image.open(BytesIO(response.content))
-                IMAGES_DB[image_url] = image
-
-            else:
-                print(f'[Error] Could not load card image: {image_url}')
-                IMAGES_DB[image_url] = None
+def _load_card_image(image_url, resize=None):
 
-        except exceptions.ConnectionError:
-            print(f'[Exception] Could not load image {image_url}')
-            IMAGES_DB[image_url] = None
+    key = (image_url, resize)
+    image_screen = CARD_SURFACES.get(key)
+    if image_screen is not None:
+        CARD_SURFACES.move_to_end(key)
+        return image_screen
 
-    image = IMAGES_DB[image_url]
+    # never waits: an image that isn't loaded yet is drawn blank, and loaded in the
+    # background (pygame_event_loop draws again once it is)
+    image = IMAGES.get(image_url, block=False)
 
     if image is not None:
 
@@ -48,7 +47,12 @@ def _load_card_image(image_url, resize=None):
 
         image_data = image.tobytes()
         image_dimensions = image.size
-        image_screen = pygame.image.fromstring(image_data, image_dimensions, "RGB")
+        image_screen = pygame.image.fromstring(image_data, image_dimensions, "RGB").convert()
+
+        # scaled & converted once per image and size, not every frame
+        CARD_SURFACES[key] = image_screen
+        while len(CARD_SURFACES) > CARD_SURFACES_LIMIT:
+            CARD_SURFACES.popitem(last=False)
 
     else:
         image_screen = pygame.Surface(resize)
@@ -56,13 +60,36 @@ def _load_card_image(image_url, resize=None):
     return image_screen
 
 
-def pygame_event_loop(screen: pygame.Surface, replay: List[Game]) -> None:
+def replay_image_urls(replay: Replay) -> set:
+    """ the image urls of every card of both decks """
+    gamestate = replay[0]
+    urls = set()
+    for player in gamestate.players_list:
+        for zone in (player.library, player.hand, player.battlefield,
+                     player.graveyard, player.exile):
+            for card in zone:
+                card = getattr(card, 'original_card', None) or card
+                urls.add(card.characteristics.image_url)
+    urls.discard(None)
+    return urls
+
+
+def prefetch_replay_images(replay: Replay, timeout=None) -> None:
+    """ load the images of every card of both decks, before the replay opens """
+    urls = replay_image_urls(replay)
+    gamelog.info('image', "Loading {count} card images...", count=len(urls))
+    futures.wait(IMAGES.prefetch(urls), timeout=timeout)
+
+
+def pygame_event_loop(screen: pygame.Surface, replay: Replay) -> None:
 
     clock = pygame.time.Clock()
 
+    renderer = FrameRenderer(screen)
+
     running = True
     replay_step = 0
-    last_drawn_step = None
+    last_drawn = None  # (step, IMAGES.version) of the last frame drawn
     while running:
 
         for event in pygame.event.get():
@@ -79,65 +106,152 @@ def pygame_event_loop(screen: pygame.Surface, replay: List[Game]) -> None:
             if event.type == pygame.QUIT:
                 running = False
 
-        if last_drawn_step != replay_step:
+        # draw again when the step changes, or when images got loaded in the meantime;
+        # only the regions that look different get drawn, and sent to the display
+        if last_drawn != (replay_step, IMAGES.version):
 
+            last_drawn = (replay_step, IMAGES.version)
             gamestate = replay[replay_step]
-            screen.fill((0, 0, 0))
-            render_gamestate_frame(gamestate, screen)
-            pygame.display.flip()
+            dirty = renderer.draw(gamestate)
+            if dirty:
+                pygame.display.update(dirty)
 
-            last_drawn_step = replay_step
             pygame.display.set_caption(f'Step: {replay_step + 1}/{len(replay)}')
 
         clock.tick(60)
 
+    # fonts and surfaces don't outlive pygame
+    _font.cache_clear()
+    CARD_SURFACES.clear()
     pygame.quit()
+    IMAGES.close()
 
 
-def render_gamestate_frame(gamestate: Game, screen: pygame.Surface) -> None:
-
-    row_h = screen.get_height() / 10
-
-    # Divide the screen into 3 zones: player 1, stack, player 2
-    player1_screen = screen.subsurface(pygame.Rect(0, 0, screen.get_width(), 4 * row_h))
-    turn_screen = screen.subsurface(pygame.Rect(0, 4 * row_h, screen.get_width(), 2 * row_h))
-    player2_screen = screen.subsurface(pygame.Rect(0, 6 * row_h, screen.get_width(), 4 * row_h))
+PLAYER_COLORS = ((255, 0, 0), (0, 255, 0))  # upper & lower player
 
-    player1_screen.fill((255, 0, 0))
-    turn_screen.fill((255, 255, 255))
-    player2_screen.fill((0, 255, 0))
 
-    render_player_state(gamestate.players_list[0], player1_screen)
-    render_player_state(gamestate.players_list[1], player2_screen)
-    render_turn_state(gamestate, turn_screen)
+def frame_layout(screen: pygame.Surface) -> dict:
+    """ the regions of a frame, as {name: pygame.Rect}
 
+    The screen is divided into 3 zones: player 1, turn (stack & info), player 2.
+    Each player zone has a status line, then 3 rows (hand, nonlands, lands) next
+    to a column for library, graveyard and exile.
+    """
+    screen_w = screen.get_width()
+    row_h = screen.get_height() / 10
+    status_h = _font('serif', 32).get_height()
+
+    layout = {}
+    for i, player_y0 in enumerate((0, 6 * row_h)):
+        player_h = 4 * row_h
+        remaining_h = player_h - status_h
+        player_row_h = remaining_h / 3
+        col_w = screen_w / 7  # 1 col for deck, graveyard and exile, 6 for the rest of the battlefield/hand
+
+        rows_y0 = player_y0 + status_h
+        layout[f'player{i}.status'] = pygame.Rect(0, player_y0, screen_w, status_h)
+        layout[f'player{i}.hand'] = pygame.Rect(0, rows_y0, 6 * col_w, player_row_h)
+        layout[f'player{i}.nonlands'] = pygame.Rect(0, rows_y0 + player_row_h, 6 * col_w, player_row_h)
+        layout[f'player{i}.lands'] = pygame.Rect(0, rows_y0 + 2 * player_row_h, 6 * col_w, player_row_h)
+        layout[f'player{i}.lge'] = pygame.Rect(6 * col_w, rows_y0, col_w, remaining_h)  # Library, Graveyard, Exile
+
+    layout['stack'] = pygame.Rect(0, 4 * row_h, screen_w / 2, 2 * row_h)
+    layout['info'] = pygame.Rect(screen_w / 2, 4 * row_h, screen_w / 2, 2 * row_h)
+    return layout
+
+
+def _cards_signature(cards) -> tuple:
+    """ what a row of cards looks like: their images, and whether they're loaded yet """
+    urls = [card.characteristics.image_url for card in cards]
+    return tuple([(url, url in IMAGES) for url in urls])
+
+
+def frame_regions(gamestate: Game) -> dict:
+    """ {region name: (signature, render function)}
+
+    The signature of a region describes everything that its render function
+    draws: two game states whose signatures match for a region look the same
+    there. A render function takes the subsurface of its region.
+    """
+    regions = {}
+    for i, player in enumerate(gamestate.players_list[:2]):
+        nonlands = [p.original_card for p in player.battlefield if not p.is_land]
+        lands = [p.original_card for p in player.battlefield if p.is_land]
+
+        regions[f'player{i}.status'] = (
+            (player.name, player.life),
+            functools.partial(render_player_status, player, color=PLAYER_COLORS[i]))
+        regions[f'player{i}.hand'] = (
+            _cards_signature(player.hand),
+            functools.partial(render_player_hand, player))
+        regions[f'player{i}.nonlands'] = (
+            _cards_signature(nonlands),
+            functools.partial(render_cards_row, nonlands, color=(100, 100, 100)))
+        regions[f'player{i}.lands'] = (
+            _cards_signature(lands),
+            functools.partial(render_cards_row, lands, color=(125, 125, 125)))
+        # TODO: Render player library, graveyard, exile
+        regions[f'player{i}.lge'] = ((), lambda screen: screen.fill((75, 75, 75)))
+
+    upper_player = gamestate.players_list[0]
+    regions['stack'] = ((), functools.partial(render_stack_state, gamestate.stack))
+    regions['info'] = (
+        (gamestate.turn_num, gamestate.current_player is upper_player,
+         gamestate.passed_priority, getattr(gamestate, 'current_step', None)),
+        functools.partial(render_turn_info, gamestate))
+    return regions
+
+
+class FrameRenderer():
+    """Draws game states on a screen, redrawing only the regions that
+    changed since the last one it drew (see frame_regions)
+
+        dirty = renderer.draw(gamestate)
+        pygame.display.update(dirty)
+    """
+
+    def __init__(self, screen: pygame.Surface):
+        self.screen = screen
+        self.layout = frame_layout(screen)
+        self.drawn = {}  # region name -> signature of what's on screen there
+
+    def draw(self, gamestate: Game) -> list:
+        """ returns the rects of the screen that changed """
+        if not self.drawn:
+            self.screen.fill((0, 0, 0))
+
+        dirty = []
+        for name, (signature, render) in frame_regions(gamestate).items():
+            if name in self.drawn and self.drawn[name] == signature:
+                continue
+            rect = self.layout[name]
+            render(self.screen.subsurface(rect))
+            self.drawn[name] = signature
+            dirty.append(rect)
+
+        return dirty if len(dirty) < len(self.layout) else [self.screen.get_rect()]
+
+    def invalidate(self) -> None:
+        """ draw everything again next time """
+        self.drawn.clear()
 
-def render_player_state(player: Player, player_screen: pygame.Surface) -> None:
-
-    player_status_str = f"Player {player.name} - Life: {player.life}"
-    player_status = pygame.font.SysFont('serif', 32).render(player_status_str, True, (0, 0, 0))
-    player_screen.blit(player_status, (0, 0))
 
-    status_h = player_status.get_height()
-    remaining_h = player_screen.get_height() - status_h
-    row_h = remaining_h / 3  # 1 col Hand, 2 cols Battlefield (non-lands, lands)
-    col_w = player_screen.get_width() / 7  # 1 col for deck, graveyard and exile, 6 for the rest of the battlefield/hand
+def render_gamestate_frame(gamestate: Game, screen: pygame.Surface) -> None:
+    FrameRenderer(screen).draw(gamestate)
 
-    hand_subscreen = player_screen.subsurface(pygame.Rect(0, status_h, 6 * col_w, row_h))
-    battlefield_subscreen = player_screen.subsurface(pygame.Rect(0, status_h + row_h, 6 * col_w, 2 * row_h))
-    lge_subscreen = player_screen.subsurface(pygame.Rect(6 * col_w, status_h, col_w, remaining_h))  # Library, Graveyard, Exile
 
-    hand_subscreen.fill((25, 25, 25))
-    battlefield_subscreen.fill((50, 50, 50))
-    lge_subscreen.fill((75, 75, 75))
+def render_player_status(player: Player, status_screen: pygame.Surface, color=(255, 255, 255)) -> None:
 
-    render_player_hand(player, hand_subscreen)
-    render_player_battlefield(player, battlefield_subscreen)
-    # TODO: Render player library, graveyard, exile
+    status_screen.fill(color)
+    player_status_str = f"Player {player.name} - Life: {player.life}"
+    player_status = _font('serif', 32).render(player_status_str, True, (0, 0, 0))
+    status_screen.blit(player_status, (0, 0))
 
 
 def render_player_hand(player: Player, hand_screen: pygame.Surface) -> None:
 
+    hand_screen.fill((25, 25, 25))
+
     num_cols = 15
     col_w = hand_screen.get_width() / num_cols
     screen_h = hand_screen.get_height()
@@ -146,7 +260,7 @@ def render_player_hand(player: Player, hand_screen: pygame.Surface) -> None:
 
         if i == num_cols - 1:
             more_cards_str = f" + others"
-            more_cards = pygame.font.SysFont('serif', 32).render(more_cards_str, True, (0, 0, 0))
+            more_cards = _font('serif', 32).render(more_cards_str, True, (0, 0, 0))
             hand_screen.blit(more_cards, (i * col_w, 0))
             break
 
@@ -157,34 +271,17 @@ def render_player_hand(player: Player, hand_screen: pygame.Surface) -> None:
         render_card(card, card_subscreen)
 
 
-def render_player_battlefield(player: Player, battlefield_screen: pygame) -> None:
-
-    num_cols = 15
-    screen_w = battlefield_screen.get_width()
-    col_w = screen_w / num_cols
-    row_h = battlefield_screen.get_height() / 2
-
-    nonlands_subscreen = battlefield_screen.subsurface(pygame.Rect(0, 0, screen_w, row_h))
-    lands_subscreen = battlefield_screen.subsurface(pygame.Rect(0, row_h, screen_w, row_h))
+def render_cards_row(cards: list, row_screen: pygame.Surface, color=(100, 100, 100)) -> None:
 
-    nonlands_subscreen.fill((100, 100, 100))
-    lands_subscreen.fill((125, 125, 125))
+    row_screen.fill(color)
 
-    nonlands_i = 0  # Column indexes to be occupied next
-    lands_i = 0     # by nonlands and lands respectively
-    for i, permanent in enumerate(player.battlefield):
+    num_cols = 15
+    col_w = row_screen.get_width() / num_cols
+    row_h = row_screen.get_height()
 
-        if permanent.is_land:
-            card_y0 = row_h
-            card_x0 = lands_i * col_w
-            lands_i += 1
-        else:
-            card_y0 = 0
-            card_x0 = nonlands_i * col_w
-            nonlands_i += 1
+    for i, card in enumerate(cards[:num_cols]):
 
-        card_subscreen = battlefield_screen.subsurface(pygame.Rect(card_x0, card_y0, col_w, row_h))
-        card = permanent.original_card
+        card_subscreen = row_screen.subsurface(pygame.Rect(i * col_w, 0, col_w, row_h))
         render_card(card, card_subscreen)
 
         # TODO: Render status
@@ -199,35 +296,22 @@ def render_card(card: Card, card_screen: pygame.Surface) -> None:
     if card_screen is not None:
         rendered_card = card_img_screen
     else:
-        rendered_card = pygame.font.SysFont('serif', 8).render(card_img_url, True, (0, 0, 0))
+        rendered_card = _font('serif', 8).render(card_img_url, True, (0, 0, 0))
 
     card_screen.blit(rendered_card, (0, 0))
 
 
-def render_turn_state(game: Game, turn_screen: pygame.Surface) -> None:
-
-    screen_h = turn_screen.get_height()
-    col_w = turn_screen.get_width() / 2
-
-    stack_subscreen = turn_screen.subsurface(pygame.Rect(0, 0, col_w, screen_h))
-    info_subscreen = turn_screen.subsurface(pygame.Rect(col_w, 0, col_w, screen_h))
-
-    stack_subscreen.fill((200, 200, 225))
-    info_subscreen.fill((225, 225, 225))
-
-    render_stack_state(game.stack, stack_subscreen)
-    render_turn_info(game, info_subscreen)
-
-
 def render_stack_state(stack: Stack, stack_screen: pygame.Surface) -> None:
 
-    stack_name = pygame.font.SysFont('serif', 32).render("Stack", True, (0, 0, 0))
+    stack_screen.fill((200, 200, 225))
+    stack_name = _font('serif', 32).render("Stack", True, (0, 0, 0))
     stack_screen.blit(stack_name, (0, 0))
 
 
 def render_turn_info(game: Game, turn_screen: pygame.Surface) -> None:
 
-    info = pygame.font.SysFont('serif', 32).render("Info", True, (0, 0, 0))
+    turn_screen.fill((225, 225, 225))
+    info = _font('serif', 32).render("Info", True, (0, 0, 0))
     turn_screen.blit(info, (0, 0))
 
     turn_number = f"Turn #{game.turn_num}"
@@ -252,20 +336,33 @@ def render_turn_info(game: Game, turn_screen: pygame.Surface) -> None:
 
     turn_priority_str = " - ".join((turn_number, current_player, priority))
 
-    turn_priority_info = pygame.font.SysFont('serif', 24).render(turn_priority_str, True, (0, 0, 0))
+    turn_priority_info = _font('serif', 24).render(turn_priority_str, True, (0, 0, 0))
     turn_screen.blit(turn_priority_info, (0, info.get_height()))
 
     turn_step_str = f"Turn step: {game.current_step}"
-    turn_step_info = pygame.font.SysFont('serif', 24).render(turn_step_str, True, (0, 0, 0))
+    turn_step_info = _font('serif', 24).render(turn_step_str, True, (0, 0, 0))
     turn_screen.blit(turn_step_info, (0, info.get_height() + turn_priority_info.get_height()))
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    global IMAGES
 
-    with open('test_replay.pkl', 'rb') as pickled_game:
-        replay = pickle.load(pickled_game)
+    parser = argparse.ArgumentParser(description="Step through a recorded replay")
+    parser.add_argument('replay', nargs='?', default='test_replay.pkl', help="replay file")
+    parser.add_argument('--images', default=None, help="local directory of card images")
+    parser.add_argument('--offline', action='store_true', help="don't fetch images from the network")
+    args = parser.parse_args(argv)
+
+    gamelog.configure(gamelog.ConsoleSink(gamelog.INFO))
+    IMAGES = ImageCache(local_dir=args.images, offline=args.offline)
+    replay = load_replay(args.replay)
+    prefetch_replay_images(replay)
 
     pygame.init()
     screen = pygame.display.set_mode((1440, 810))
     pygame_event_loop(screen, replay)
 
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,612 @@
+"""Compact replay recording
+
+A replay is made of one full snapshot of the game (the first recorded step)
+followed by an ordered log of deltas, one for each later step.
+
+Every object reachable from the game (players, zones, cards, permanents,
+statuses, effects, mana pools...) is given a replay object id (oid), and its
+state is encoded as a dict of attribute values in which references to other
+objects are replaced by Ref(oid). Snapshot and deltas are lists of operations:
+
+    ('new', oid, cls)           an object entered the game
+    ('set', oid, attr, value)   an attribute of an object changed
+    ('del', oid, attr)          an attribute was removed from an object
+    ('drop', oid)               an object is no longer part of the game
+
+Zone moves show up as 'set's of the zones' `elements`, life changes as 'set's
+of `Player.life`, status flips as 'set's of `Status` attributes and effects
+being added or removed as 'set's of a permanent's `effects`.
+
+Any step can be rebuilt on demand by replaying the operations up to it.
+
+Objects that subclass Tracked (game objects, their statuses and
+characteristics, zones) tell the recorders when they change, so that a
+recorder only encodes them again when they did; the others (the game, players,
+mana pools...) are encoded and diffed at every step.
+
+Replay files are chunked, so that a replay can be opened without reading all
+of it, and any step rebuilt without decoding the ones before it:
+
+    header      MAGIC, format version, keyframe interval
+    records     one pickle per step: the snapshot (step 0), then each delta;
+                every `keyframe interval` steps, also a keyframe: the whole
+                encoded state of the game at that step
+    index       number of steps and of keyframes, then little-endian uint64
+                arrays: start & end offsets of each step, step number, start
+                & end offsets of each keyframe
+    footer      offset of the index, MAGIC
+
+ReplayWriter writes them one step at a time; load_replay() memory-maps them,
+and rebuilds step N from the last keyframe at or before N, plus the deltas
+after it (at most `keyframe interval` - 1 of them).
+"""
+
+import io
+import mmap
+import pickle
+import struct
+import sys
+import types
+import weakref
+from array import array
+from bisect import bisect_right
+from enum import Enum
+from collections import defaultdict
+
+from sortedcontainers import SortedList, SortedKeyList
+
+
+REPLAY_FORMAT_VERSION = 2
+
+MAGIC = b'MTGRPLY\0'
+_HEADER = struct.Struct('<8sII')  # MAGIC, format version, keyframe interval
+_INDEX_HEADER = struct.Struct('<QQ')  # number of steps, number of keyframes
+_FOOTER = struct.Struct('<Q8s')  # offset of the index, MAGIC
+
+KEYFRAME_INTERVAL = 100
+
+ROOT_OID = 0  # the game itself is always the first object to be recorded
+
+_ATOMIC_TYPES = (bool, int, float, complex, str, bytes, type, Enum,
+                 types.FunctionType, types.BuiltinFunctionType, types.ModuleType)
+
+# the most common atomic values, checked by exact type before anything else
+_ATOMIC_EXACT_TYPES = frozenset([type(None), bool, int, float, str, types.FunctionType])
+
+_MISSING = object()
+
+_recorders = []  # weak references to the recorders that keep track of changes, see Tracked
+
+
+def changed(obj):
+    """ obj (a Tracked object) changed in place: it has to be encoded again """
+    for recorder in _recorders:
+        recorder()._changed.add(id(obj))
+
+
+class Tracked():
+    """Objects whose state only changes through setting their attributes, or
+    in methods that call changed(self) -- a recorder doesn't encode them again
+    until they do
+
+    Setting attributes is only hooked while a recorder keeps track of changes
+    (see _track): it costs nothing more the rest of the time.
+    """
+    __slots__ = ()
+
+
+def _tracked_setattr(self, name, value):
+    object.__setattr__(self, name, value)
+    changed(self)
+
+
+def _track(recorder_ref=None):
+    """ hook Tracked.__setattr__ if a recorder is alive, unhook it otherwise
+
+    recorder_ref: weak reference to a recorder that's gone
+    """
+    if recorder_ref is not None:
+        _recorders.remove(recorder_ref)
+    if _recorders:
+        Tracked.__setattr__ = _tracked_setattr
+    elif '__setattr__' in Tracked.__dict__:
+        del Tracked.__setattr__
+
+
+class Ref():
+    """ reference to the object with replay id `oid` """
+    __slots__ = ('oid',)
+
+    def __init__(self, oid):
+        self.oid = oid
+
+    def __getstate__(self):
+        return self.oid
+
+    def __setstate__(self, oid):
+        self.oid = oid
+
+    def __eq__(self, other):
+        return isinstance(other, Ref) and self.oid == other.oid
+
+    def __hash__(self):
+        return hash(self.oid)
+
+    def __repr__(self):
+        return 'Ref(%r)' % self.oid
+
+
+def _has_custom(obj, method):
+    """ True if obj's class overrides object.`method` (e.g. __getstate__) """
+    return getattr(type(obj), method, None) is not getattr(object, method, None)
+
+
+def _get_state(obj):
+    """ the state of obj, as it would be pickled """
+    if _has_custom(obj, '__getstate__'):
+        state = obj.__getstate__()
+    else:
+        state = obj.__dict__
+
+    if state is None:
+        return {}
+    if not isinstance(state, dict):  # e.g. random.Random
+        return {'__state__': state}
+    return state
+
+
+def _set_state(obj, state):
+    if '__state__' in state:
+        obj.__setstate__(state['__state__'])
+    elif _has_custom(obj, '__setstate__'):
+        obj.__setstate__(state)
+
+
+def _has_ref(value):
+    if isinstance(value, Ref):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return any(_has_ref(v) for v in value)
+    return False
+
+
+def _decode(value, objects, deferred):
+    """ inverse of ReplayRecorder._encode
+
+    Containers that hash game objects (sets, dicts keyed by objects) are
+    returned empty and filled in later, once every object has its attributes.
+    """
+    if isinstance(value, Ref):
+        return objects[value.oid]
+
+    if type(value) is not tuple:
+        return value
+
+    tag, *payload = value
+    if tag == 'list':
+        return [_decode(v, objects, deferred) for v in payload[0]]
+    if tag == 'tuple':
+        return tuple(_decode(v, objects, deferred) for v in payload[0])
+    if tag == 'method':
+        return getattr(_decode(payload[0], objects, deferred), payload[1])
+    if tag == 'sortedlist':
+        key, items = payload
+        items = [_decode(v, objects, deferred) for v in items]
+        return SortedKeyList(items, key=key) if key is not None else SortedList(items)
+
+    if tag in ('dict', 'defaultdict'):
+        if tag == 'dict':
+            container, pairs = {}, payload[0]
+        else:
+            container, pairs = defaultdict(payload[0]), payload[1]
+        if any(_has_ref(k) for k, _ in pairs):
+            deferred.append((container, pairs))
+        else:
+            for k, v in pairs:
+                container[_decode(k, objects, deferred)] = _decode(v, objects, deferred)
+        return container
+
+    if tag in ('set', 'frozenset'):
+        items = payload[0]
+        if tag == 'set' and any(_has_ref(v) for v in items):
+            container = set()
+            deferred.append((container, items))
+            return container
+        items = [_decode(v, objects, deferred) for v in items]
+        return set(items) if tag == 'set' else frozenset(items)
+
+    raise ValueError("Unknown replay value tag: %r" % tag)
+
+
+def _apply(operations, classes, states):
+    for op in operations:
+        if op[0] == 'set':
+            states[op[1]][op[2]] = op[3]
+        elif op[0] == 'new':
+            classes[op[1]] = op[2]
+            states[op[1]] = {}
+        elif op[0] == 'del':
+            del states[op[1]][op[2]]
+        elif op[0] == 'drop':
+            del classes[op[1]]
+            del states[op[1]]
+
+
+def _materialize(classes, states):
+    """ build actual objects out of the encoded states; returns the game """
+    objects = {oid: cls.__new__(cls) for oid, cls in classes.items()}
+    deferred = []
+    decoded = {}
+    for oid, state in states.items():
+        decoded[oid] = {attr: _decode(value, objects, deferred)
+                        for attr, value in state.items()}
+        if '__state__' not in decoded[oid]:
+            objects[oid].__dict__.update(decoded[oid])
+
+    # deferred may grow while we go through it (nested containers)
+    i = 0
+    while i < len(deferred):
+        container, items = deferred[i]
+        if isinstance(container, dict):
+            for k, v in items:
+                container[_decode(k, objects, deferred)] = _decode(v, objects, deferred)
+        else:
+            container.update(_decode(v, objects, deferred) for v in items)
+        i += 1
+
+    for oid, state in decoded.items():
+        _set_state(objects[oid], state)
+
+    game = objects[ROOT_OID]
+    game.recording_replay = False
+    game.replay = None
+    return game
+
+
+class Replay():
+    """A recorded game: a full snapshot of its first recorded step,
+    plus the deltas that lead to each of the following steps
+
+    Indexing a replay (replay[i]) rebuilds the i-th step as a Game object.
+    """
+
+    def __init__(self, snapshot=None, deltas=None):
+        self.snapshot = snapshot
+        self.deltas = [] if deltas is None else deltas
+
+    def __len__(self):
+        return 0 if self.snapshot is None else len(self.deltas) + 1
+
+    def __getitem__(self, step):
+        return self.rebuild(step)
+
+    def operations(self, step):
+        """ the operations of a step: the snapshot for the first one, a delta for the others """
+        return self.snapshot if step == 0 else self.deltas[step - 1]
+
+    def keyframe(self, step):
+        """ (keyframe step, classes, states) of the last keyframe at or before step;
+        (-1, {}, {}) if there's none
+        """
+        return -1, {}, {}
+
+    def rebuild(self, step):
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("replay step out of range")
+
+        keyframe_step, classes, states = self.keyframe(step)
+        for i in range(keyframe_step + 1, step + 1):
+            _apply(self.operations(i), classes, states)
+
+        return _materialize(classes, states)
+
+    def store(self, filename, keyframe_interval=KEYFRAME_INTERVAL):
+        """ Write the replay to disk (see ReplayWriter)
+
+        Functions that pickle cannot store (lambdas, local functions) are
+        written as None: a replay loaded from disk is meant to be looked at,
+        not played on.
+        """
+        with ReplayWriter(filename, keyframe_interval) as writer:
+            for step in range(len(self)):
+                writer.add(self.operations(step))
+
+
+class ReplayRecorder(Replay):
+    """Records a game as it's being played; call record() once per step
+
+    incremental: skip the Tracked objects that didn't change since the last
+    step (their encoded state, and the objects it refers to, are the same);
+    otherwise, every object is encoded and diffed at every step.
+    """
+
+    def __init__(self, game, incremental=True):
+        super(ReplayRecorder, self).__init__()
+        self.game = game
+        self._next_oid = ROOT_OID
+        self._oids = {}      # id(obj) -> oid
+        self._objects = {}   # oid -> obj; keeps ids from being reused
+        self._refs = {}      # oid -> Ref(oid)
+        self._shadow = {}    # oid -> last recorded (encoded) state
+        self._children = {}  # oid -> oids its last recorded state refers to (Tracked objects only)
+        self._changed = set()  # ids of the Tracked objects changed since the last step
+        self.incremental = incremental
+        if incremental:
+            _recorders.append(weakref.ref(self, _track))
+            _track()
+
+    def record(self, step=None):
+        """ Diff the game against the last recorded step, and log the differences """
+        if step is not None:
+            self.game.current_step = step
+
+        self._new_objects = []
+        self._reached = set()
+        self._pending = []
+        self._visited = []
+        changes = []
+        self._ref(self.game)
+
+        while self._pending:
+            obj = self._pending.pop()
+            oid = self._oids[id(obj)]
+            tracked = self.incremental and isinstance(obj, Tracked)
+            if tracked and oid in self._shadow and id(obj) not in self._changed:
+                # unchanged: only the objects it refers to have to be looked at
+                for child in self._children[oid]:
+                    if child not in self._reached:
+                        self._reached.add(child)
+                        self._pending.append(self._objects[child])
+                continue
+
+            self._visited = children = []
+            state = {attr: self._encode(value)
+                     for attr, value in _get_state(obj).items()}
+            if tracked:
+                self._children[oid] = children
+
+            old_state = self._shadow.get(oid, {})
+            for attr, value in state.items():
+                if old_state.get(attr, _MISSING) != value:
+                    changes.append(('set', oid, attr, value))
+            for attr in old_state.keys() - state.keys():
+                changes.append(('del', oid, attr))
+
+            self._shadow[oid] = state
+
+        for oid in [oid for oid in self._objects if oid not in self._reached]:
+            del self._oids[id(self._objects.pop(oid))]
+            del self._shadow[oid]
+            del self._refs[oid]
+            self._children.pop(oid, None)
+            changes.append(('drop', oid))
+        self._changed.clear()
+
+        if self.snapshot is None:
+            self.snapshot = self._new_objects + changes
+        else:
+            self.deltas.append(self._new_objects + changes)
+
+        self._new_objects = self._reached = self._pending = self._visited = None
+
+    def _ref(self, obj):
+        oid = self._oids.get(id(obj))
+        if oid is None:
+            oid = self._next_oid
+            self._next_oid += 1
+            self._oids[id(obj)] = oid
+            self._objects[oid] = obj
+            self._refs[oid] = Ref(oid)
+            self._new_objects.append(('new', oid, type(obj)))
+
+        self._visited.append(oid)
+        if oid not in self._reached:
+            self._reached.add(oid)
+            self._pending.append(obj)
+
+        return self._refs[oid]
+
+    def _encode(self, value):
+        """ turn value into an immutable, comparable description of itself """
+        value_type = type(value)
+        if value_type in _ATOMIC_EXACT_TYPES:
+            return value
+
+        if value_type is list:
+            return ('list', tuple([self._encode(v) for v in value]))
+        if isinstance(value, _ATOMIC_TYPES):
+            return value
+        if isinstance(value, tuple):
+            if _ATOMIC_EXACT_TYPES.issuperset(map(type, value)):  # e.g. the state of a Random
+                return ('tuple', tuple(value))
+            return ('tuple', tuple([self._encode(v) for v in value]))
+        if isinstance(value, dict):
+            pairs = tuple([(self._encode(k), self._encode(v))
+                           for k, v in value.items()])
+            if hasattr(value, 'default_factory'):
+                return ('defaultdict', value.default_factory, pairs)
+            return ('dict', pairs)
+        if isinstance(value, (set, frozenset)):
+            return ('set' if isinstance(value, set) else 'frozenset',
+                    frozenset([self._encode(v) for v in value]))
+        if isinstance(value, SortedList):
+            return ('sortedlist', getattr(value, 'key', None),
+                    tuple([self._encode(v) for v in value]))
+        if isinstance(value, types.MethodType):
+            return ('method', self._encode(value.__self__), value.__func__.__name__)
+        if isinstance(value, list):
+            return ('list', tuple([self._encode(v) for v in value]))
+
+        if not hasattr(value, '__dict__'):
+            return value
+
+        return self._ref(value)
+
+
+class _ReplayPickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if isinstance(obj, types.FunctionType) and '<' in obj.__qualname__:
+            return 'unpicklable function'
+        return None
+
+
+class _ReplayUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return None
+
+
+def _dumps(obj):
+    f = io.BytesIO()
+    _ReplayPickler(f, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return f.getvalue()
+
+
+def _loads(data):
+    return _ReplayUnpickler(io.BytesIO(data)).load()
+
+
+def _uint64s(values):
+    """ values as little-endian uint64s """
+    values = array('Q', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_uint64s(data, offset, count):
+    """ (array of count little-endian uint64s at data[offset:], offset after them) """
+    end = offset + 8 * count
+    values = array('Q', data[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
+
+
+class ReplayWriter():
+    """Writes a replay file one step at a time, so that a game being
+    recorded never has to be held in memory as a whole
+
+        with ReplayWriter(filename) as writer:
+            writer.add(snapshot)
+            writer.add(delta)
+            ...
+
+    The file can only be read once the writer is closed (the index is written last).
+    """
+
+    def __init__(self, filename, keyframe_interval=KEYFRAME_INTERVAL):
+        assert keyframe_interval > 0
+        self.keyframe_interval = keyframe_interval
+        self._file = open(filename, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, REPLAY_FORMAT_VERSION, keyframe_interval))
+
+        self._classes, self._states = {}, {}  # the state of the game at the last step added
+        self._step_starts, self._step_ends = array('Q'), array('Q')
+        self._keyframe_steps = array('Q')
+        self._keyframe_starts, self._keyframe_ends = array('Q'), array('Q')
+
+    def __len__(self):
+        return len(self._step_starts)
+
+    def _write(self, obj, starts, ends):
+        starts.append(self._file.tell())
+        self._file.write(_dumps(obj))
+        ends.append(self._file.tell())
+
+    def add(self, operations):
+        """ add the next step: the snapshot if it's the first, a delta otherwise """
+        step = len(self)
+        self._write(operations, self._step_starts, self._step_ends)
+        _apply(operations, self._classes, self._states)
+
+        if step > 0 and step % self.keyframe_interval == 0:
+            self._keyframe_steps.append(step)
+            self._write((self._classes, self._states), self._keyframe_starts, self._keyframe_ends)
+
+    def close(self):
+        if self._file is None:
+            return
+        index_offset = self._file.tell()
+        self._file.write(_INDEX_HEADER.pack(len(self), len(self._keyframe_steps)))
+        for values in (self._step_starts, self._step_ends, self._keyframe_steps,
+                       self._keyframe_starts, self._keyframe_ends):
+            self._file.write(_uint64s(values))
+        self._file.write(_FOOTER.pack(index_offset, MAGIC))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MappedReplay(Replay):
+    """A replay file, memory-mapped: opening it only reads its index, and
+    rebuilding a step only decodes what's needed for it
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        self._map = data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.keyframe_interval = _HEADER.unpack_from(data, 0)
+        index_offset, end_magic = _FOOTER.unpack_from(data, len(data) - _FOOTER.size)
+        assert magic == MAGIC and end_magic == MAGIC, "Not a replay file (or not a complete one)"
+        assert version == REPLAY_FORMAT_VERSION, "Unsupported replay format"
+
+        num_steps, num_keyframes = _INDEX_HEADER.unpack_from(data, index_offset)
+        offset = index_offset + _INDEX_HEADER.size
+        self._step_starts, offset = _read_uint64s(data, offset, num_steps)
+        self._step_ends, offset = _read_uint64s(data, offset, num_steps)
+        self._keyframe_steps, offset = _read_uint64s(data, offset, num_keyframes)
+        self._keyframe_starts, offset = _read_uint64s(data, offset, num_keyframes)
+        self._keyframe_ends, offset = _read_uint64s(data, offset, num_keyframes)
+
+    @property
+    def snapshot(self):
+        return self.operations(0) if len(self) else None
+
+    def __len__(self):
+        return len(self._step_starts)
+
+    def operations(self, step):
+        return _loads(self._map[self._step_starts[step]:self._step_ends[step]])
+
+    def keyframe(self, step):
+        i = bisect_right(self._keyframe_steps, step) - 1
+        if i < 0:
+            return super(MappedReplay, self).keyframe(step)
+        classes, states = _loads(self._map[self._keyframe_starts[i]:self._keyframe_ends[i]])
+        return self._keyframe_steps[i], classes, states
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_replay(filename):
+    """ Open a replay written by Replay.store()
+
+    Replay files are memory-mapped (see MappedReplay); replays stored as a
+    single pickle (format version 1) are read whole.
+    """
+    with open(filename, 'rb') as f:
+        chunked = f.read(len(MAGIC)) == MAGIC
+    if chunked:
+        return MappedReplay(filename)
+
+    with open(filename, 'rb') as f:
+        data = _ReplayUnpickler(f).load()
+
+    assert data['version'] == 1, "Unsupported replay format"
+    return Replay(data['snapshot'], data['deltas'])
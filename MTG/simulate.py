@@ -0,0 +1,170 @@
+"""Batch simulation of bot-vs-bot games
+
+    python -m MTG.simulate card_db/decks/mono_red.txt card_db/decks/mono_green.txt \
+        -n 1000 --agents random random --seed 0 -o results.jsonl
+
+Games are spread over a multiprocessing pool; each worker sets up the card
+database once, then plays whole games on its own. Results are streamed to the
+output file as JSON lines as soon as each game ends (so not in game order):
+
+    {"game": 3, "seed": 3, "winner": "player1", "turns": 17,
+     "life": {"player0": 0, "player1": 12}, "wall_time": 0.051}
+
+winner is null if the game hit the turn limit.
+
+With --stats, each game is profiled (see gamestats.py): its result gets the
+game's statistics under "stats", and the summary printed at the end adds them
+up over every game.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+from MTG import game
+from MTG import cards
+from MTG import agent
+from MTG import mcts
+from MTG import gamelog
+from MTG import gamestats
+from MTG.exceptions import *
+from MTG.utils import path_from_home
+
+
+AGENTS = {
+    'pass': lambda seed: agent.Agent(),
+    'random': lambda seed: agent.RandomAgent(seed),
+    'heuristic': lambda seed: agent.HeuristicAgent(seed),
+    'mcts': lambda seed: mcts.MCTSAgent(seed=seed),  # searches in the worker's own process
+}
+
+
+_profile = False  # whether play_game profiles its games, see _init_worker
+
+
+def _init_worker(quiet, profile=False):
+    global _profile
+    _profile = profile
+    cards.setup_cards()
+    if quiet:
+        gamelog.configure()
+    else:  # the engine logs every step of every game
+        gamelog.configure(gamelog.ConsoleSink(gamelog.DEBUG))
+
+
+def play_game(job):
+    """ play one game to the end (or to max_turns); returns its result as a dict
+
+    job: (game index, list of deck files, list of agent names, seed, max_turns)
+    """
+    index, deck_files, agent_names, seed, max_turns = job
+    start = time.perf_counter()
+
+    GAME = game.Game([cards.read_deck(path_from_home(f)) for f in deck_files], seed=seed,
+                     stats=gamestats.GameStats() if _profile else None)
+    players = GAME.players_list[:]
+    for i, _player in enumerate(players):
+        _player.agent = AGENTS[agent_names[i]](seed * len(players) + i)
+
+    winner = None
+    try:
+        GAME.setup_game()
+        while GAME.turn_num < max_turns:
+            GAME.handle_turn()
+    except GameOverException:
+        winner = GAME.players_list[0].name if GAME.players_list else None
+    except EmptyLibraryException as e:
+        # drawing from an empty library loses the game
+        winner = GAME.opponent(e.args[0]).name
+
+    result = {
+        'game': index,
+        'seed': seed,
+        'winner': winner,
+        'turns': GAME.turn_num,
+        'life': {p.name: p.life for p in players},
+        'wall_time': round(time.perf_counter() - start, 6),
+    }
+    if GAME.stats is not None:
+        result['stats'] = GAME.stats.to_dict()
+    return result
+
+
+def simulate(deck_files, num_games, agent_names=('random', 'random'), seed=0,
+             max_turns=100, processes=None, quiet=True, profile=False):
+    """ play num_games games in a process pool, yielding results as games end
+
+    game i is played with seed (seed + i)
+    """
+    for name in agent_names:
+        if name not in AGENTS:
+            raise ValueError("Unknown agent: %r (choose from %s)" % (name, ', '.join(AGENTS)))
+
+    processes = processes or os.cpu_count()
+    jobs = ((i, list(deck_files), list(agent_names), seed + i, max_turns)
+            for i in range(num_games))
+    # big enough chunks to keep IPC overhead low, small enough to balance the load
+    chunksize = max(1, num_games // (processes * 8))
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(quiet, profile)) as pool:
+        yield from pool.imap_unordered(play_game, jobs, chunksize)
+
+
+def run_batch(deck_files, num_games, output, **kwargs):
+    """ run simulate(...) and write every result to the output file; returns a summary dict """
+    start = time.perf_counter()
+    wins = {}
+    stats = gamestats.GameStats() if kwargs.get('profile') else None
+    with open(output, 'w') as f:
+        for result in simulate(deck_files, num_games, **kwargs):
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            wins[result['winner']] = wins.get(result['winner'], 0) + 1
+            if stats is not None:
+                stats.merge(result['stats'])
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'games': num_games,
+        'wins': wins,
+        'wall_time': round(elapsed, 3),
+        'games_per_second': round(num_games / elapsed, 2) if elapsed else None,
+    }
+    if stats is not None:
+        summary['stats'] = stats.to_dict()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many bot-vs-bot games in parallel")
+    parser.add_argument('decks', nargs='+', help="deck files, one per player (cards.read_deck format)")
+    parser.add_argument('-n', '--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('-o', '--output', default='results.jsonl', help="results file (JSON lines)")
+    parser.add_argument('-a', '--agents', nargs='+', choices=sorted(AGENTS),
+                        help="agent policy for each player (default: random)")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help="worker processes (default: number of cores)")
+    parser.add_argument('--max-turns', type=int, default=100, help="turn limit; longer games are draws")
+    parser.add_argument('-v', '--verbose', action='store_true', help="don't silence the game logs")
+    parser.add_argument('--stats', action='store_true',
+                        help="profile the games: time spent per step, priority, resolution... (see gamestats.py)")
+    args = parser.parse_args(argv)
+
+    agent_names = args.agents or ['random'] * len(args.decks)
+    if len(agent_names) != len(args.decks):
+        parser.error("need one agent per deck")
+
+    summary = run_batch(args.decks, args.games, args.output,
+                        agent_names=agent_names, seed=args.seed, max_turns=args.max_turns,
+                        processes=args.processes, quiet=not args.verbose, profile=args.stats)
+    print(json.dumps(summary))
+    if args.stats:  # readable version, out of the way of the JSON
+        print(gamestats.GameStats.from_dict(summary['stats']).report(), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,4 +27,35 @@ class StaticAbilities(Enum):
     # TODO: protection
 
 
-    Convoke = 30
\ No newline at end of file
+    Convoke = 30
+
+
+# keyword abilities as bits of an int (see GameObject.keyword_abilities),
+# by name: 'First Strike' and 'First_Strike' both work
+BITS = {}
+for _ability in StaticAbilities:
+    BITS[_ability.name] = BITS[_ability.name.replace('_', ' ')] = 1 << _ability.value
+
+LANDWALK = (BITS['Plainswalk'] | BITS['Islandwalk'] | BITS['Swampwalk']
+            | BITS['Mountainwalk'] | BITS['Forestwalk'])
+
+
+def to_mask(abilities):
+    """ bitmask of a list of StaticAbilities """
+    mask = 0
+    for ability in abilities:
+        mask |= 1 << ability.value
+    return mask
+
+
+def granted_mask(value):
+    """ bitmask of the abilities granted by a gainAbility effect
+
+    value is an ability name or a list of names; an ability is granted
+    if `name in value`
+    """
+    mask = 0
+    for name, bit in BITS.items():
+        if name in value:
+            mask |= bit
+    return mask
@@ -1,10 +1,89 @@
 import mock
 import unittest
 
+from MTG import abilities
+from MTG import mana
+from MTG import static_abilities
 from MTG.test.test_game import TestGameBase
 from MTG.exceptions import *
 
 class TestPlayer(TestGameBase):
+    def test_mana_ability_is_compiled_once(self):
+        """ Forest: costs and effects are compiled at setup, not on activation """
+        with mock.patch('builtins.input', side_effect=[
+                '__self.battlefield.add("Forest")',
+                'a 0',
+                '__self.tmp = self.mana.pool[mana.Mana.GREEN] == 1 and self.battlefield[0].status.tapped',
+                '', '', 's upkeep', 's upkeep']):
+            with mock.patch('MTG.utils.compile', side_effect=AssertionError("compiled again")):
+                self.GAME.handle_turn()
+
+        self.assertTrue(self.player.tmp)
+        forest = self.player.battlefield[0].activated_abilities[0]
+        self.assertIs(abilities.compiled(forest.effect), abilities.compiled(forest.effect))
+
+    def test_pt_is_cached(self):
+        bears = self.player.battlefield.add("Grizzly Bears")
+        self.assertEqual(bears.pt, (2, 2))
+
+        with mock.patch.object(bears, 'get_effect', wraps=bears.get_effect) as get_effect:
+            self.assertEqual((bears.power, bears.toughness), (2, 2))
+            self.assertFalse(get_effect.called)
+
+            bears.add_effect('modifyPT', (3, 3), expiration=self.GAME.now + 1)
+            self.assertEqual(bears.pt, (5, 5))
+            bears.add_counter("+1/+1")
+            self.assertEqual(bears.pt, (6, 6))
+            bears.add_effect('setPT', ('*', 0), expiration=self.GAME.now + 1)
+            self.assertEqual(bears.pt, (6, 4))
+            self.assertEqual(get_effect.call_count, 9)  # 3 categories x 3 changes
+
+        self.GAME.turn_num += 1
+        self.GAME.expire_effects()
+        self.assertEqual(bears.pt, (3, 3))
+        self.assertEqual(self.player.battlefield.add("Forest").pt, (None, None))
+
+    def test_effect_expiration(self):
+        bears = self.player.battlefield.add("Grizzly Bears")
+        forest = self.player.battlefield.add("Forest")
+        bears.add_effect('modifyPT', (1, 1), source=forest)  # lasts as long as the forest
+        bears.add_effect('modifyPT', (2, 0), expiration=self.GAME.now + 200)
+        bears.add_effect('modifyPT', (3, 0), expiration=self.GAME.now + 1)
+        self.assertEqual(bears.pt, (8, 3))
+        self.assertFalse(bears.polled_effects)
+
+        self.GAME.turn_num += 1
+        self.assertTrue(self.GAME.expire_effects())
+        self.assertEqual(bears.pt, (5, 3))
+        self.assertEqual(len(self.GAME.effect_expirations), 1)
+
+        forest.change_zone(self.player.graveyard)
+        self.assertEqual(bears.pt, (4, 2))
+        self.assertFalse(self.GAME.expire_effects())
+
+    def test_keyword_abilities(self):
+        bears = self.player.battlefield.add("Grizzly Bears")
+        self.assertEqual(bears.keyword_abilities, 0)
+        self.assertFalse(bears.has_ability("Flying"))
+
+        bears.add_effect('gainAbility', ['First Strike', 'Trample'],
+                         expiration=self.GAME.now + 1)
+        self.assertTrue(bears.has_ability("First Strike"))
+        self.assertTrue(bears.has_ability("First_Strike"))
+        self.assertTrue(bears.has_ability("Trample"))
+        self.assertFalse(bears.has_ability("Double Strike"))
+        self.assertEqual(bears.keyword_abilities,
+                         static_abilities.to_mask([static_abilities.StaticAbilities.First_Strike,
+                                                   static_abilities.StaticAbilities.Trample]))
+
+        with mock.patch.object(static_abilities, 'to_mask') as to_mask:
+            bears.has_ability("Trample")
+            self.assertFalse(to_mask.called)
+
+        self.GAME.turn_num += 1
+        self.GAME.expire_effects()
+        self.assertFalse(bears.has_ability("Trample"))
+
     def test_optional_trigger_on_lifegain(self):
         """ Ajani's Pridemate: on life gain, put +1/+1 counter. """
         with mock.patch('builtins.input', side_effect=[
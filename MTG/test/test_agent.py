@@ -0,0 +1,227 @@
+import mock
+import unittest
+
+from MTG import agent
+from MTG import gamesteps
+from MTG import mana
+from MTG.test.test_game import TestGameBase
+
+
+class ScriptedAgent(agent.Agent):
+    """ calls `setup` at its first decision, plays the first card from `to_play`
+    it has in hand, attacks with everything, and targets `target` (a function
+    of the decision) when asked to """
+
+    def __init__(self, to_play=(), target=None, setup=None):
+        self.to_play = list(to_play)
+        self.target_func = target
+        self.setup = setup
+        self.decisions = []
+
+    def decide(self, decision):
+        self.decisions.append(decision.kind)
+        if self.setup:
+            self.setup(decision.player)
+            self.setup = None
+        return super(ScriptedAgent, self).decide(decision)
+
+    def priority(self, decision):
+        player = decision.player
+        if decision.step.phase is not gamesteps.Phase.PRECOMBAT_MAIN or player.game.stack:
+            return agent.PassPriority()
+
+        for name in self.to_play:
+            card = player.hand.get_card_by_name(name)
+            if card:
+                if not card.is_land:  # float all the mana we can first
+                    for land in player.lands:
+                        if not land.status.tapped:
+                            return agent.ActivateAbility(land)
+                self.to_play.remove(name)
+                return agent.PlayCard(card)
+
+        return agent.PassPriority()
+
+    def attackers(self, decision):
+        return decision.candidates
+
+    def target(self, decision):
+        if self.target_func:
+            return self.target_func(decision)
+        return super(ScriptedAgent, self).target(decision)
+
+
+class TestAgent(TestGameBase):
+    def setUp(self):
+        super(TestAgent, self).setUp()
+        self.player.autoPayMana = False
+        self.opponent.autoPayMana = False
+
+    def test_default_agents_never_ask_for_input(self):
+        self.player.agent = agent.Agent()
+        self.opponent.agent = agent.Agent()
+
+        with mock.patch('builtins.input', side_effect=AssertionError("input() called")):
+            self.assertTrue(self.GAME.handle_turn())
+            self.assertTrue(self.GAME.handle_turn())
+
+    def test_agent_plays_land_and_attacks(self):
+        def setup(player):
+            player.battlefield.add("Grizzly Bears")
+            player.battlefield[-1].status.summoning_sick = False
+
+        self.player.agent = ScriptedAgent(['Forest'], setup=setup)
+        self.opponent.agent = agent.Agent()
+        self.player.add_card_to_hand("Forest")
+
+        self.GAME.handle_turn()
+
+        self.assertTrue(self.player.battlefield.get_card_by_name("Forest"))
+        self.assertEqual(self.opponent.life, 18)
+        self.assertIn('attackers', self.player.agent.decisions)
+
+    def test_agent_blocks(self):
+        def setup(player):
+            player.battlefield.add("Grizzly Bears")
+            player.battlefield[-1].status.summoning_sick = False
+
+        self.player.agent = ScriptedAgent(setup=setup)
+        self.opponent.agent = ScriptedAgent(setup=setup)
+        self.opponent.agent.blockers = lambda d: d.candidates
+
+        self.GAME.handle_turn()
+
+        self.assertEqual(self.opponent.life, 20)
+        self.assertIn('blockers', self.opponent.agent.decisions)
+        self.assertEqual(len(self.player.graveyard), 1)
+        self.assertEqual(len(self.opponent.graveyard), 1)
+
+    def test_agent_pays_and_targets(self):
+        self.player.agent = ScriptedAgent(['Lightning Bolt'],
+                                          target=lambda d: d.player.opponent,
+                                          setup=lambda p: p.battlefield.add("Mountain"))
+        self.opponent.agent = agent.Agent()
+        self.player.add_card_to_hand("Lightning Bolt")
+
+        self.GAME.handle_turn()
+
+        self.assertEqual(self.opponent.life, 17)
+        self.assertTrue(self.player.graveyard.get_card_by_name("Lightning Bolt"))
+        self.assertIn('target', self.player.agent.decisions)
+
+    def test_agent_discard(self):
+        self.player.agent = ScriptedAgent()
+        for name in ("Forest", "Mountain", "Grizzly Bears"):
+            self.player.add_card_to_hand(name)
+
+        self.player.agent.discard = lambda d: [d.cards[0], d.cards[0], 'not a card']
+        self.player.discard(2)
+
+        self.assertEqual([c.name for c in self.player.hand], ["Mountain"])
+        self.assertEqual(len(self.player.graveyard), 2)
+
+
+
+class RecordingAgent(agent.Agent):
+    """ remembers the legal actions it had the first time it got priority in each step,
+    and floats mana from its lands in the first main phase """
+
+    def __init__(self, setup=None):
+        self.setup = setup
+        self.legal = {}
+
+    def priority(self, decision):
+        if self.setup:
+            self.setup(decision.player)
+            self.setup = None
+
+        actions = decision.player.legal_actions()
+        self.legal.setdefault(decision.step, actions)
+
+        if decision.step is gamesteps.Step.PRECOMBAT_MAIN:
+            for action in actions:
+                if isinstance(action, agent.ActivateAbility):
+                    return action
+        return agent.PassPriority()
+
+
+class TestLegalActions(TestGameBase):
+    def describe(self, actions):
+        return sorted(type(a).__name__ + ' ' + (a.card.name if isinstance(a, agent.PlayCard) else
+                                                a.permanent.name if isinstance(a, agent.ActivateAbility) else '')
+                      for a in actions)
+
+    def test_legal_actions(self):
+        self.player.agent = RecordingAgent(setup=lambda p: p.battlefield.add("Mountain"))
+        self.opponent.agent = RecordingAgent()
+        for name in ("Forest", "Lightning Bolt", "Grizzly Bears"):
+            self.player.add_card_to_hand(name)
+
+        self.GAME.handle_turn()
+        legal = self.player.agent.legal
+
+        # upkeep: instants and abilities only
+        self.assertEqual(self.describe(legal[gamesteps.Step.UPKEEP]),
+                         ['ActivateAbility Mountain', 'PassPriority ', 'PlayCard Lightning Bolt'])
+        self.assertEqual(self.describe(self.opponent.agent.legal[gamesteps.Step.UPKEEP]),
+                         ['PassPriority '])
+        self.assertEqual(self.describe(legal[gamesteps.Step.PRECOMBAT_MAIN]),
+                         ['ActivateAbility Mountain', 'PassPriority ', 'PlayCard Forest',
+                          'PlayCard Grizzly Bears', 'PlayCard Lightning Bolt'])
+
+        # Mountain got tapped for mana in the main phase
+        self.assertTrue(self.player.battlefield[0].status.tapped)
+        self.assertEqual(self.describe(self.player.legal_actions()),
+                         ['PassPriority ', 'PlayCard Lightning Bolt'])
+
+    def test_legal_actions_land_per_turn(self):
+        self.player.agent = RecordingAgent(setup=lambda p: setattr(p, 'landPlayed', 1))
+        self.opponent.agent = RecordingAgent()
+        self.player.add_card_to_hand("Forest")
+
+        self.GAME.handle_turn()
+
+        self.assertEqual(self.describe(self.player.agent.legal[gamesteps.Step.PRECOMBAT_MAIN]),
+                         ['PassPriority '])
+
+    def test_can_afford(self):
+        pool = self.player.mana
+        pool.add_str('RG')
+        self.assertTrue(pool.can_afford('1R'))
+        self.assertTrue(pool.can_afford('(R/W)G'))
+        self.assertTrue(pool.can_afford('(2/W)'))
+        self.assertFalse(pool.can_afford('(U/W)'))
+        self.assertFalse(pool.can_afford('RR'))
+        self.assertFalse(pool.can_afford('2R'))
+        self.assertEqual(pool.pool[mana.Mana.RED], 1)
+
+    def test_random_agents(self):
+        self.player.agent = agent.RandomAgent(seed=0)
+        self.opponent.agent = agent.RandomAgent(seed=1)
+
+        with mock.patch('builtins.input', side_effect=AssertionError("input() called")):
+            for i in range(6):
+                self.assertTrue(self.GAME.handle_turn())
+
+    def test_heuristic_agents(self):
+        self.player.agent = agent.HeuristicAgent(seed=0)
+        self.opponent.agent = agent.HeuristicAgent(seed=1)
+        self.player.add_card_to_hand("Forest")
+        self.player.add_card_to_hand("Mountain")
+
+        with mock.patch('builtins.input', side_effect=AssertionError("input() called")):
+            self.assertTrue(self.GAME.handle_turn())
+        self.assertEqual(len(self.player.lands), 1)  # a land, first thing
+
+        bears = self.player.battlefield.add("Grizzly Bears")
+        goblin = self.opponent.battlefield.add("Mons's Goblin Raiders")
+        attack = agent.AttackersDecision(self.player, self.opponent, [bears])
+        self.assertEqual(self.player.agent.attackers(attack), [bears])
+        block = agent.BlockersDecision(self.opponent, bears, [goblin])
+        self.assertEqual(self.opponent.agent.blockers(block), [])  # a 1/1 doesn't chump a 2/2 at 20 life
+        self.opponent.life = 2
+        self.assertEqual(self.opponent.agent.blockers(block), [goblin])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import json
+import tempfile
+import unittest
+
+from MTG import benchmark
+from MTG import cards
+
+cards.setup_cards()
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_benchmark(self):
+        result = benchmark.run_benchmark('mana_can_pay', number=10, repeat=2)
+        self.assertEqual((result['number'], result['repeat']), (10, 2))
+        self.assertLessEqual(result['best'], result['median'])
+        self.assertGreater(result['best'], 0)
+
+    def test_benchmarks_run(self):
+        for name, (setup, number, repeat) in benchmark.BENCHMARKS.items():
+            if name not in ('startup', 'full_game', 'replay_recording'):
+                setup()()
+
+    def test_compare(self):
+        def results(**times):
+            return {'benchmarks': {name: {'best': t} for name, t in times.items()}}
+
+        rows = benchmark.compare(results(a=1.0, b=1.0, c=1.0, d=1.0),
+                                 results(a=1.05, b=1.5, c=0.5, e=1.0))
+        self.assertEqual([(row[0], row[-1]) for row in rows],
+                         [('a', 'same'), ('b', 'regression'), ('c', 'improvement'),
+                          ('d', 'removed'), ('e', 'added')])
+
+    def test_main(self):
+        fd, old = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        fd, new = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            self.assertEqual(benchmark.main(['read_deck', '-r', '1', '-o', old]), 0)
+            with open(old) as f:
+                results = json.load(f)
+            self.assertEqual(list(results['benchmarks']), ['read_deck'])
+
+            results['benchmarks']['read_deck']['best'] /= 2
+            with open(new, 'w') as f:
+                json.dump(results, f)
+            self.assertEqual(benchmark.main(['--compare', new, old]), 1)
+            self.assertEqual(benchmark.main(['--compare', old, new]), 0)
+        finally:
+            os.remove(old)
+            os.remove(new)
+
+
+if __name__ == '__main__':
+    unittest.main()
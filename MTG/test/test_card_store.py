@@ -0,0 +1,118 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import mock
+
+from MTG import cards
+from MTG import card_store
+from MTG.utils import path_from_home
+
+import parser.parse_mtgjson
+
+
+class TestCardStore(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        for path in ('parser/formats/MTGRL.json', 'card_db/formats/MTGRL/define_effects.txt'):
+            os.makedirs(os.path.join(self.home, os.path.dirname(path)), exist_ok=True)
+            shutil.copy(path_from_home(path), os.path.join(self.home, path))
+
+        self.env = mock.patch.dict(os.environ, {'MTG_ENGINE_HOME': self.home})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.home)
+
+    def load(self):
+        """ load the store, counting how many card classes & setups get generated """
+        class_source = mock.Mock(wraps=parser.parse_mtgjson.card_class_source)
+        setup_source = mock.Mock(wraps=cards.card_setup_source)
+        with mock.patch('parser.parse_mtgjson.card_class_source', class_source):
+            store = card_store.load('MTGRL', setup_source)
+        return store, class_source.call_count, setup_source.call_count
+
+    def test_build_then_load(self):
+        store, num_classes, num_setups = self.load()
+        self.assertEqual(num_classes, 6)
+        self.assertEqual(num_setups, 5)
+        self.assertTrue(os.path.exists(card_store.store_path('MTGRL')))
+        self.assertIn('add_activated_ability("Forest"', store.setup_source())
+
+        # nothing changed: nothing gets parsed
+        loaded, num_classes, num_setups = self.load()
+        self.assertEqual((num_classes, num_setups), (0, 0))
+        self.assertEqual(loaded.name_to_id, store.name_to_id)
+
+        namespace = {'__name__': 'test'}
+        exec(parser.parse_mtgjson.MODULE_HEADER, namespace)
+        forest = loaded.define_class(loaded.name_to_id['Forest'], namespace)()
+        self.assertEqual(forest.name, 'Forest')
+        self.assertTrue(forest.is_land)
+        self.assertEqual(len(loaded.setup_code('Forest')), 1)
+
+    def test_only_changed_cards_are_rebuilt(self):
+        self.load()
+        effects_file = os.path.join(self.home, 'card_db/formats/MTGRL/define_effects.txt')
+        with open(effects_file) as f:
+            text = f.read()
+        with open(effects_file, 'w') as f:
+            f.write(text.replace('mana.Mana.RED, 1', 'mana.Mana.RED, 2'))
+
+        store, num_classes, num_setups = self.load()
+        self.assertEqual((num_classes, num_setups), (0, 1))
+        self.assertIn('mana.Mana.RED, 2', store.setup_source())
+
+    def test_outdated_version(self):
+        self.load()
+        with mock.patch.object(card_store, '_VERSION', ('old', b'')):
+            store, num_classes, num_setups = self.load()
+        self.assertEqual((num_classes, num_setups), (6, 5))
+
+    def test_store_is_rebuilt_once(self):
+        self.load()
+        load = card_store.load
+        calls = []
+
+        def fail_once(*args):
+            calls.append(os.path.exists(card_store.store_path('MTGRL')))
+            if len(calls) == 1:
+                raise ValueError("damaged store")
+            return load(*args)
+
+        with mock.patch.object(card_store, 'load', side_effect=fail_once):
+            store = cards._load_card_store('MTGRL')
+        self.assertEqual(calls, [True, False])  # rebuilt from scratch
+        self.assertIn('Mountain', store.name_to_id)
+
+    def test_card_store_errors_are_raised(self):
+        os.remove(os.path.join(self.home, 'parser/formats/MTGRL.json'))
+        with self.assertRaises(OSError):
+            cards._load_card_store('MTGRL')
+
+
+class TestLazyCards(unittest.TestCase):
+    def test_classes_are_built_on_demand(self):
+        cards.setup_cards()
+        ID = cards.name_to_id('Mountain')
+        cards.__dict__.pop(ID, None)  # as if never built
+
+        store = cards.card_stores['MTGRL']
+        with mock.patch.object(store, 'define_class', wraps=store.define_class) as define_class:
+            mountain = cards.card_from_name('Mountain')
+            cards.card_from_name('Mountain')
+            self.assertIs(cards.str_to_class(ID), type(mountain))
+        define_class.assert_called_once_with(ID, mock.ANY)
+
+        # the abilities of a card are set up when its class is built
+        self.assertEqual(len(mountain.activated_abilities), 1)
+        self.assertIs(pickle.loads(pickle.dumps(mountain)).__class__, type(mountain))
+
+        with self.assertRaises(AttributeError):
+            cards.not_a_card
+
+
+if __name__ == '__main__':
+    unittest.main()
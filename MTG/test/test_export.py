@@ -0,0 +1,114 @@
+import os
+import sys
+import mock
+import time
+import shutil
+import itertools
+import importlib.util
+import subprocess
+import tempfile
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from MTG import export
+from MTG.test.test_game import TestGameBase
+
+
+def _slow_square(x):
+    time.sleep(0.01 * (x % 3))
+    return x * x
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_chunks(self):
+        self.assertEqual(export.chunks(7, 3), [(0, 3), (3, 6), (6, 7)])
+        self.assertEqual(export.chunks(6, 3), [(0, 3), (3, 6)])
+        self.assertEqual(export.chunks(0, 3), [])
+
+    def test_ordered_map(self):
+        submitted = []
+
+        def tasks():
+            for i in range(20):
+                submitted.append(i)
+                yield i
+
+        consumed = 0
+        with ThreadPool(4) as pool:
+            results = []
+            for result in export.ordered_map(pool, _slow_square, tasks(), max_pending=3):
+                results.append(result)
+                consumed += 1
+                self.assertLessEqual(len(submitted) - consumed, 3)
+
+        self.assertEqual(results, [i * i for i in range(20)])
+
+    def test_image_sequence_sink(self):
+        sink = export.ImageSequenceSink(os.path.join(self.dir, 'game'))
+        for frame in (b'one', b'two'):
+            sink.write(frame)
+        sink.close()
+
+        self.assertEqual(sink.count, 2)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dir, 'game'))),
+                         ['frame_000001.png', 'frame_000002.png'])
+        with open(os.path.join(self.dir, 'game', 'frame_000002.png'), 'rb') as f:
+            self.assertEqual(f.read(), b'two')
+
+    def test_video_sink(self):
+        filename = os.path.join(self.dir, 'game.raw')
+        copy = 'import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], "wb"))'
+        sink = export.VideoSink(filename, (2, 1), command=[sys.executable, '-c', copy, filename])
+        sink.write(b'\x00' * 6)
+        sink.write(b'\xff' * 6)
+        sink.close()
+
+        self.assertEqual(sink.count, 2)
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(), b'\x00' * 6 + b'\xff' * 6)
+
+        failing = export.VideoSink(filename, (2, 1), command=[sys.executable, '-c', 'exit(1)'])
+        with self.assertRaises(RuntimeError):
+            failing.close()
+
+
+@unittest.skipUnless(importlib.util.find_spec('pygame'), "needs pygame")
+class TestExportReplays(TestGameBase):
+    def setUp(self):
+        super().setUp()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_export_replays_returns(self):
+        with mock.patch('builtins.input', side_effect=itertools.chain([
+                '!replay start', '',
+                '__self.add_card_to_hand("Forest")',
+                'p Forest'], itertools.repeat(''))):
+            self.GAME.handle_turn()
+        filename = os.path.join(self.dir, 'game.pkl')
+        self.GAME.replay.store(filename)
+
+        # in a process of its own: a worker that doesn't exit would hang it, not the tests
+        output = os.path.join(self.dir, 'exported')
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(export.__file__))))
+        subprocess.run([sys.executable, '-m', 'MTG.export', filename, '-o', output, '-j', '2',
+                        '--chunk', '2', '--size', '160x90', '--offline',
+                        '--images', os.path.join(self.dir, 'images')],
+                       cwd=root, check=True, timeout=120)
+
+        frames = os.listdir(os.path.join(output, 'game'))
+        self.assertEqual(len(frames), len(self.GAME.replay))
+        self.assertIn('frame_000001.png', frames)
+        self.assertTrue(os.path.exists(os.path.join(output, 'game.thumb.png')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,14 @@
 import mock
 import unittest
-import time
+import pickle
 # from copy import deepcopy
 
 from MTG import game
 from MTG import cards
 from MTG import permanent
+from MTG import agent
+from MTG import triggers
+from MTG import gamesteps
 from MTG.exceptions import *
 from MTG.utils import path_from_home
 
@@ -14,16 +17,7 @@ from MTG.utils import path_from_home
 cards.setup_cards()
 
 class TestGameBase(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        cls.f = open('test_game_time.log', 'w')
-
-    @classmethod
-    def tearDownClass(cls):
-        cls.f.close()
-
     def setUp(self):
-        self.startTime = time.time()
         decks = [
             cards.read_deck(path_from_home('card_db/decks/mono_green.txt')),
             cards.read_deck(path_from_home('card_db/decks/mono_red.txt'))
@@ -40,10 +34,6 @@ class TestGameBase(unittest.TestCase):
         self.player.autoPayMana = True
         self.opponent.autoPayMana = True
 
-    def tearDown(self):
-        t = time.time() - self.startTime
-        self.f.write("%s: %.3f\n" % (self.id(), t))
-
 
 class TestGame(TestGameBase):
     def test_turn_do_nothing(self):
@@ -79,6 +69,213 @@ class TestGame(TestGameBase):
             self.assertTrue(self.player.tmp)
             self.assertTrue(self.opponent.tmp)
 
+    def test_seeded_games_are_identical(self):
+        """Same decks, seed and decisions: same game, timestamps included"""
+        def play(seed):
+            decks = [
+                cards.read_deck(path_from_home('card_db/decks/mono_green.txt')),
+                cards.read_deck(path_from_home('card_db/decks/mono_red.txt'))
+            ]
+            GAME = game.Game(decks, seed=seed)
+            for i, _player in enumerate(GAME.players_list):
+                _player.agent = agent.RandomAgent(seed=i)
+            GAME.setup_game()
+            for i in range(6):
+                GAME.handle_turn()
+            return [(p.life, [c.name for c in p.library], [c.name for c in p.hand],
+                     [(c.name, c.timestamp) for c in p.battlefield])
+                    for p in GAME.players_list]
+
+        self.assertEqual(play(3), play(3))
+        self.assertNotEqual(play(3), play(4))
+
+    def test_clone(self):
+        self.player.battlefield.add("Grizzly Bears")
+        self.player.hand.add("Lightning Bolt")
+        GAME = self.GAME.clone()
+        player, opponent = GAME.players_list
+        bears = player.battlefield[0]
+
+        self.assertIsNot(player, self.player)
+        self.assertIs(player.game, GAME)
+        self.assertIs(bears.controller, player)
+        self.assertIs(bears.zone, player.battlefield)
+        self.assertEqual(bears, self.player.battlefield[0])
+        # card definitions are shared
+        self.assertIs(bears.characteristics, self.player.battlefield[0].characteristics)
+        self.assertEqual(player.creatures, [bears])
+
+        # the copy is independent of the game
+        player.life = 3
+        player.hand.pop()
+        bears.dies()
+        self.assertEqual(self.player.life, 20)
+        self.assertEqual(len(self.player.hand), 1)
+        self.assertEqual(len(self.player.creatures), 1)
+        self.assertFalse(player.creatures)
+
+    def test_clone_plays_like_the_game(self):
+        decks = [
+            cards.read_deck(path_from_home('card_db/decks/mono_green.txt')),
+            cards.read_deck(path_from_home('card_db/decks/mono_red.txt'))
+        ]
+        GAME = game.Game(decks, seed=5)
+        for i, _player in enumerate(GAME.players_list):
+            _player.agent = agent.RandomAgent(seed=i)
+        GAME.setup_game()
+        for i in range(3):
+            GAME.handle_turn()
+
+        def state(GAME):
+            return [(p.life, [c.name for c in p.library], [c.name for c in p.hand],
+                     [(c.name, c.timestamp) for c in p.battlefield])
+                    for p in GAME.players_list]
+
+        CLONE = GAME.clone()
+        self.assertEqual(state(CLONE), state(GAME))
+        for i in range(3):
+            GAME.handle_turn()
+            CLONE.handle_turn()
+        self.assertEqual(state(CLONE), state(GAME))
+
+    def test_resume_turn(self):
+        """A game copied during a decision goes on like the game itself"""
+        class CloningAgent(agent.RandomAgent):
+            copy = None
+
+            def priority(self, decision):
+                if self.copy is None and decision.step is gamesteps.Step.PRECOMBAT_MAIN:
+                    self.copy = False  # the copy of this agent doesn't copy the game again
+                    self.copy = decision.game.clone()
+                return super(CloningAgent, self).priority(decision)
+
+        self.player.agent = CloningAgent(seed=0)
+        self.opponent.agent = agent.RandomAgent(seed=1)
+        for name in ("Forest", "Grizzly Bears", "Forest"):
+            self.player.add_card_to_hand(name)
+        self.player.battlefield.add("Forest")
+
+        self.GAME.handle_turn()
+        CLONE = self.player.agent.copy
+        self.assertEqual(CLONE.step, gamesteps.Step.PRECOMBAT_MAIN)
+        self.assertTrue(CLONE.resume_turn())
+
+        def state(GAME):
+            return [(p.life, [c.name for c in p.hand], [c.name for c in p.graveyard],
+                     [(c.name, c.timestamp, c.status.tapped) for c in p.battlefield])
+                    for p in GAME.players_list] + [GAME.turn_num, GAME.current_player.name]
+        self.assertEqual(state(CLONE), state(self.GAME))
+
+    def test_timestamps_increase(self):
+        with mock.patch('builtins.input', return_value=''):
+            self.GAME.handle_turn()
+        t1 = self.GAME.new_timestamp()
+        t2 = self.GAME.new_timestamp()
+        self.assertLess(t1, t2)
+        self.assertLess(t2, self.GAME.eot_time + 1)
+
+        # looking at the time doesn't take a timestamp
+        clock = self.GAME.clock
+        self.assertEqual(self.GAME.now, t2)
+        self.GAME.apply_state_based_actions()
+        self.assertEqual(self.GAME.now, t2)
+        self.assertEqual(self.GAME.clock, clock)
+
+    def test_object_ids(self):
+        library = self.player.library
+        ids = [c.object_id for p in self.GAME.players_list for c in p.library]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertNotIn(None, ids)
+
+        # objects created outside of a game have an id too, for good
+        card = cards.card_from_name("Forest")
+        self.assertLess(card.object_id, 0)
+        self.assertEqual(card, card)
+        self.assertNotEqual(card, cards.card_from_name("Forest"))
+        hand_cards = {card}
+        object_id = card.object_id
+        self.player.hand.add(card)
+        self.assertEqual(card.object_id, object_id)
+        self.assertIn(card, hand_cards)
+
+        # copies of an object are equal to it
+        copy = pickle.loads(pickle.dumps(library[0]))
+        self.assertEqual(copy, library[0])
+        self.assertEqual(hash(copy), hash(library[0]))
+        self.assertNotEqual(library[0], library[1])
+        self.assertEqual(self.GAME.opponent(self.player), self.opponent)
+
+    def test_state_based_actions_check_dirty_objects(self):
+        for name in ("Grizzly Bears", "Grizzly Bears", "Forest"):
+            self.player.battlefield.add(name)
+        bears, other_bears, forest = self.player.battlefield
+        self.GAME.apply_state_based_actions()
+        self.assertFalse(self.GAME.sba_dirty)
+
+        with mock.patch.object(permanent.Permanent, 'check_effect_expiration',
+                               autospec=True, return_value=False) as check:
+            bears.take_damage(None, 2)
+            self.GAME.apply_state_based_actions()
+        self.assertEqual(check.call_args_list[0], mock.call(bears))
+        self.assertNotIn(mock.call(other_bears), check.call_args_list)
+        self.assertNotIn(mock.call(forest), check.call_args_list)
+        self.assertEqual(list(self.player.battlefield), [other_bears, forest])
+        self.assertTrue(self.player.graveyard.get_card_by_name("Grizzly Bears"))
+
+        # an effect ending makes its permanent dirty
+        other_bears.add_effect('modifyPT', (0, 1), expiration=self.GAME.now + 1)
+        other_bears.take_damage(None, 2)
+        self.GAME.apply_state_based_actions()
+        self.assertIn(other_bears, self.player.battlefield)
+        self.GAME.turn_num += 1  # the effect expires
+        self.GAME.apply_state_based_actions()
+        self.assertEqual(list(self.player.battlefield), [forest])
+
+        # only permanents with effects depending on the game's state are watched
+        self.assertFalse(self.GAME.sba_watched)
+        forest.add_effect('gainAbility', 'Flying', toggle_func=lambda eff: False)
+        self.assertEqual(list(self.GAME.sba_watched), [forest])
+
+    def test_timed_effect_kills_creature(self):
+        bears = self.player.battlefield.add("Grizzly Bears")
+        self.GAME.apply_state_based_actions()
+        self.assertFalse(self.GAME.sba_dirty)
+
+        # -2/-2 until end of turn: neither toggled nor tied to a source
+        bears.add_effect('modifyPT', (-2, -2), expiration=self.GAME.eot_time)
+        self.GAME.apply_state_based_actions()
+        self.assertNotIn(bears, self.player.battlefield)
+        self.assertTrue(self.player.graveyard.get_card_by_name("Grizzly Bears"))
+
+    def test_trigger_subscribers(self):
+        conditions = triggers.triggerConditions
+        self.assertFalse(self.GAME.trigger_subscribers)
+        bears = self.player.battlefield.add("Grizzly Bears")
+        # as if Grizzly Bears had these triggers
+        bears.trigger_listeners = {conditions.onControllerLifeGain: [],
+                                   conditions.onCreatureEtB: [],
+                                   conditions.onEtB: []}
+        self.GAME.subscribe(bears)
+        self.assertEqual(set(self.GAME.trigger_subscribers),
+                         {conditions.onControllerLifeGain, conditions.onCreatureEtB})
+
+        with mock.patch.object(bears, 'trigger') as trigger:
+            self.opponent.gain_life(1)
+            trigger.assert_not_called()
+            self.player.gain_life(1)
+            trigger.assert_called_once_with(conditions.onControllerLifeGain, None, 1)
+
+            trigger.reset_mock()
+            other_bears = self.opponent.battlefield.add("Grizzly Bears")
+            trigger.assert_called_once_with(conditions.onCreatureEtB, other_bears, 1)
+
+            bears.dies()
+            self.assertFalse(self.GAME.trigger_subscribers)
+            trigger.reset_mock()
+            self.player.gain_life(1)
+            self.opponent.battlefield.add("Grizzly Bears")
+            trigger.assert_not_called()
+
     def test_drawing_cards(self):
         with mock.patch('builtins.input', side_effect=[
                 '', '', '', '',
@@ -0,0 +1,56 @@
+import io
+import json
+import unittest
+import mock
+
+from MTG import gamelog
+from MTG.test.test_game import TestGameBase
+
+
+class TestGameLog(TestGameBase):
+    def tearDown(self):
+        gamelog.configure()
+        super(TestGameLog, self).tearDown()
+
+    def test_memory_sink(self):
+        sink = gamelog.MemorySink(gamelog.INFO, capacity=2)
+        gamelog.configure(sink)
+        bears = self.player.battlefield.add("Grizzly Bears")  # debug: not kept
+        self.assertFalse(sink.events)
+
+        bears.take_damage(None, 1)
+        self.player.gain_life(2)
+        self.player.gain_life(3)
+        self.assertEqual(sink.kinds(), ['life', 'life'])  # only the last 2 events
+        self.assertEqual(sink.events[-1].fields['amount'], 3)
+        self.assertIn('gaining 3 life', sink.events[-1].message)
+
+    def test_disabled_levels_are_not_formatted(self):
+        self.assertFalse(gamelog.is_enabled(gamelog.ERROR))
+        with mock.patch.object(gamelog, 'Event') as event:
+            self.player.take_damage(None, 1)
+        event.assert_not_called()
+
+        gamelog.configure(gamelog.NullSink())
+        self.assertFalse(gamelog.is_enabled(gamelog.ERROR))
+
+    def test_json_lines_and_console(self):
+        jsonl, console = io.StringIO(), io.StringIO()
+        gamelog.configure(gamelog.JSONLinesSink(jsonl, gamelog.INFO),
+                          gamelog.ConsoleSink(gamelog.DEBUG, console))
+        self.assertTrue(gamelog.is_enabled(gamelog.DEBUG))
+
+        self.player.take_damage("Lightning Bolt", 3)
+        gamelog.debug('sba', "Applying state based actions")
+        event = json.loads(jsonl.getvalue())
+        self.assertEqual(event['event'], 'damage')
+        self.assertEqual(event['level'], 'info')
+        self.assertEqual((event['target'], event['amount'], event['source']),
+                         ('player0', 3, "Lightning Bolt"))
+        self.assertEqual(console.getvalue(),
+                         "player0 takes 3 damage from Lightning Bolt\n\n"
+                         "Applying state based actions\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import mock
+import tempfile
+import unittest
+
+from MTG import gamestats
+from MTG import gamesteps
+from MTG.test.test_game import TestGameBase
+
+
+class TestGameStats(TestGameBase):
+    def test_no_stats_by_default(self):
+        self.assertIsNone(self.GAME.stats)
+        with mock.patch('builtins.input', return_value=''):
+            self.GAME.handle_turn()
+        self.assertIsNone(self.GAME.stats)
+
+    def test_turn_stats(self):
+        stats = self.GAME.stats = gamestats.GameStats()
+        self.player.add_card_to_hand("Forest")
+        with mock.patch('builtins.input', side_effect=['', '', 'p Forest'] + [''] * 30):
+            self.GAME.handle_turn()
+
+        timers = stats.to_dict()['timers']
+        for step in gamesteps.Step:
+            self.assertEqual(timers['step.' + step.name]['count'], 1)
+        self.assertGreater(timers['priority']['count'], 1)
+        self.assertGreaterEqual(timers['decision']['count'], timers['priority']['count'])
+        self.assertGreaterEqual(timers['priority']['total'], timers['decision']['total'])
+        self.assertEqual(stats.counters['turns'], 1)
+        self.assertGreater(stats.counters['sba_passes'], 0)
+        # the Forest played, and nothing drawn: the first player skips their draw
+        self.assertEqual(stats.counters['zone_moves'], 1)
+
+        self.assertIsNone(self.GAME.clone().stats)
+
+    def test_merge_and_export(self):
+        a, b = gamestats.GameStats(), gamestats.GameStats()
+        a.add_time('resolve', 0.5)
+        a.count('triggers', 2)
+        b.add_time('resolve', 1.5)
+        b.add_time('priority', 1.0)
+        b.count('triggers')
+
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as f:
+            a.merge(b).write(f.name)
+            merged = gamestats.GameStats.from_dict(json.load(f))
+
+        self.assertEqual(merged.to_dict(), a.to_dict())
+        resolve = merged.to_dict()['timers']['resolve']
+        self.assertEqual((resolve['count'], resolve['total'], resolve['max'], resolve['mean']),
+                         (2, 2.0, 1.5, 1.0))
+        self.assertEqual(merged.counters['triggers'], 3)
+        self.assertEqual(merged.report().splitlines()[1].split()[0], 'resolve')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from concurrent import futures
+
+from MTG import image_cache
+
+
+class TestImageCache(unittest.TestCase):
+    """ images are decoded as their bytes here, a byte of memory each """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.local_dir = os.path.join(self.dir, 'images')
+        os.makedirs(self.local_dir)
+        for name, data in (('a.jpg', b'AAAA'), ('b.jpg', b'BBBB'), ('copy_of_a.jpg', b'AAAA')):
+            with open(os.path.join(self.local_dir, name), 'wb') as f:
+                f.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def cache(self, **kwargs):
+        kwargs.setdefault('local_dir', self.local_dir)
+        return image_cache.ImageCache(os.path.join(self.dir, 'cache'), offline=True,
+                                      decode=bytes, size=len, **kwargs)
+
+    def test_local_dir_and_disk_cache(self):
+        cache = self.cache()
+        self.assertEqual(cache.get('https://example.com/normal/front/a.jpg?123'), b'AAAA')
+        self.assertEqual(cache.get('https://example.com/copy_of_a.jpg'), b'AAAA')
+        self.assertEqual(cache.get('https://example.com/b.jpg'), b'BBBB')
+        # content-addressed: the two copies of a are stored once
+        objects = [f for _, _, files in os.walk(os.path.join(self.dir, 'cache', 'objects'))
+                   for f in files]
+        self.assertEqual(len(objects), 2)
+
+        # a new cache, without the local directory, finds them on disk
+        shutil.rmtree(self.local_dir)
+        cache = self.cache(local_dir=None)
+        self.assertEqual(cache.get('https://example.com/b.jpg'), b'BBBB')
+        self.assertIsNone(cache.get('https://example.com/c.jpg'))
+
+    def test_memory_limit(self):
+        cache = self.cache(memory_limit=8)
+        a, b, c = ('https://example.com/%s.jpg' % n for n in ('a', 'b', 'copy_of_a'))
+        cache.get(a)
+        cache.get(b)
+        cache.get(a)  # b is now the least recently used
+        cache.get(c)
+        self.assertIn(a, cache)
+        self.assertNotIn(b, cache)
+        self.assertIn(c, cache)
+
+    def test_failures_are_retried(self):
+        cache = self.cache(retry_after=0.05)
+        url = 'https://example.com/new.jpg'
+        self.assertIsNone(cache.get(url))
+        with open(os.path.join(self.local_dir, 'new.jpg'), 'wb') as f:
+            f.write(b'NEW')
+        self.assertIsNone(cache.get(url))  # too soon
+        time.sleep(0.06)
+        self.assertEqual(cache.get(url), b'NEW')
+
+    def test_prefetch(self):
+        cache = self.cache()
+        urls = ['https://example.com/a.jpg', 'https://example.com/b.jpg', None]
+        self.assertIsNone(cache.get(urls[0], block=False))
+        futures.wait(cache.prefetch(urls))
+        cache.close()
+        self.assertTrue(all(url in cache for url in urls[:2]))
+        self.assertEqual(cache.version, 2)
+        self.assertEqual(cache.get(urls[1], block=False), b'BBBB')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import mock
+import unittest
+
+from MTG import agent
+from MTG import mcts
+from MTG import gamelog
+from MTG import gamesteps
+from MTG.exceptions import *
+from MTG.test.test_game import TestGameBase
+
+
+class TestMCTS(TestGameBase):
+    def setUp(self):
+        super(TestMCTS, self).setUp()
+        self.player.autoPayMana = False
+        self.opponent.autoPayMana = False
+        self.opponent.agent = agent.Agent()
+
+    def test_finds_lethal(self):
+        self.player.agent = mcts.MCTSAgent(iterations=100, rollout_turns=0, seed=0)
+        self.player.battlefield.add("Mountain")
+        self.player.add_card_to_hand("Lightning Bolt")
+        self.opponent.life = 3
+
+        with mock.patch('builtins.input', side_effect=AssertionError("input() called")):
+            with self.assertRaises(GameOverException):
+                self.GAME.handle_turn()
+        self.assertTrue(self.opponent.lost)
+        self.assertFalse(self.player.lost)
+
+    def test_search_stats(self):
+        self.player.agent = mcts.MCTSAgent(iterations=8, rollout_turns=1, seed=0)
+        self.player.battlefield.add("Forest")
+        self.player.add_card_to_hand("Grizzly Bears")
+        sink = gamelog.add_sink(gamelog.MemorySink(gamelog.DEBUG))
+        try:
+            self.GAME.handle_turn()
+        finally:
+            gamelog.remove_sink(sink)
+
+        search = self.player.agent.last_search
+        self.assertEqual(search['rollouts'], 8)
+        self.assertEqual(sum(n for n, value in search['stats'].values()), 8)
+        self.assertGreater(search['rollouts_per_second'], 0)
+        self.assertGreater(self.player.agent.rollouts_per_second, 0)
+        # rollouts don't log, the decisions do
+        self.assertIn('mcts', sink.kinds())
+        self.assertEqual(sink.kinds().count('step'), len([s for p in gamesteps.Phase for s in p.steps]))
+
+    def test_search_leaves_game_unchanged(self):
+        self.player.battlefield.add("Mountain")
+        self.player.add_card_to_hand("Lightning Bolt")
+        # as if the player had priority in their first main phase
+        steps = [step for phase in gamesteps.Phase for step in phase.steps]
+        self.GAME.step = gamesteps.Step.PRECOMBAT_MAIN
+        self.GAME.pending_steps = steps[steps.index(self.GAME.step) + 1:]
+
+        def state():
+            return [(p.life, [c.name for c in p.library], [c.name for c in p.hand],
+                     [(c.name, c.status.tapped) for c in p.battlefield])
+                    for p in self.GAME.players_list] + [self.GAME.clock, self.GAME.turn_num]
+
+        before = state()
+        root = mcts.search(self.GAME, self.player, iterations=6, rollout_turns=2, seed=0)
+        self.assertEqual(root.visits, 6)
+        self.assertEqual(sum(n.visits for n in root.children.values()), 6)
+        self.assertEqual(state(), before)
+
+    def test_parallel_search(self):
+        self.player.agent = mcts.MCTSAgent(iterations=4, processes=2, rollout_turns=1, seed=0)
+        self.player.battlefield.add("Forest")
+        self.player.add_card_to_hand("Forest")
+
+        self.GAME.handle_turn()
+        self.assertEqual(self.player.agent.last_search['rollouts'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
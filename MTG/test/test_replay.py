@@ -0,0 +1,128 @@
+import os
+import mock
+import itertools
+import tempfile
+import unittest
+
+from MTG import agent
+from MTG import replay
+from MTG.test.test_game import TestGameBase
+
+
+class TestReplay(TestGameBase):
+    def play_recorded_turn(self):
+        with mock.patch('builtins.input', side_effect=itertools.chain([
+                '!replay start', '',
+                '', '', '',
+                '__self.add_card_to_hand("Forest")',
+                'p Forest',
+                '__self.life -= 3'], itertools.repeat(''))):
+            self.GAME.handle_turn()
+
+        return self.GAME.replay
+
+    def test_replay_rebuilds_steps(self):
+        rec = self.play_recorded_turn()
+
+        self.assertGreater(len(rec), 2)
+        first, last = rec[0], rec[-1]
+        self.assertEqual(len(first.players_list[0].battlefield), 0)
+        self.assertEqual(first.players_list[0].life, 20)
+
+        self.assertTrue(last.players_list[0].battlefield.get_card_by_name("Forest"))
+        self.assertEqual(last.players_list[0].life, 17)
+        self.assertIs(last.players_list[0].battlefield[0].controller, last.players_list[0])
+        self.assertEqual(len(last.players_list[1].library), len(self.opponent.library))
+
+    def test_replay_deltas_are_small(self):
+        rec = self.play_recorded_turn()
+
+        # a whole turn of deltas takes less room than a single snapshot
+        self.assertLess(sum(len(delta) for delta in rec.deltas), len(rec.snapshot))
+
+    def test_replay_store_and_load(self):
+        rec = self.play_recorded_turn()
+
+        fd, filename = tempfile.mkstemp(suffix='.pkl')
+        os.close(fd)
+        try:
+            rec.store(filename)
+            loaded = replay.load_replay(filename)
+        finally:
+            os.remove(filename)
+
+        self.assertEqual(len(loaded), len(rec))
+        for step in (0, len(rec) // 2, -1):
+            self.assertEqual([p.life for p in loaded[step].players_list],
+                             [p.life for p in rec[step].players_list])
+            self.assertEqual([c.name for c in loaded[step].players_list[0].battlefield],
+                             [c.name for c in rec[step].players_list[0].battlefield])
+
+    def test_replay_file_random_access(self):
+        rec = self.play_recorded_turn()
+
+        fd, filename = tempfile.mkstemp(suffix='.pkl')
+        os.close(fd)
+        try:
+            rec.store(filename, keyframe_interval=3)
+            with replay.load_replay(filename) as loaded:
+                self.assertIsInstance(loaded, replay.MappedReplay)
+                self.assertEqual(len(loaded), len(rec))
+                self.assertEqual(list(loaded._keyframe_steps), list(range(3, len(rec), 3)))
+
+                # every step, in any order, with or without a keyframe before it
+                for step in reversed(range(len(rec))):
+                    self.assertEqual(loaded.operations(step), rec.operations(step))
+                    game, expected = loaded[step], rec[step]
+                    self.assertEqual([p.life for p in game.players_list],
+                                     [p.life for p in expected.players_list])
+                    self.assertEqual([c.name for c in game.players_list[0].battlefield],
+                                     [c.name for c in expected.players_list[0].battlefield])
+                    self.assertEqual([c.name for c in game.players_list[0].hand],
+                                     [c.name for c in expected.players_list[0].hand])
+                with self.assertRaises(IndexError):
+                    loaded[len(rec)]
+        finally:
+            os.remove(filename)
+
+    def test_load_single_pickle_replay(self):
+        rec = self.play_recorded_turn()
+
+        fd, filename = tempfile.mkstemp(suffix='.pkl')
+        os.close(fd)
+        try:
+            with open(filename, 'wb') as f:
+                replay._ReplayPickler(f).dump({'version': 1, 'snapshot': rec.snapshot,
+                                               'deltas': rec.deltas})
+            loaded = replay.load_replay(filename)
+        finally:
+            os.remove(filename)
+
+        self.assertEqual(len(loaded), len(rec))
+        self.assertEqual(loaded[-1].players_list[0].life, 17)
+
+    def test_incremental_recording_matches_full_recording(self):
+        self.player.agent = agent.HeuristicAgent(seed=0)
+        self.opponent.agent = agent.HeuristicAgent(seed=1)
+        for name in ("Forest", "Grizzly Bears", "Mountain", "Mons's Goblin Raiders"):
+            self.player.add_card_to_hand(name)
+            self.opponent.add_card_to_hand(name)
+
+        incremental = replay.ReplayRecorder(self.GAME)
+        full = replay.ReplayRecorder(self.GAME, incremental=False)
+        recorders = mock.Mock()
+        recorders.record.side_effect = lambda step=None: (incremental.record(step), full.record(step))
+        self.GAME.recording_replay = True
+        self.GAME.replay = recorders
+
+        with mock.patch('builtins.input', side_effect=AssertionError("input() called")):
+            for i in range(8):
+                self.GAME.handle_turn()
+
+        self.assertGreater(len(full), 50)
+        self.assertEqual(incremental.snapshot, full.snapshot)
+        self.assertEqual(incremental.deltas, full.deltas)
+
+
+if __name__ == '__main__':
+    unittest.main()
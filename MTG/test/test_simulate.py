@@ -0,0 +1,63 @@
+import os
+import json
+import tempfile
+import unittest
+
+from MTG import simulate
+from MTG import cards
+
+cards.setup_cards()
+
+DECKS = ['card_db/decks/mono_green.txt', 'card_db/decks/mono_red.txt']
+
+
+class TestSimulate(unittest.TestCase):
+    def test_play_game(self):
+        result = simulate.play_game((0, DECKS, ['random', 'random'], 7, 100))
+
+        self.assertIn(result['winner'], ['player0', 'player1'])
+        self.assertEqual(sorted(result['life']), ['player0', 'player1'])
+        self.assertGreater(result['turns'], 0)
+
+        # same seed, same game
+        again = simulate.play_game((0, DECKS, ['random', 'random'], 7, 100))
+        del result['wall_time'], again['wall_time']
+        self.assertEqual(result, again)
+
+    def test_turn_limit(self):
+        result = simulate.play_game((0, DECKS, ['pass', 'pass'], 0, 3))
+        self.assertIsNone(result['winner'])
+        self.assertEqual(result['turns'], 3)
+
+    def test_run_batch(self):
+        fd, filename = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        try:
+            summary = simulate.run_batch(DECKS, 6, filename, processes=2)
+            with open(filename) as f:
+                results = [json.loads(line) for line in f]
+        finally:
+            os.remove(filename)
+
+        self.assertEqual(sorted(r['game'] for r in results), list(range(6)))
+        self.assertEqual(sum(summary['wins'].values()), 6)
+        self.assertNotIn('stats', summary)
+
+    def test_run_batch_stats(self):
+        fd, filename = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        try:
+            summary = simulate.run_batch(DECKS, 4, filename, processes=2, profile=True)
+            with open(filename) as f:
+                results = [json.loads(line) for line in f]
+        finally:
+            os.remove(filename)
+
+        self.assertEqual(summary['stats']['counters']['turns'],
+                         sum(r['stats']['counters']['turns'] for r in results))
+        self.assertEqual(summary['stats']['timers']['step.UNTAP']['count'],
+                         sum(r['stats']['timers']['step.UNTAP']['count'] for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import copy
+import unittest
+
+from MTG import cardtype
+from MTG import gameobject
+from MTG.test.test_game import TestGameBase
+
+
+class TestZone(TestGameBase):
+    def test_indexes(self):
+        battlefield = self.player.battlefield
+        for name in ("Forest", "Grizzly Bears", "Mountain", "Grizzly Bears"):
+            battlefield.add(name)
+
+        self.assertEqual([p.name for p in self.player.creatures], ["Grizzly Bears"] * 2)
+        self.assertEqual([p.name for p in self.player.lands], ["Forest", "Mountain"])
+        self.assertEqual([p.name for p in self.player.controls(subtype='Bear')],
+                         ["Grizzly Bears"] * 2)
+        self.assertEqual([p.name for p in self.player.controls(
+                             types=cardtype.CardType.LAND, supertype=cardtype.SuperType.BASIC)],
+                         ["Forest", "Mountain"])
+        self.assertFalse(self.player.controls(subtype='Goblin'))
+        self.assertEqual(len(battlefield.lookup('controller', self.player)), 4)
+        self.assertEqual(battlefield.count(gameobject.Characteristics(name="Grizzly Bears")), 2)
+
+        bears = battlefield.get_card_by_name("Grizzly Bears")
+        self.assertIs(bears, battlefield[1])
+        self.assertIn(bears, battlefield)
+        self.assertTrue(battlefield.remove(bears))
+        self.assertNotIn(bears, battlefield)
+        self.assertFalse(battlefield.remove(bears))
+        self.assertIs(battlefield.get_card_by_name("Grizzly Bears"), battlefield[-1])
+        self.assertEqual(len(self.player.creatures), 1)
+
+    def test_indexes_follow_changes(self):
+        battlefield = self.player.battlefield
+        forest, bears, mountain = (battlefield.add(name) for name in
+                                   ("Forest", "Grizzly Bears", "Mountain"))
+
+        # control changes without the permanent changing zones
+        bears.controller = self.opponent
+        self.assertEqual(battlefield.lookup('controller', self.opponent), [bears])
+        self.assertEqual(battlefield.lookup('controller', self.player), [forest, mountain])
+        bears.controller = self.player
+        # indexed again: after the others
+        self.assertEqual(battlefield.lookup('controller', self.player), [forest, mountain, bears])
+
+        # e.g. a copy effect
+        bears.characteristics = battlefield[0].characteristics
+        self.assertEqual(battlefield.lookup('name', "Forest"), [forest, bears])
+        self.assertFalse(battlefield.lookup('name', "Grizzly Bears"))
+        self.assertEqual(battlefield.get_card_by_name("Forest"), forest)
+        self.assertEqual(len(battlefield.lookup('type', cardtype.CardType.LAND)), 3)
+        self.assertFalse(self.player.creatures)
+
+    def test_library_order(self):
+        library = self.player.library
+        top = library[-1]
+        self.assertIs(library.pop(), top)
+        self.assertNotIn(top, library)
+
+        library.add(top, from_top=1, shuffle=False)
+        self.assertIs(library[-2], top)
+        library.add("Forest", from_top=-1, shuffle=False)
+        self.assertEqual(library[0].name, "Forest")
+        self.assertIs(library.get_card_by_name("Forest").zone, library)
+
+        library.shuffle()
+        self.assertIn(top, library)
+        self.assertEqual(len(library.lookup('name', top.name)),
+                         sum(c.name == top.name for c in library))
+
+    def test_copy(self):
+        self.player.hand.add("Lightning Bolt")
+        hand = copy.deepcopy(self.player.hand)
+        bolt = hand.get_card_by_name("Lightning Bolt")
+        self.assertIsNot(bolt, self.player.hand[0])
+        self.assertIs(bolt, hand[0])
+        self.assertTrue(hand.remove(bolt))
+        self.assertFalse(hand)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,12 @@ import re
 from collections import defaultdict
 
 from MTG import permanent
+from MTG import abilities
 from MTG import gameobject
 from MTG import cardtype
 from MTG import static_abilities
 from MTG import utils
+from MTG import gamelog
 
 
 class Token(permanent.Permanent):
@@ -52,14 +54,15 @@ def create_token(attributes, controller, num=1, keyword_abilities=[], activated_
 
         name = ' '.join(c_type)
         
-        print("making token... %s" % attributes)
+        gamelog.info('token', "making token... {attributes}", attributes=attributes)
 
         if isinstance(keyword_abilities, str):
             keyword_abilities = [keyword_abilities]
-            print("with %s" % ' '.join(keyword_abilities))
+            gamelog.info('token', "with {abilities}", abilities=' '.join(keyword_abilities))
 
-        for ablty in activated_abilities:
-            ablty[0] = utils.parse_ability_costs(ablty[0])
+        activated_abilities = [(utils.parse_ability_costs(cost), effect, None, None, False,
+                                utils.parse_ability_cost_checks(cost))
+                               for cost, effect in activated_abilities]
 
 
         for i in range(num):
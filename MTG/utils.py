@@ -3,11 +3,35 @@ import re
 import os
 import os.path
 
+from MTG import agent
+
 # any length > 0 of the following: { X, numbers, hybrid e.g. (U/R), WUBRGC }
 mana_pattern = re.compile(
     '(X|' '\d|' '(\([WUBRGC2]/[WUBRGC]\))|' '[WUBRGC])+')
 
 
+_compiled_expressions = {}  # (source, module name) -> function
+
+
+def compile_expression(source, namespace):
+    """Compile a python expression of `self` (e.g. an ability's cost or effect)
+    into a function f(self)
+
+    namespace is the globals() of the module the expression is evaluated in.
+    Each expression is compiled only once; later calls return the cached function.
+    An empty expression is always True (e.g. no costs).
+    """
+    key = (source, namespace['__name__'])
+    func = _compiled_expressions.get(key)
+    if func is None:
+        code = compile("def expression(self):\n    return (%s)\n" % (source or 'True'),
+                       '<%s>' % source, 'exec')
+        _locals = {}
+        exec(code, namespace, _locals)
+        func = _compiled_expressions[key] = _locals['expression']
+    return func
+
+
 def get_card_from_user_input(player, string):
     """Convert a user input (naming a card in a zone) to an actual game object
 
@@ -51,6 +75,17 @@ def get_card_from_user_input(player, string):
         return zone.get_card_by_name(string[2:])
 
 
+def valid_targets(source, criteria):
+    """ all objects & players that source could choose as a target satisfying criteria """
+    candidates = []
+    for _zone in ['battlefield', 'stack', 'graveyard', 'exile']:
+        source.game.apply_to_zone(candidates.append, _zone,
+                                  lambda card: criteria(source, card))
+
+    candidates.extend(p for p in source.game.players_list if criteria(source, p))
+    return candidates
+
+
 def choose_targets(source):
     # TODO: ensure boolean/card return values of this func
     # is being parsed correctly.
@@ -68,6 +103,15 @@ def choose_targets(source):
         # TODO: allow optional targeting;
         # TODO: if no valid target available, fizzles
         card = None
+        if source.controller.agent is not None:
+            card = source.controller.agent.decide(agent.TargetDecision(
+                source.controller, source, criteria, prompt, valid_targets(source, criteria)))
+            if card is None or not criteria(source, card):
+                return False
+
+            targets_chosen.append(card)
+            continue
+
         try:
             while not card:
                 answer = source.controller.make_choice(prompt)
@@ -144,6 +188,28 @@ def parse_ability_costs(cost):
     return costs
 
 
+def parse_ability_cost_checks(cost):
+    """ same as parse_ability_costs, but only checks whether the costs can be paid """
+    _costs = cost.split(', ')
+    checks = []
+
+    if 'T' in _costs:
+        checks.append("not self.status.tapped and not self.is_summoning_sick")
+
+    for itm in _costs:
+        if mana_pattern.match(itm):
+            checks.append("self.controller.can_pay('%s')" % itm)
+
+        if re.match('[pP]ay [\dX]+ life', itm):
+            checks.append("self.controller.can_pay(life=%s)" %
+                          re.search('[\dX]+', itm).group(0))
+
+    # 'Sacrifice ~' can always be paid from the battlefield
+
+    checks = " and ".join(checks)
+    return checks or "True"
+
+
 def path_from_home(path):
     """
     Return a path that is relative to the "home" folder for the MTG engine data
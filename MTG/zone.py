@@ -1,4 +1,5 @@
 from enum import Enum
+from collections import defaultdict
 import random, pdb
 
 from MTG import gameobject
@@ -6,6 +7,8 @@ from MTG import cards
 from MTG import card
 from MTG import permanent
 from MTG import triggers
+from MTG import cloning
+from MTG import replay
 
 
 class ZoneType(Enum):
@@ -28,22 +31,80 @@ def str_to_zone_type(z):
     }[z.lower()]
 
 
-class Zone():
+def _index_keys(obj):
+    """ the secondary index entries of obj: controller, name, (sub/super)types """
+    keys = [('controller', id(obj.controller) if obj.controller is not None else None)]
+    characteristics = getattr(obj, 'characteristics', None)
+    if characteristics is not None:
+        if characteristics.name:
+            keys.append(('name', characteristics.name))
+        subtypes = characteristics.subtype
+        if isinstance(subtypes, str):  # e.g. 'Goblin Warrior'
+            subtypes = subtypes.split()
+        keys.extend(('type', t) for t in characteristics.types)
+        keys.extend(('subtype', t) for t in subtypes)
+        keys.extend(('supertype', t) for t in characteristics.supertype)
+    return list(dict.fromkeys(keys))
+
+
+class Zone(replay.Tracked):
+    """An ordered collection of objects
+
+    Objects are indexed by identity (id(obj) -> obj, in zone order), so adding,
+    removing & checking membership don't depend on the size of the zone, nor on
+    GameObject.__eq__. Secondary indexes by controller, name, card type,
+    subtype & supertype (see lookup) let queries skip the objects that can't
+    match. Characteristics are indexed when an object enters the zone (or, for
+    a copied/unpickled zone, the first time the indexes are needed), and again
+    whenever its controller or characteristics are set (see reindex).
+    """
     is_library = False
     is_battlefield = False
     is_public = False
 
     def __init__(self, controller=None, elements: list=None):
-        if elements is None:
-            self.elements = []
-        else:
-            self.elements = elements
+        self._objects = {}
+        self._keys = {}  # id(obj) -> index keys of obj
+        self._indexes = defaultdict(dict)  # index key -> {id(obj): obj}, in zone order (see reindex)
+        if elements is not None:
             for ele in elements:
                 ele.controller = controller
+            self.elements = elements
         self.controller = controller
         if controller is not None:
             self.game = self.controller.game
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_objects'], state['_keys'], state['_indexes']
+        state['elements'] = self.elements
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        elements = state.pop('elements')
+        self.__dict__.update(state)
+        self.__dict__.pop('elements', None)
+        # the elements may not have their own state yet: index them later
+        self._objects = {id(obj): obj for obj in elements}
+        self._keys = {}
+        self._indexes = None
+
+    def _clone(self, memo):
+        """ copy of the zone for a copy of the game (see cloning.py)
+
+        Like an unpickled zone, the copy is indexed the first time it's looked
+        up: most copies never look up most of their zones (e.g. libraries),
+        and re-keying the indexes by the ids of the copies would cost about
+        as much as building them.
+        """
+        new = cloning.clone_object(self, memo, skip=('_objects', '_keys', '_indexes'))
+        copies = [cloning.clone(obj, memo) for obj in self._objects.values()]
+        new._objects = {id(c): c for c in copies}
+        new._keys = {}
+        new._indexes = None
+        return new
+
     def __repr__(self):
         return 'zone.Zone %r controlled by %r len=%s\n%r' % (self.__class__.__name__,
                                                              self.controller, len(self), self.elements)
@@ -52,22 +113,123 @@ class Zone():
         return '%s\'s %s (%s cards)\n%s' % (self.controller, 
                                             self.__class__.__name__,
                                             len(self), 
-                                            [ele.name for ele in self.elements])
+                                            [ele.name for ele in self])
+
+    @property
+    def elements(self):
+        """ the objects in the zone, in order
 
+        This is a copy: use add/remove/pop to change the zone.
+        """
+        return list(self._objects.values())
+
+    @elements.setter
+    def elements(self, elements):
+        self._objects = {}
+        self._keys = {}
+        self._indexes = defaultdict(dict)
+        for obj in elements:
+            self._insert(obj)
+
+    def _insert(self, obj):
+        oid = id(obj)
+        self._objects[oid] = obj
+        replay.changed(self)
+        if self._indexes is not None:
+            self._keys[oid] = _index_keys(obj)
+            for key in self._keys[oid]:
+                self._indexes[key][oid] = obj
+
+    def reindex(self, obj):
+        """ index obj again, after its controller or characteristics changed
+
+        Done by GameObject when either is set; call it after changing the
+        characteristics of an object in place. In the indexes obj wasn't in
+        already, it comes after the other objects, not in zone order.
+        """
+        oid = id(obj)
+        if self._indexes is None or oid not in self._objects:
+            return
+        old_keys = self._keys[oid]
+        new_keys = self._keys[oid] = _index_keys(obj)
+        for key in old_keys:
+            if key not in new_keys:
+                index = self._indexes[key]
+                del index[oid]
+                if not index:
+                    del self._indexes[key]
+        for key in new_keys:
+            if key not in old_keys:
+                # last in the index, whatever its place in the zone: finding
+                # that place would mean going through the whole zone
+                self._indexes[key][oid] = obj
+
+    def _count_moves(self, n=1):
+        """ objects were added to the zone (see gamestats.py) """
+        game = getattr(self, 'game', None)
+        if game is not None and game.stats is not None:
+            game.stats.count('zone_moves', n)
+
+    def _discard(self, obj):
+        """ remove obj from the zone & its indexes; returns False if it wasn't there """
+        oid = id(obj)
+        if oid not in self._objects:
+            return False
+        del self._objects[oid]
+        replay.changed(self)
+        if self._indexes is None:
+            return True
+        for key in self._keys.pop(oid):
+            index = self._indexes[key]
+            del index[oid]
+            if not index:
+                del self._indexes[key]
+        return True
 
     def __len__(self):
-        return len(self.elements)
+        return len(self._objects)
 
     def __bool__(self):
-        return bool(self.elements)
+        return bool(self._objects)
+
+    def __iter__(self):
+        # iterate over a copy, so that objects can leave the zone meanwhile
+        return iter(list(self._objects.values()))
+
+    def __contains__(self, obj):
+        return id(obj) in self._objects
 
     def __getitem__(self, pos):
+        if pos == -1 and self._objects:
+            return next(reversed(self._objects.values()))
+        if pos == 0 and self._objects:
+            return next(iter(self._objects.values()))
         return self.elements[pos]
 
     @property
     def isEmpty(self):
         return len(self) == 0
 
+    def lookup(self, kind, value):
+        """ the objects of the zone whose `kind` is/includes value, in zone order
+        (but for the ones indexed again since they entered the zone, see reindex)
+
+        kind: 'controller' (a player), 'name', 'type' (cardtype.CardType),
+              'subtype' or 'supertype'
+        """
+        if kind == 'controller':
+            value = id(value) if value is not None else None
+        return list(self._get_indexes().get((kind, value), {}).values())
+
+    def _get_indexes(self):
+        if self._indexes is None:
+            self._indexes = defaultdict(dict)
+            for oid, obj in self._objects.items():
+                self._keys[oid] = _index_keys(obj)
+                for key in self._keys[oid]:
+                    self._indexes[key][oid] = obj
+        return self._indexes
+
     def add(self, obj):
         if type(obj) is str:  # convert string (card's name) to a Card object
             obj = cards.card_from_name(obj)
@@ -77,8 +239,9 @@ class Zone():
                 o.zone = self
                 if not isinstance(self, Stack):
                     assert isinstance(o, gameobject.GameObject)
-                o.controller = self.controller
-            self.elements.extend(obj)
+                    o.controller = self.controller
+                self._insert(o)
+            self._count_moves(len(obj))
             return obj
 
         if not isinstance(self, Stack):
@@ -86,19 +249,18 @@ class Zone():
             obj.controller = self.controller
 
         obj.zone = self
-        self.elements.append(obj)
+        self._insert(obj)
+        self._count_moves()
         return obj
 
     def remove(self, obj):
         if type(obj) is list:
             return all([self.remove(o) for o in obj])
 
-        try:
-            self.elements.remove(obj)
+        if self._discard(obj):
             obj.zone = None
             return True
-        except ValueError:
-            return False
+        return False
 
     def filter(self, characteristics=None, filter_func=None):
         found = set()
@@ -111,7 +273,14 @@ class Zone():
             assert (characteristics is None
                     or isinstance(characteristics, gameobject.Characteristics))
 
-            for ele in self:
+            # only look at the objects with the right name/type, if asked for
+            candidates = self
+            if characteristics is not None and characteristics.name:
+                candidates = self.lookup('name', characteristics.name)
+            elif characteristics is not None and characteristics.types:
+                candidates = self.lookup('type', characteristics.types[0])
+
+            for ele in candidates:
                 if ele.characteristics.satisfy(characteristics):
                     found.add(ele)
 
@@ -121,14 +290,16 @@ class Zone():
         return len(self.filter(characteristics, filter_func))
 
     def get_card_by_name(self, name):
-        cards = self.filter(gameobject.Characteristics(name=name))
-        if cards:
-            return list(cards)[0]
+        index = self._get_indexes().get(('name', name))
+        if index:
+            return next(iter(index.values()))
         else:
             return None
 
     def pop(self, pos=-1):
-        return self.elements.pop(pos)
+        obj = self[pos]
+        self._discard(obj)
+        return obj
 
     def clear(self):
         # bypass triggers
@@ -152,7 +323,10 @@ class Battlefield(Zone):
         else:
             assert isinstance(obj, permanent.Permanent)
             obj.zone = self
-            self.elements.append(obj)
+            self._insert(obj)
+            self._count_moves()
+            obj.game.subscribe(obj)
+            obj.game.mark_dirty(obj)
             obj.status.reset()  # reset status upon entering battlefield
             if status_mod:
                 if 'tapped' in status_mod:
@@ -161,12 +335,18 @@ class Battlefield(Zone):
             if modi_func:  # apply "enter the battlefield with ..." effects: e.g. tapped
                 modi_func(self)
 
-            obj.trigger('onEtB', obj)
-            obj.controller.trigger('onControllerPermanentEtB', obj)
-            obj.game.trigger('onPermanentEtB', obj)
-            if obj.is_creature:
-                obj.controller.trigger('onControllerCreatureEtB', obj)
-                obj.game.trigger('onCreatureEtB', obj)
+            obj.game.trigger_etb(obj)
+
+        return obj
+
+    def remove(self, obj):
+        if type(obj) is list:
+            return all([self.remove(o) for o in obj])
+
+        if super(Battlefield, self).remove(obj):
+            obj.game.unsubscribe(obj)
+            return True
+        return False
 
 
 class Stack(Zone):
@@ -201,11 +381,14 @@ class Library(Zone):
     is_public = False
 
     def shuffle(self):
-        random.shuffle(self.elements)
+        game = self.controller.game if self.controller else None
+        elements = self.elements
+        (game.rng if game else random).shuffle(elements)
+        self.elements = elements
 
     def __init__(self, controller=None, elements: list=None):
         super(Library, self).__init__(controller, elements)
-        for ele in self.elements:
+        for ele in self:
             ele.zone = self
         self.shuffle()
 
@@ -222,12 +405,14 @@ class Library(Zone):
         obj.zone = self
 
         if from_top == 0:
-            self.elements.append(obj)
+            self._insert(obj)
         elif from_top == -1:  # put on bottom
             self.elements = [obj] + self.elements
         else:
-            self.elements = self.elements[:-from_top] + [obj] + self.elements[-from_top:]
+            elements = self.elements
+            self.elements = elements[:-from_top] + [obj] + elements[-from_top:]
 
+        self._count_moves()
         if shuffle:
             self.shuffle()
 